@@ -0,0 +1,488 @@
+import argparse
+import collections
+import concurrent.futures
+import json
+import time
+import numpy as np
+import astar
+
+NEIGHBOURS = [(0, 1), (0, -1), (-1, 0), (1, 0)]  # Up, Down, Left, Right
+
+
+class ArenaSnake:
+    """
+    One snake of the arena (body, path of the AI and result).
+    """
+
+    def __init__(self, index, head):
+        """
+        Declaration of class parameters.
+
+        :param index: Number of the snake (owner of its reservations)
+        :param head: Starting position of the head
+        """
+        self.index = index  # Number of the snake
+        self.head = head  # Position of head of the snake
+        self.body = collections.deque([head])  # Squares of the snake (Last element is head)
+        self.length = 1  # Length of snake (length of 1 is head without body)
+        self.active = True  # Indicates if snake is alive
+        self.cause = ''  # Cause of the death ('wall', 'body' or 'head')
+        self.dir_list = []  # List of directions to take (Last element is first direction to take)
+        self.target = None  # Apple, to which the path leads (None for survival move)
+        self.planned = 0  # Clock, when the path was calculated
+        self.reserved = []  # Squares (indexes) with reservations of this snake
+
+    @property
+    def score(self):
+        """
+        Achieved score (number of eaten apples).
+
+        :return: Score
+        """
+        return self.length - 1
+
+
+def blocked(vacancy, reservations, clock, index, square, g, length):
+    """
+    Check if square is occupied, when the head of the snake arrives there.
+
+    Body square is free, if it disappears before head arrival (same rule as astar.calculate_path).
+    Square reserved by other snake is occupied, when its reservation overlaps time,
+    during which the snake (head and body) will be on the square.
+
+    :param vacancy: Flat list of clock values, when squares will be free
+    :param reservations: Reservation table (square index -> list of (from clock, to clock, snake))
+    :param clock: Current clock
+    :param index: Number of the planning snake
+    :param square: Index of the square (x * rows + y)
+    :param g: Number of game-ticks until head arrival
+    :param length: Length of the planning snake
+    :return: True, if square can not be entered.
+    """
+    if vacancy[square] - clock >= g:
+        return True
+    intervals = reservations.get(square)
+    if intervals:
+        arrival = clock + g
+        for start, end, owner in intervals:
+            if owner != index and start < arrival + length and arrival < end:
+                return True
+    return False
+
+
+def plan_path(vacancy, reservations, clock, index, head, goal, length, width, height):
+    """
+    A* algorithm for calculating path of one arena snake around bodies and reservations of other snakes.
+
+    Uses astar.search, each square is checked for time of head arrival (see blocked).
+
+    :param vacancy: Flat list of clock values, when squares will be free
+    :param reservations: Reservation table (square index -> list of (from clock, to clock, snake))
+    :param clock: Current clock
+    :param index: Number of the planning snake
+    :param head: Position of the head of the snake
+    :param goal: Position of the apple
+    :param length: Length of the planning snake
+    :param width: Columns in game (squares in one row).
+    :param height: Rows in game (squares in one column).
+    :return: List of direction (Last element is first direction to take), None if there is no path.
+    """
+    return astar.search(None, length, head, goal, width, height,
+                        blocked=lambda square, g: blocked(vacancy, reservations, clock, index, square, g, length))[0]
+
+
+def plan_paths(vacancy, reservations, clock, requests, width, height):
+    """
+    Calculate paths of more snakes against same reservation table (one batch of parallel planning).
+
+    :param vacancy: Flat list of clock values, when squares will be free
+    :param reservations: Reservation table (square index -> list of (from clock, to clock, snake))
+    :param clock: Current clock
+    :param requests: List of tuples (number of the snake, head, apple, length)
+    :param width: Columns in game (squares in one row).
+    :param height: Rows in game (squares in one column).
+    :return: List of paths (same order as requests, see plan_path).
+    """
+    return [plan_path(vacancy, reservations, clock, index, head, goal, length, width, height)
+            for index, head, goal, length in requests]
+
+
+class Arena:
+    """
+    Many snakes controlled by AI on one board.
+
+    All snakes move at once every game-tick. Vacancy field keeps clock value, when each square will be free
+    (same as GameState, clock moves every game-tick and squares of the snake, which has eaten apple,
+    stay one game-tick longer). Every snake reserves squares of its path in shared space-time reservation table
+    (square -> intervals of clock values, when the snake will be there), so snakes planned later
+    avoid paths of other snakes. Only first 'horizon' moves of the path are reserved and the path is calculated
+    again after horizon / 2 moves (windowed cooperative A*).
+
+    Paths of all snakes, which need new path, are calculated in one batch every game-tick. Batch is calculated
+    one snake after another (each snake sees reservations of the previous ones), or in 'workers' processes
+    against same reservation table; paths from processes, which collide with previously reserved paths,
+    are calculated again.
+    """
+
+    def __init__(self, snakes=8, columns=64, rows=64, apples=None, seed=None, horizon=32, workers=None):
+        """
+        Declaration of class parameters.
+
+        :param snakes: Number of snakes
+        :param columns: Number of tiles in one row
+        :param rows: Number of tiles in one column
+        :param apples: Number of apples on the board (None for same as number of snakes)
+        :param seed: Seed for random generator (starting positions and apples). None for random seed.
+        :param horizon: Number of reserved moves of each path
+        :param workers: Number of processes for planning (None or 1 for planning without processes)
+        """
+        self.columns = columns  # Number of tiles in one row
+        self.rows = rows  # Number of tiles in one column
+        self.horizon = horizon  # Number of reserved moves of each path
+        self.workers = workers  # Number of processes for planning
+        self.rng = np.random.default_rng(seed)  # Random generator for starting positions and apples
+        self.clock = 0  # Number of game-ticks
+        self.vacancy = [0] * (columns * rows)  # Clock value, when each square will be free (x * rows + y)
+        self.reservations = {}  # Reservation table (square index -> list of (from clock, to clock, snake))
+        self.apples = set()  # Positions of apples
+        self.snakes = []  # Snakes (class ArenaSnake)
+        self.planning_time = 0.0  # Seconds spent in pathfinding
+        self.plans = 0  # Number of calculated paths
+        self.conflicts = 0  # Number of paths from processes calculated again (collision with other reservation)
+        self.executor = None  # Processes for planning (created on first use)
+        for index in range(0, snakes):
+            head = self.free_square()
+            self.snakes.append(ArenaSnake(index, head))
+            self.vacancy[head[0] * rows + head[1]] = 1
+        for i in range(0, snakes if apples is None else apples):
+            self.place_apple()
+
+    @property
+    def active(self):
+        """
+        Number of living snakes.
+
+        :return: Number of snakes
+        """
+        return sum(1 for snake in self.snakes if snake.active)
+
+    @property
+    def game_field(self):
+        """
+        Numpy array of the arena (number of game-ticks, until the square will be free, apples are -1).
+
+        :return: Numpy array (columns, rows)
+        """
+        field = np.array(self.vacancy, dtype=np.int64).reshape(self.columns, self.rows) - self.clock
+        np.maximum(field, 0, out=field)
+        for x, y in self.apples:
+            field[x, y] = -1
+        return field
+
+    def free_square(self):
+        """
+        Select random square without snake and apple.
+
+        :return: Position of the square (None, if there is no such square)
+        """
+        for i in range(0, 32):  # Random squares are tried first (board is mostly empty)
+            x, y = int(self.rng.integers(0, self.columns)), int(self.rng.integers(0, self.rows))
+            if self.vacancy[x * self.rows + y] <= self.clock and (x, y) not in self.apples:
+                return x, y
+        free = [square for square in np.flatnonzero(np.array(self.vacancy) <= self.clock).tolist()
+                if divmod(square, self.rows) not in self.apples]
+        if not free:
+            return None
+        return divmod(free[int(self.rng.integers(0, len(free)))], self.rows)
+
+    def place_apple(self):
+        """
+        Place new apple in free area.
+
+        :return: Nothing
+        """
+        square = self.free_square()
+        if square is not None:
+            self.apples.add(square)
+
+    def release(self, snake):
+        """
+        Remove all reservations of the snake.
+
+        :param snake: Snake (class ArenaSnake)
+        :return: Nothing
+        """
+        for square in snake.reserved:
+            intervals = self.reservations.get(square)
+            if intervals:
+                intervals[:] = [interval for interval in intervals if interval[2] != snake.index]
+                if not intervals:
+                    del self.reservations[square]
+        snake.reserved = []
+
+    def reserve(self, snake):
+        """
+        Reserve squares of the path of the snake (first 'horizon' moves).
+
+        Square is reserved from head arrival, until the tail leaves it (one game-tick longer for eaten apple).
+
+        :param snake: Snake (class ArenaSnake)
+        :return: Nothing
+        """
+        x, y = snake.head
+        for g, (dx, dy) in enumerate(reversed(snake.dir_list[-self.horizon:]), 1):
+            x += dx
+            y += dy
+            square = x * self.rows + y
+            self.reservations.setdefault(square, []).append((self.clock + g, self.clock + g + snake.length + 1,
+                                                             snake.index))
+            snake.reserved.append(square)
+
+    def needs_plan(self, snake):
+        """
+        Check if path of the snake has to be calculated again.
+
+        :param snake: Snake (class ArenaSnake)
+        :return: True for new path.
+        """
+        if not snake.dir_list or snake.target not in self.apples or self.clock - snake.planned >= self.horizon // 2:
+            return True
+        dx, dy = snake.dir_list[-1]
+        x, y = snake.head[0] + dx, snake.head[1] + dy
+        return blocked(self.vacancy, self.reservations, self.clock, snake.index, x * self.rows + y, 1, snake.length)
+
+    def select_apple(self, snake, targets):
+        """
+        Select the closest apple, which is not target of other snake (the closest apple, if all are targets).
+
+        :param snake: Snake (class ArenaSnake)
+        :param targets: Set of apples, which are targets of other snakes
+        :return: Position of the apple (None, when there is no apple)
+        """
+        best = None
+        for apple in self.apples:
+            distance = abs(apple[0] - snake.head[0]) + abs(apple[1] - snake.head[1])
+            key = (apple in targets, distance, apple)
+            if best is None or key < best[0]:
+                best = (key, apple)
+        return best[1] if best is not None else None
+
+    def plan(self):
+        """
+        Calculate paths of all snakes, which need new path (one batch, see class description).
+
+        :return: Nothing
+        """
+        start = time.perf_counter()
+        snakes = [snake for snake in self.snakes if snake.active and self.needs_plan(snake)]
+        targets = {snake.target for snake in self.snakes if snake.active and snake not in snakes}
+        goals = []
+        for snake in snakes:
+            self.release(snake)
+            goals.append(self.select_apple(snake, targets))
+            targets.add(goals[-1])
+        paths = None
+        if self.workers and self.workers > 1 and len(snakes) > 1:
+            paths = self.plan_parallel(snakes, goals)
+        for i, (snake, goal) in enumerate(zip(snakes, goals)):
+            path = paths[i] if paths is not None else None
+            if path is not None and not self.follows(snake, path):
+                self.conflicts += 1
+                path = None
+            if path is None and goal is not None:
+                path = plan_path(self.vacancy, self.reservations, self.clock, snake.index, snake.head, goal,
+                                 snake.length, self.columns, self.rows)
+            self.plans += 1
+            snake.planned = self.clock
+            if path:
+                snake.dir_list = path
+                snake.target = goal
+            else:
+                snake.dir_list = [self.survival_move(snake)]
+                snake.target = None
+            self.reserve(snake)
+        self.planning_time += time.perf_counter() - start
+
+    def plan_parallel(self, snakes, goals):
+        """
+        Calculate paths of snakes in processes against current reservation table.
+
+        :param snakes: List of snakes (class ArenaSnake)
+        :param goals: List of apples (target of each snake)
+        :return: List of paths (same order as snakes).
+        """
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        requests = [(snake.index, snake.head, goal, snake.length) for snake, goal in zip(snakes, goals)]
+        chunk = -(-len(requests) // self.workers)
+        futures = [self.executor.submit(plan_paths, self.vacancy, self.reservations, self.clock,
+                                        [request for request in requests[i:i + chunk] if request[2] is not None],
+                                        self.columns, self.rows) for i in range(0, len(requests), chunk)]
+        paths = []
+        for i, future in zip(range(0, len(requests), chunk), futures):
+            results = iter(future.result())
+            paths.extend(next(results) if request[2] is not None else None for request in requests[i:i + chunk])
+        return paths
+
+    def follows(self, snake, dir_list):
+        """
+        Check if reserved part of the path is free (reservations could change since calculation of the path).
+
+        :param snake: Snake (class ArenaSnake)
+        :param dir_list: List of direction (Last element is first direction to take)
+        :return: True, if path is free.
+        """
+        x, y = snake.head
+        for g, (dx, dy) in enumerate(reversed(dir_list[-self.horizon:]), 1):
+            x += dx
+            y += dy
+            if blocked(self.vacancy, self.reservations, self.clock, snake.index, x * self.rows + y, g, snake.length):
+                return False
+        return True
+
+    def survival_move(self, snake):
+        """
+        Select direction, when there is no path to apple (free square with the most free neighbours).
+
+        Trapped snake (without free square) avoids squares reserved by other snakes,
+        so it does not end other snake by collision of heads.
+
+        :param snake: Snake (class ArenaSnake)
+        :return: Direction of the move
+        """
+        best = (0, 1)
+        best_value = -3
+        for dx, dy in NEIGHBOURS:
+            x, y = snake.head[0] + dx, snake.head[1] + dy
+            square = x * self.rows + y
+            if not (0 <= x < self.columns and 0 <= y < self.rows):
+                value = -1  # Wall (snake ends only itself)
+            elif self.vacancy[square] > self.clock:
+                value = -1  # Body (snake ends only itself)
+            elif blocked(self.vacancy, self.reservations, self.clock, snake.index, square, 1, snake.length):
+                value = -2  # Square reserved by other snake (heads could collide)
+            else:
+                value = 0
+                for nx, ny in ((x, y + 1), (x, y - 1), (x - 1, y), (x + 1, y)):
+                    if (0 <= nx < self.columns and 0 <= ny < self.rows and
+                            self.vacancy[nx * self.rows + ny] <= self.clock + 1):
+                        value += 1
+            if value > best_value:
+                best = (dx, dy)
+                best_value = value
+        return best
+
+    def kill(self, snake, cause):
+        """
+        End the snake (its body disappears and its reservations are removed).
+
+        :param snake: Snake (class ArenaSnake)
+        :param cause: Cause of the death ('wall', 'body' or 'head')
+        :return: Nothing
+        """
+        snake.active = False
+        snake.cause = cause
+        for x, y in snake.body:
+            self.vacancy[x * self.rows + y] = self.clock
+        self.release(snake)
+        snake.dir_list = []
+
+    def step(self):
+        """
+        Plan and move all snakes by one square.
+
+        Snake dies, when it hits the wall or body of any snake. Snakes, whose heads meet on one square, die both.
+
+        :return: True, if any snake is alive.
+        """
+        self.plan()
+        moves = {}  # Snake -> new position of the head
+        for snake in self.snakes:
+            if snake.active:
+                dx, dy = snake.dir_list.pop()
+                moves[snake] = (snake.head[0] + dx, snake.head[1] + dy)
+        heads = collections.Counter(moves.values())
+        dead = []
+        for snake, (x, y) in moves.items():
+            if not (0 <= x < self.columns and 0 <= y < self.rows):
+                dead.append((snake, 'wall'))
+            elif self.vacancy[x * self.rows + y] > self.clock:
+                dead.append((snake, 'body'))
+            elif heads[(x, y)] > 1:
+                dead.append((snake, 'head'))
+        for snake, cause in dead:
+            self.kill(snake, cause)
+            del moves[snake]
+        self.clock += 1
+        eaten = 0
+        for snake, head in moves.items():
+            if head in self.apples:  # Snake grows, its body stays one game-tick longer
+                self.apples.remove(head)
+                eaten += 1
+                snake.length += 1
+                for x, y in snake.body:
+                    self.vacancy[x * self.rows + y] += 1
+            else:
+                snake.body.popleft()
+            snake.head = head
+            snake.body.append(head)
+            self.vacancy[head[0] * self.rows + head[1]] = self.clock + snake.length
+        for i in range(0, eaten):  # New apples are placed after all snakes moved
+            self.place_apple()
+        return any(snake.active for snake in self.snakes)
+
+    def close(self):
+        """
+        Stop processes for planning.
+
+        :return: Nothing
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def summary(self):
+        """
+        Summarize the arena.
+
+        :return: Dictionary with number of game-ticks, living snakes, scores and planning statistics.
+        """
+        return {'ticks': self.clock, 'active': self.active, 'scores': [snake.score for snake in self.snakes],
+                'causes': [snake.cause for snake in self.snakes], 'plans': self.plans, 'conflicts': self.conflicts,
+                'planning_time': round(self.planning_time, 6)}
+
+
+def main(argv=None):
+    """
+    Console entry point for arena of many snakes controlled by AI (without window).
+
+    Summary of the arena (JSON) with game-ticks per second is written at the end.
+
+    :param argv: Command line arguments (None for sys.argv)
+    :return: Nothing
+    """
+    parser = argparse.ArgumentParser(description='Many snakes controlled by AI on one board without window.')
+    parser.add_argument('-s', '--snakes', type=int, default=8, help='number of snakes')
+    parser.add_argument('--columns', type=int, default=64, help='number of tiles in one row')
+    parser.add_argument('--rows', type=int, default=64, help='number of tiles in one column')
+    parser.add_argument('--apples', type=int, default=None, help='number of apples (default: number of snakes)')
+    parser.add_argument('--ticks', type=int, default=1000, help='maximal number of game-ticks')
+    parser.add_argument('--seed', type=int, default=None, help='seed (default: random)')
+    parser.add_argument('--horizon', type=int, default=32, help='number of reserved moves of each path')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='number of processes for planning')
+    args = parser.parse_args(argv)
+
+    arena = Arena(args.snakes, args.columns, args.rows, args.apples, args.seed, args.horizon, args.workers)
+    start = time.perf_counter()
+    try:
+        while arena.clock < args.ticks and arena.step():
+            pass
+    finally:
+        arena.close()
+    summary = arena.summary()
+    summary['ticks_per_sec'] = round(arena.clock / (time.perf_counter() - start), 2)
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,8 @@
+import numpy as np
+import heapq
+import time
+
+
 def calculate_path(game_field, length, head, apple, width, height):
     """
     A* algorithm for calculating path from head of the snake to apple.
@@ -16,68 +21,257 @@ def calculate_path(game_field, length, head, apple, width, height):
     :param height: Rows in game (squares in one column).
     :return: List of direction (where to move square by square).
     """
-    opened = []  # List of squares, that can lead to apple
-    closed = []  # List of checked squares
-    opened.append((head[0], head[1], -1, -1, 0, abs(head[0] - apple[0]) + abs(head[1] - apple[1]), 0))
-    # shortcut     x        y        Px  Py  g  h                                                  f
-    # index        0        1        2   3   4  5                                                  6
-    # Px=X of parent square, Py=Y of parent square, g=move cost from start, h=move cost to finish, f=g+h
-    while len(opened) > 0:  # If there are squares to check, check them.
-        value = opened[0][4]
-        index = 0
-        for i in range(1, len(opened)):
-            if opened[i][6] < value:
-                value = opened[i][6]
-                index = i
-        sel = opened[index]  # Selected square
-        opened.remove(opened[index])
-        suc = []  # Successors - Squares next to selected square (Up, Down, Left, Right)
-        check_overlap = (sel[4] + 1 > game_field[sel[0] - 1][sel[1]] != 0)  # Body will disappear before head arrival.
+    return search(game_field, length, head, apple, width, height)[0]
+
+
+def calculate_path_budget(game_field, length, head, apple, width, height, max_expanded=None, time_budget=None):
+    """
+    A* algorithm with limited work (see calculate_path).
+
+    When the limit is reached before the apple is found, path to the checked square closest to apple
+    is returned instead (snake can follow it and search again from there).
+
+    :param game_field: Numpy array of the game situation
+    :param length: Length of the snake
+    :param head: Position of the head of the snake
+    :param apple: Position of the apple
+    :param width: Columns in game (squares in one row).
+    :param height: Rows in game (squares in one column).
+    :param max_expanded: Maximal number of checked squares (None for no limit)
+    :param time_budget: Maximal duration of the search in seconds (None for no limit)
+    :return: Tuple of list of direction (None, if there is no path) and indicator if path leads to apple.
+    """
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    stats = {}
+    dir_list = search(game_field, length, head, apple, width, height, stats, max_expanded, deadline)[0]
+    return dir_list, stats['complete']
+
+
+class BudgetPlanner:
+    """
+    Pathfinding with limited work for every calculation (see calculate_path_budget).
+
+    Duration of the game-tick stays limited also on big boards. When the limit is reached,
+    snake follows path to the square closest to apple and search continues from there, when the path ends.
+    """
+
+    def __init__(self, max_expanded=2000, time_budget=None):
+        """
+        Declaration of class parameters.
+
+        :param max_expanded: Maximal number of checked squares for one calculation (None for no limit)
+        :param time_budget: Maximal duration of one calculation in seconds (None for no limit)
+        """
+        self.max_expanded = max_expanded  # Maximal number of checked squares for one calculation
+        self.time_budget = time_budget  # Maximal duration of one calculation
+        self.complete = True  # Indicates if the last path leads to apple
+        self.partial_paths = 0  # Number of calculations stopped by limit
+
+    def __call__(self, game_field, length, head, apple, width, height):
+        """
+        Calculate path to apple or to the square closest to apple (same parameters as calculate_path).
+
+        :param game_field: Numpy array of the game situation
+        :param length: Length of the snake
+        :param head: Position of the head of the snake
+        :param apple: Position of the apple
+        :param width: Columns in game (squares in one row).
+        :param height: Rows in game (squares in one column).
+        :return: List of direction (where to move square by square).
+        """
+        dir_list, self.complete = calculate_path_budget(game_field, length, head, apple, width, height,
+                                                        self.max_expanded, self.time_budget)
+        if not self.complete:
+            self.partial_paths += 1
+        return dir_list
+
+
+def search(game_field, length, head, apple, width, height, stats=None, max_expanded=None, deadline=None,
+           blocked=None):
+    """
+    A* algorithm for calculating path from head of the snake to apple (see calculate_path).
+
+    Opened squares are kept in binary heap (outdated entries are skipped when popped),
+    best cost and parent of each square are kept in flat arrays indexed by square (x * height + y).
+    Found path is always shortest. Among squares with same f, square closer to apple (smaller h) is checked first,
+    neighbours are added in order left, right, down, up (this decides which of equally long paths is returned).
+
+    :param game_field: Numpy array of the game situation
+    :param length: Length of the snake
+    :param head: Position of the head of the snake
+    :param apple: Position of the apple
+    :param width: Columns in game (squares in one row).
+    :param height: Rows in game (squares in one column).
+    :param stats: Dictionary for search statistics (None for no statistics). Keys 'expanded' (number of checked
+                  squares), 'max_opened' (biggest size of opened heap) and 'complete' (False, when search
+                  was stopped by limit) are set.
+    :param max_expanded: Maximal number of checked squares (None for no limit)
+    :param deadline: Time (time.perf_counter), when the search stops (None for no limit)
+    :param blocked: Function blocked(square, g), which returns True, if square (x * height + y) can not be entered
+                    g game-ticks after start. It replaces the check of the game field (which can be None).
+                    None for the check of the game field.
+    :return: Tuple of list of direction (None, if there is no path; path to the checked square closest to apple,
+             when search was stopped by limit) and flat list of checked squares (True for checked square,
+             None if there was no search).
+    """
+    field = game_field.ravel().tolist() if blocked is None else None  # Flat copy of the game field (fast access)
+    size = width * height
+    apple_value = length + 1  # Value of the apple square
+    start = head[0] * height + head[1]
+    goal = apple[0] * height + apple[1]
+    if not (0 <= apple[0] < width and 0 <= apple[1] < height):  # No apple on the board (Board is full)
+        if stats is not None:
+            stats['expanded'] = stats['max_opened'] = 0
+            stats['complete'] = True
+        return None, None
+    best_g = [size + 1] * size  # Lowest known move cost from start for each square
+    parent = [-1] * size  # Index of the parent square for each square
+    closed = [False] * size  # Indicates if square was already checked
+    best_g[start] = 0
+    h = abs(head[0] - apple[0]) + abs(head[1] - apple[1])
+    opened = [(h, h, 0, start)]  # Heap of squares, that can lead to apple
+    # shortcut f  h  g  index
+    dir_list = None
+    expanded = 0  # Number of checked squares
+    max_opened = 1  # Biggest size of opened heap
+    complete = True  # Indicates if search was not stopped by limit
+    closest = (size + 1, 0, start)  # Checked square closest to apple (h, g, index)
+    while opened and dir_list is None:  # If there are squares to check, check them.
+        f, h, g, sel = heapq.heappop(opened)  # Selected square
+        if closed[sel] or g > best_g[sel]:  # Outdated entry of already checked square.
+            continue
+        if ((max_expanded is not None and expanded >= max_expanded) or
+                (deadline is not None and expanded % 64 == 0 and time.perf_counter() > deadline)):
+            complete = False
+            if closest[2] != start:
+                dir_list = _backtrack(parent, closest[2], start, height)
+            break
+        closed[sel] = True
+        expanded += 1
+        if sel != start and (h, g) < closest[:2]:
+            closest = (h, g, sel)
+        if len(opened) >= max_opened:
+            max_opened = len(opened) + 1
+        x, y = divmod(sel, height)
+        g += 1  # Set distance from start (last square+1).
         """
         For each side check if its not out of bounds and if it will have unoccupied square on head arrival.
-        If both are true, add that square to successors.
+        Body square is free, if it will disappear before head arrival.
         """
-        if sel[0] > 0:
-            if game_field[sel[0] - 1][sel[1]] == 0 or game_field[sel[0] - 1][sel[1]] >= length + 1 or check_overlap:
-                suc.append((sel[0] - 1, sel[1], sel[0], sel[1]))
-        if sel[0] < width-1:
-            if game_field[sel[0] + 1][sel[1]] == 0 or game_field[sel[0] + 1][sel[1]] == length + 1 or check_overlap:
-                suc.append((sel[0] + 1, sel[1], sel[0], sel[1]))
-        if sel[1] > 0:
-            if game_field[sel[0]][sel[1] - 1] == 0 or game_field[sel[0]][sel[1] - 1] == length + 1 or check_overlap:
-                suc.append((sel[0], sel[1] - 1, sel[0], sel[1]))
-        if sel[1] < height-1:
-            if game_field[sel[0]][sel[1] + 1] == 0 or game_field[sel[0]][sel[1] + 1] == length + 1 or check_overlap:
-                suc.append((sel[0], sel[1] + 1, sel[0], sel[1]))
-        for i in suc:  # For successors check following and decide if to end algorithm, keep or discard successor.
-            if i[0] == apple[0] and i[1] == apple[1]:  # If successor is at the apple position, end algorithm.
-                dir_list = [(i[0] - sel[0], i[1] - sel[1])]  # Declare list, which will be returned.
-                if sel[2] != -1 or sel[3] != -1:  # Check if there is more than 2 square in path.
-                    dir_list.append((sel[0]-sel[2], sel[1]-sel[3]))
-                temp = (sel[2], sel[3])
-                while temp != (-1, -1):  # Backtrack to start using parents.
-                    for i in closed:
-                        if temp[0] == i[0] and temp[1] == i[1]:
-                            if i[2] != -1 or i[3] != -1:
-                                dir_list.append((temp[0]-i[2], temp[1]-i[3]))
-                            temp = (i[2], i[3])
-                            break
-                return dir_list  # Return completed list of directions.
-            g = sel[4] + 1  # Set distance from start (last square+1).
-            h = abs(i[0] - apple[0]) + abs(i[1] - apple[1])  # Calculate distance from apple.
-            i = (i[0], i[1], i[2], i[3], g, h, g + h)  # Put all the info about successor in one tuple.
-            skip_i = 0  # if square is found in one list, it will not be in second one, therefore skip.
-            for j in range(0, len(opened)):
-                if opened[j][0] == i[0] and opened[j][1] == i[1]:  # If same square with lower 'f', skip.
-                    if opened[j][6] <= i[6]:
-                        skip_i = 1
-                    break
-            if skip_i == 0:
-                for j in range(0, len(closed)):
-                    if closed[j][0] == i[0] and closed[j][1] == i[1]:  # If same square with lower 'f', skip.
-                        if closed[j][6] <= i[6]:
-                            skip_i = 1
-                        break
-            if skip_i == 0:  # If square was not in the list or had lower 'f' than one in the list, add to opened list.
-                opened.append(i)
-        closed.append(sel)  # Put checked square in closed list.
+        for nx, ny, nxt in ((x - 1, y, sel - height), (x + 1, y, sel + height),
+                            (x, y - 1, sel - 1), (x, y + 1, sel + 1)):
+            if nx < 0 or nx >= width or ny < 0 or ny >= height or closed[nxt]:
+                continue
+            if blocked is None:
+                value = field[nxt]
+                if value != 0 and value != apple_value and value >= g:
+                    continue
+            elif blocked(nxt, g):
+                continue
+            if nxt == goal:  # If successor is at the apple position, end algorithm.
+                parent[nxt] = sel
+                dir_list = _backtrack(parent, goal, start, height)
+                break
+            if g < best_g[nxt]:  # If square was not found yet or had higher cost, add it to opened heap.
+                best_g[nxt] = g
+                parent[nxt] = sel
+                nh = abs(nx - apple[0]) + abs(ny - apple[1])  # Calculate distance from apple.
+                heapq.heappush(opened, (g + nh, nh, g, nxt))
+    if stats is not None:
+        stats['expanded'] = expanded
+        stats['max_opened'] = max_opened
+        stats['complete'] = complete
+    return dir_list, closed
+
+
+def _backtrack(parent, goal, start, height):
+    """
+    Backtrack from apple to start using parents.
+
+    :param parent: Flat list of parent indexes.
+    :param goal: Index of the apple square.
+    :param start: Index of the head square.
+    :param height: Rows in game (squares in one column).
+    :return: List of direction (Last element is first direction to take).
+    """
+    dir_list = []
+    temp = goal
+    while temp != start:
+        prev = parent[temp]
+        diff = temp - prev
+        if diff == height:
+            dir_list.append((1, 0))
+        elif diff == -height:
+            dir_list.append((-1, 0))
+        elif diff == 1:
+            dir_list.append((0, 1))
+        else:
+            dir_list.append((0, -1))
+        temp = prev
+    return dir_list
+
+
+def reachable(game_field, length, head, apple, width, height, stop_at_apple=True):
+    """
+    Check if apple can be reached from head (flood fill from head, without searching for path).
+
+    Uses same rule for body of the snake as calculate_path (body square is free, if it will disappear before
+    head arrival), so apple is reachable exactly when calculate_path finds path.
+    Squares are kept as bits of one integer (column after column, one empty bit between columns),
+    so whole wave of squares in same distance from head is moved at once by bit shifts.
+
+    :param game_field: Numpy array of the game situation
+    :param length: Length of the snake
+    :param head: Position of the head of the snake
+    :param apple: Position of the apple
+    :param width: Columns in game (squares in one row).
+    :param height: Rows in game (squares in one column).
+    :param stop_at_apple: Stop, when apple is reached (otherwise whole reachable area is filled).
+    :return: Tuple of indicator if apple is reachable, number of reached squares
+             and numpy array of reached squares (True for reached square).
+    """
+    width, height = int(width), int(height)
+    stride = height + 1  # Distance of neighbouring squares in row (one empty bit between columns)
+    board = _to_bits(np.full((width, height), True), stride)  # All squares of the game
+    body = (game_field != 0) & (game_field != length + 1)
+    body_x, body_y = np.nonzero(body)
+    values = game_field[body_x, body_y]
+    order = np.argsort(values, kind='stable')
+    values = values[order].tolist()  # Body squares sorted by time, when they will disappear
+    positions = (body_x * stride + body_y)[order].tolist()
+    blocked = _to_bits(body, stride)  # Squares, which are blocked at current distance from head
+    goal = 0
+    if 0 <= apple[0] < width and 0 <= apple[1] < height:
+        goal = 1 << int(apple[0] * stride + apple[1])
+    reached = frontier = 1 << int(head[0] * stride + head[1])
+    found = False
+    distance = 0
+    removed = 0  # Number of body squares, which are already free
+    while frontier:
+        distance += 1
+        while removed < len(values) and values[removed] < distance:  # Body square disappeared before arrival
+            blocked &= ~(1 << positions[removed])
+            removed += 1
+        frontier = ((frontier << stride) | (frontier >> stride) | (frontier << 1) | (frontier >> 1)) & board
+        frontier &= ~(reached | blocked)
+        reached |= frontier
+        if frontier & goal:
+            found = True
+            if stop_at_apple:
+                break
+    region = np.unpackbits(np.frombuffer(reached.to_bytes(width * stride // 8 + 1, 'little'), dtype=np.uint8),
+                           bitorder='little')[:width * stride].reshape(width, stride)[:, :height].astype(bool)
+    return found, reached.bit_count(), region
+
+
+def _to_bits(mask, stride):
+    """
+    Convert numpy array of squares to bits of one integer.
+
+    :param mask: Numpy bool array (columns, rows)
+    :param stride: Number of bits for one column
+    :return: Integer with bit (x * stride + y) set for every True square.
+    """
+    padded = np.zeros((mask.shape[0], stride), dtype=bool)
+    padded[:, :mask.shape[1]] = mask
+    return int.from_bytes(np.packbits(padded.ravel(), bitorder='little').tobytes(), 'little')
@@ -0,0 +1,165 @@
+import concurrent.futures
+import astar
+
+_executors = {}  # Kind of worker ('thread' or 'process') -> executor shared by all planners in this process
+
+
+def executor(processes=False):
+    """
+    Get worker for calculating paths (created on first use, one worker for all games).
+
+    :param processes: Use separate process instead of thread (pathfinding does not share interpreter lock
+                      with the game, but game field has to be copied to the process).
+    :return: Executor with one worker.
+    """
+    kind = 'process' if processes else 'thread'
+    if kind not in _executors:
+        if processes:
+            _executors[kind] = concurrent.futures.ProcessPoolExecutor(max_workers=1)
+        else:
+            _executors[kind] = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='planner')
+    return _executors[kind]
+
+
+class BackgroundPlanner:
+    """
+    Pathfinding, which calculates paths in worker (thread or process), so the game-tick never waits long for it.
+
+    Request with copy of the game situation is sent to the worker and the game-tick waits for the response
+    at most 'wait' seconds. Meanwhile the snake follows the last path (while its next square is free)
+    or makes survival move. Path from the response starts where the snake was during the request,
+    so only its part from the current head is used and only when it is still free (see receive).
+    Otherwise the response is discarded and new request is sent.
+    """
+
+    def __init__(self, planner=astar.calculate_path, processes=False, wait=0.005):
+        """
+        Declaration of class parameters.
+
+        :param planner: Function for calculating path (same parameters and return value as astar.calculate_path)
+        :param processes: Use separate process instead of thread (see executor)
+        :param wait: Maximal time (seconds) for waiting for the response during one game-tick (None for no limit)
+        """
+        if hasattr(planner, 'update'):
+            raise ValueError('BackgroundPlanner needs function for calculating path, not planner with update')
+        self.planner = planner  # Function for calculating path
+        self.processes = processes  # Use separate process instead of thread
+        self.wait = wait  # Maximal time for waiting for the response during one game-tick
+        self.request = None  # Response of the worker (future) of the request in progress
+        self.apple = None  # Apple during the request
+        self.head = None  # Position of the head during the request
+        self.requests = 0  # Number of sent requests
+        self.discarded = 0  # Number of discarded responses (snake or apple changed before the response)
+
+    def __call__(self, game_field, length, head, apple, width, height):
+        """
+        Calculate path immediately (same as the wrapped function).
+
+        :param game_field: Numpy array of the game situation
+        :param length: Length of the snake
+        :param head: Position of the head of the snake
+        :param apple: Position of the apple
+        :param width: Columns in game (squares in one row).
+        :param height: Rows in game (squares in one column).
+        :return: List of direction (where to move square by square).
+        """
+        return self.planner(game_field, length, head, apple, width, height)
+
+    def update(self, state):
+        """
+        Send request, receive response and select direction of the next move. Called every game-tick.
+
+        :param state: Game state (class GameState)
+        :return: Nothing
+        """
+        if self.request is not None:
+            self.poll(state)
+        if self.request is None and (not state.dir_list or not state.is_free(state.dir_list[-1]) or
+                                     state.apple != self.apple):
+            self.send(state)
+            self.poll(state)
+        if state.dir_list and not state.is_free(state.dir_list[-1]):  # Last path is blocked
+            state.dir_list = []
+        if not state.dir_list:
+            state.direction = state.survival_move()
+
+    def poll(self, state):
+        """
+        Wait for the response (at most 'wait' seconds) and use it, when it is finished.
+
+        :param state: Game state (class GameState)
+        :return: Nothing
+        """
+        try:
+            self.request.result(timeout=self.wait)
+        except concurrent.futures.TimeoutError:
+            return
+        self.receive(state)
+
+    def send(self, state):
+        """
+        Send request with the current game situation to the worker.
+
+        :param state: Game state (class GameState)
+        :return: Nothing
+        """
+        self.apple = state.apple
+        self.head = state.head
+        self.requests += 1
+        self.request = executor(self.processes).submit(self.planner, state.game_field, state.length, state.head,
+                                                       state.apple, state.columns, state.rows)
+
+    def receive(self, state):
+        """
+        Use path from the finished request, if it is still valid.
+
+        Path starts where the snake was during the request. Part of the path from the current head
+        (or from its neighbour, which is joined by one move) is used, when apple did not change
+        and the part is free for the current body (see follows). Otherwise the response is discarded.
+
+        :param state: Game state (class GameState)
+        :return: Nothing
+        """
+        dir_list = self.request.result()
+        self.request = None
+        if state.apple != self.apple:
+            self.discarded += 1
+            return
+        state.plans += 1
+        if not dir_list:
+            state.dir_list = []
+            state.stuck = 1
+            return
+        positions = [self.head]  # Squares of the path (from head during the request)
+        for dx, dy in reversed(dir_list):
+            positions.append((positions[-1][0] + dx, positions[-1][1] + dy))
+        for i in range(len(positions) - 2, -1, -1):  # Try to join the path as close to apple as possible
+            dx = positions[i][0] - state.head[0]
+            dy = positions[i][1] - state.head[1]
+            if (dx, dy) == (0, 0):
+                joined = dir_list[:len(dir_list) - i]
+            elif abs(dx) + abs(dy) == 1:
+                joined = dir_list[:len(dir_list) - i] + [(dx, dy)]
+            else:
+                continue
+            if self.follows(state, joined):
+                state.dir_list = joined
+                state.stuck = 0
+                return
+        self.discarded += 1
+
+    def follows(self, state, dir_list):
+        """
+        Check if path from the current head is free (body square is free, if it disappears before head arrival).
+
+        :param state: Game state (class GameState)
+        :param dir_list: List of direction (Last element is first direction to take)
+        :return: True, if path is free.
+        """
+        x, y = state.head
+        for g, (dx, dy) in enumerate(reversed(dir_list), 1):
+            x += dx
+            y += dy
+            if not (0 <= x < state.columns and 0 <= y < state.rows) or state.vacancy[x, y] - state.clock >= g:
+                return False
+        return True
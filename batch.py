@@ -0,0 +1,215 @@
+import numpy as np
+import math
+import astar
+import engine
+
+DIRECTIONS = np.array([(0, 1), (0, -1), (-1, 0), (1, 0)])  # Up, Down, Left, Right
+DIRECTION_CODES = {(0, 1): 0, (0, -1): 1, (-1, 0): 2, (1, 0): 3}  # Direction -> index in DIRECTIONS
+
+
+class BatchState:
+    """
+    Manages many snake games at once, all controlled by AI.
+
+    Game fields of all games are stacked in one numpy array (count, columns, rows)
+    and rules of the game (moving, collisions, eating and placing apples) are applied to all games at once.
+    Pathfinding algorithm is called only for games, which have no directions left.
+    Rules are same as in class GameState (file 'engine.py').
+    """
+
+    def __init__(self, count, columns=25, rows=25, seed=None):
+        """
+        Declaration of class parameters.
+
+        :param count: Number of games
+        :param columns: Number of tiles in one row
+        :param rows: Number of tiles in one column
+        :param seed: Seed for random generator (placing apples). None for random seed.
+        """
+        self.count = count  # Number of games
+        self.columns = columns  # Number of tiles in one row
+        self.rows = rows  # Number of tiles in one column
+        self.start_pos = (math.floor(self.columns / 2), math.floor(self.rows / 2))  # Starting position for snakes
+        self.rng = None  # Random generator for placing apples
+        self.game_fields = None  # Game fields of all games (count, columns, rows)
+        self.heads = None  # Positions of heads (count, 2)
+        self.apples = None  # Positions of apples (count, 2)
+        self.lengths = None  # Lengths of snakes
+        self.active = None  # Indicates if game is active
+        self.stuck = None  # Indicates if AI found no way to apple (-> Keep same direction for snake)
+        self.ticks = None  # Number of game-ticks in each game
+        self.final_scores = None  # Achieved scores
+        self.directions = None  # Directions of last move (count, 2)
+        self.paths = None  # Paths of AI as indexes to DIRECTIONS (Last used element is first direction to take)
+        self.path_lengths = None  # Number of directions left in paths
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """
+        Prepare new games.
+
+        :param seed: Seed for random generator (placing apples). None for random seed.
+        :return: Nothing
+        """
+        self.rng = np.random.default_rng(seed)
+        self.game_fields = np.full((self.count, self.columns, self.rows), 0,
+                                   dtype=engine.field_dtype(self.columns, self.rows))
+        self.heads = np.tile(np.array(self.start_pos), (self.count, 1))
+        self.lengths = np.full(self.count, 1)
+        self.active = np.full(self.count, True)
+        self.stuck = np.full(self.count, False)
+        self.ticks = np.full(self.count, 0)
+        self.final_scores = np.full(self.count, 0)
+        self.directions = np.full((self.count, 2), 0)
+        self.paths = np.full((self.count, self.columns * self.rows), 0, dtype=np.int8)
+        self.path_lengths = np.full(self.count, 0)
+        games = np.arange(self.count)
+        self.game_fields[games, self.heads[:, 0], self.heads[:, 1]] = 1
+        self.apples = np.full((self.count, 2), 0)
+        self.place_apples(games)
+
+    def place_apples(self, games):
+        """
+        Place apples in free area for selected games.
+
+        Every free square gets random key, square with the biggest key is selected (uniform choice).
+        When there is no free square, apple is placed at (-1, -1).
+
+        :param games: Indexes of games, which need new apple
+        :return: Nothing
+        """
+        if len(games) == 0:
+            return
+        keys = self.rng.random((len(games), self.columns, self.rows))
+        keys[self.game_fields[games] != 0] = -1
+        keys = keys.reshape(len(games), -1)
+        best = keys.argmax(axis=1)
+        full = keys[np.arange(len(games)), best] < 0
+        self.apples[games, 0], self.apples[games, 1] = np.divmod(best, self.rows)
+        self.apples[games[full]] = -1
+        placed = games[~full]
+        self.game_fields[placed, self.apples[placed, 0], self.apples[placed, 1]] = self.lengths[placed] + 1
+
+    def plan(self, games):
+        """
+        Calculate paths to apple for selected games.
+
+        Direct paths of all games are checked at once (see direct_paths),
+        A* algorithm is called only for games, where the direct path is blocked.
+
+        :param games: Indexes of games without directions
+        :return: Nothing
+        """
+        for i in games[~self.direct_paths(games)]:
+            dir_list = astar.calculate_path(self.game_fields[i], int(self.lengths[i]), tuple(self.heads[i].tolist()),
+                                            tuple(self.apples[i].tolist()), self.columns, self.rows)
+            if dir_list:
+                self.paths[i, :len(dir_list)] = [DIRECTION_CODES[d] for d in dir_list]
+                self.path_lengths[i] = len(dir_list)
+            else:
+                self.stuck[i] = True
+
+    def direct_paths(self, games):
+        """
+        Check shortest direct paths to apple for selected games at once and save free ones.
+
+        Direct path goes along X axis first, when apple is on the left, otherwise along Y axis first.
+        It is the path, which A* algorithm (astar.calculate_path) returns, when all its squares are free
+        (Body square is free, if it will disappear before head arrival).
+
+        :param games: Indexes of games without directions
+        :return: Numpy array, which indicates if direct path of the game was free (and saved to paths).
+        """
+        placed = self.apples[games, 0] >= 0
+        games = games[placed]
+        free = np.full(len(placed), False)
+        if len(games) == 0:
+            return free
+        delta = self.apples[games] - self.heads[games]
+        steps_x = np.abs(delta[:, :1])
+        steps_y = np.abs(delta[:, 1:])
+        lengths = steps_x[:, 0] + steps_y[:, 0]
+        tick = np.arange(1, lengths.max() + 1)  # Game-tick of arrival to the square of the path
+        x_first = delta[:, :1] < 0
+        move_x = np.where(x_first, tick <= steps_x, tick > steps_y)  # Indicates move along X axis
+        along_x = np.minimum(np.where(x_first, tick, tick - steps_y).clip(0), steps_x)
+        along_y = np.minimum(np.where(x_first, tick - steps_x, tick).clip(0), steps_y)
+        xs = self.heads[games, :1] + np.sign(delta[:, :1]) * along_x
+        ys = self.heads[games, 1:] + np.sign(delta[:, 1:]) * along_y
+        on_path = tick <= lengths[:, None]
+        value = self.game_fields[games[:, None], xs, ys]
+        blocked = on_path & (value != 0) & (value != self.lengths[games, None] + 1) & (value >= tick)
+        direct = ~blocked.any(axis=1)
+        free[np.flatnonzero(placed)[direct]] = True
+
+        # Save free paths (last used element is first direction to take)
+        codes = np.where(move_x, np.where(delta[:, :1] > 0, DIRECTION_CODES[(1, 0)], DIRECTION_CODES[(-1, 0)]),
+                         np.where(delta[:, 1:] > 0, DIRECTION_CODES[(0, 1)], DIRECTION_CODES[(0, -1)]))
+        found, step = np.nonzero(on_path & direct[:, None])
+        self.paths[games[found], lengths[found] - 1 - step] = codes[found, step]
+        self.path_lengths[games[direct]] = lengths[direct]
+        return free
+
+    def step_ai(self):
+        """
+        Move snakes of all active games by one square in the direction chosen by AI.
+
+        :return: Number of active games.
+        """
+        games = np.flatnonzero(self.active)
+        if len(games) == 0:
+            return 0
+        self.plan(games[(self.path_lengths[games] == 0) & ~self.stuck[games]])
+
+        # Take following direction from paths
+        moving = games[self.path_lengths[games] > 0]
+        self.path_lengths[moving] -= 1
+        self.directions[moving] = DIRECTIONS[self.paths[moving, self.path_lengths[moving]]]
+
+        # Collisions with borders and body
+        new_pos = self.heads[games] + self.directions[games]
+        wall = ((new_pos[:, 0] < 0) | (new_pos[:, 0] >= self.columns) |
+                (new_pos[:, 1] < 0) | (new_pos[:, 1] >= self.rows))
+        inside = np.clip(new_pos, 0, [self.columns - 1, self.rows - 1])
+        value = self.game_fields[games, inside[:, 0], inside[:, 1]]
+        body = ~wall & (0 < value) & (value < self.lengths[games])
+        dead = games[wall | body]
+        self.active[dead] = False
+        self.final_scores[dead] = self.lengths[dead] - 1
+        alive = ~(wall | body)
+        games = games[alive]
+        self.heads[games] = new_pos[alive]
+        self.ticks[games] += 1
+
+        # Eating apples
+        ate = games[(self.heads[games] == self.apples[games]).all(axis=1)]
+        self.lengths[ate] += 1
+        self.game_fields[ate] += self.game_fields[ate] != 0
+        self.place_apples(ate)
+        full = ate[self.apples[ate, 0] < 0]  # Whole board is filled
+        self.active[full] = False
+        self.final_scores[full] = self.lengths[full] - 1
+
+        # Update game fields
+        self.game_fields[games] -= 1
+        self.game_fields[games, self.heads[games, 0], self.heads[games, 1]] = self.lengths[games]
+        placed = games[self.apples[games, 0] >= 0]
+        self.game_fields[placed, self.apples[placed, 0], self.apples[placed, 1]] = self.lengths[placed] + 1
+        np.maximum(self.game_fields, 0, out=self.game_fields)
+        return len(games)
+
+    def run(self, max_ticks=None):
+        """
+        Play all games until all of them end.
+
+        :param max_ticks: Maximal number of game-ticks (None for no limit). Unfinished games are ended.
+        :return: Numpy array of achieved scores.
+        """
+        tick = 0
+        while self.step_ai() > 0:
+            tick += 1
+            if max_ticks is not None and tick >= max_ticks:
+                break
+        self.final_scores[self.active] = self.lengths[self.active] - 1
+        self.active[:] = False
+        return self.final_scores
@@ -0,0 +1,459 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import arena
+import astar
+import batch
+import engine
+import planners
+import wavefront
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')  # Stored results
+STATES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_states.npz')  # Recorded game states
+SIZES = [25, 50, 100, 200]  # Board sizes (columns = rows) of synthetic cases
+FILLS = [0.1, 0.3, 0.6]  # Parts of the board filled by the snake in synthetic cases
+FIELDS_PER_CASE = 8  # Number of different game fields in one case
+HIGHER_IS_WORSE = ['nodes', 'p50_ms', 'p99_ms', 'peak_kb']  # Metrics, which are worse when bigger
+LOWER_IS_WORSE = ['ops_per_sec', 'score']  # Metrics, which are worse when smaller
+STARTUP_TARGET_MS = 1000  # Maximal median cold start of batch worker (milliseconds)
+STARTUP_CODE = ('import sys; import runner; runner.play_game(0, 0, 10, 10, "astar"); '
+                'print("pyglet" in sys.modules)')  # Cold start of batch worker (import and one game)
+GAME_PLANNERS = ['astar', 'incremental', 'hamiltonian', 'wavefront']  # Pathfinding algorithms compared in whole games
+ARENA_SNAKES = [1, 8, 32]  # Numbers of snakes in arena cases (game-ticks per second as snake count grows)
+BATCH_GAMES = [10, 100, 1000]  # Numbers of games played by BatchState and one by one (games per second as count grows)
+QUICK_BATCH_GAMES = [10, 300]  # Numbers of games in quick run (BatchState is already faster with 300 games)
+
+
+def synthetic_field(size, fill, seed):
+    """
+    Create game field with snake filling part of the board.
+
+    Snake lies in the serpentine (column after column), starts at random place of the serpentine
+    and the board is randomly flipped and transposed. Apple is placed on random free square.
+
+    :param size: Number of tiles in one row and one column
+    :param fill: Part of the board filled by the snake (0-1)
+    :param seed: Seed for random generator
+    :return: Tuple of game field, length of the snake, head and apple.
+    """
+    rng = np.random.default_rng(seed)
+    length = max(1, int(size * size * fill))
+    order = np.arange(size * size).reshape(size, size)
+    order[1::2] = order[1::2, ::-1]  # Serpentine (every second column in opposite direction)
+    order = order.ravel()
+    first = int(rng.integers(0, size * size - length + 1))
+    game_field = np.full((size, size), 0)
+    body = order[first:first + length]
+    game_field.ravel()[body] = np.arange(1, length + 1)  # Tail has 1, head has length
+    if rng.integers(0, 2):
+        game_field = game_field[::-1]
+    if rng.integers(0, 2):
+        game_field = game_field[:, ::-1]
+    if rng.integers(0, 2):
+        game_field = game_field.T
+    game_field = np.ascontiguousarray(game_field)
+    head = tuple(int(i) for i in np.argwhere(game_field == length)[0])
+    empty = np.argwhere(game_field == 0)
+    apple = tuple(int(i) for i in empty[rng.integers(0, len(empty))])
+    game_field[apple] = length + 1
+    return game_field, length, head, apple
+
+
+def record_states(path=STATES, games=20, seed=0):
+    """
+    Play seeded games and save late-game situations (moment of the last calculated path).
+
+    :param path: File for saving the situations (.npz)
+    :param games: Number of games
+    :param seed: Seed of the first game
+    :return: Nothing
+    """
+    fields, info = [], []
+    for i in range(seed, seed + games):
+        state = engine.GameState(seed=i)
+        last = None
+        while state.active == 1:
+            if not state.dir_list and state.stuck == 0:
+                last = (state.game_field, state.length, state.head, state.apple)
+            state.step_ai()
+        fields.append(last[0].astype(np.int16))
+        info.append([last[1], last[2][0], last[2][1], last[3][0], last[3][1]])
+    np.savez_compressed(path, fields=np.array(fields), info=np.array(info))
+
+
+def recorded_states(path=STATES):
+    """
+    Load recorded late-game situations.
+
+    :param path: File with saved situations (.npz)
+    :return: List of tuples of game field, length of the snake, head and apple.
+    """
+    data = np.load(path)
+    return [(field.astype(np.int64), int(i[0]), (int(i[1]), int(i[2])), (int(i[3]), int(i[4])))
+            for field, i in zip(data['fields'], data['info'])]
+
+
+def bench_planner(planner, cases, repeat, min_time=0.2):
+    """
+    Measure pathfinding algorithm on list of game situations.
+
+    All situations are measured repeatedly, until there are at least 'repeat' rounds and 'min_time' seconds.
+
+    :param planner: Function with same parameters as astar.calculate_path
+    :param cases: List of tuples of game field, length of the snake, head and apple
+    :param repeat: Minimal number of measurements of each situation
+    :param min_time: Minimal measured time (seconds)
+    :return: Dictionary of metrics.
+    """
+    latencies = []
+    nodes = []
+    for game_field, length, head, apple in cases:
+        if planner is astar.calculate_path:
+            stats = {}
+            astar.search(game_field, length, head, apple, game_field.shape[0], game_field.shape[1], stats)
+            nodes.append(stats['expanded'])
+        planner(game_field, length, head, apple, game_field.shape[0], game_field.shape[1])  # Warm-up
+    rounds = 0
+    while rounds < repeat or sum(latencies) < min_time:
+        rounds += 1
+        for game_field, length, head, apple in cases:
+            start = time.perf_counter()
+            planner(game_field, length, head, apple, game_field.shape[0], game_field.shape[1])
+            latencies.append(time.perf_counter() - start)
+    game_field, length, head, apple = cases[0]
+    tracemalloc.start()
+    planner(game_field, length, head, apple, game_field.shape[0], game_field.shape[1])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return _metrics(latencies, nodes, peak)
+
+
+def bench_game(size, seeds, planner='incremental'):
+    """
+    Measure game-ticks of AI games (GameState.step_ai).
+
+    :param size: Number of tiles in one row and one column
+    :param seeds: Seeds of measured games
+    :param planner: Name of the pathfinding algorithm (key of planners.PLANNERS)
+    :return: Dictionary of metrics (with average score).
+    """
+    latencies = []
+    scores = []
+    tracemalloc.start()
+    for seed in seeds:
+        state = engine.GameState(size, size, seed, planners.create(planner))
+        while state.active == 1:
+            start = time.perf_counter()
+            state.step_ai()
+            latencies.append(time.perf_counter() - start)
+        scores.append(state.final_score)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return _metrics(latencies, [], peak, scores)
+
+
+def bench_batch(size, count, sequential=False, seed=0, repeat=3):
+    """
+    Measure whole AI games played at once (batch.BatchState) or one by one (engine.GameState with A*).
+
+    Same games are played 'repeat' times, duration of one game is measured as average of each repetition.
+
+    :param size: Number of tiles in one row and one column
+    :param count: Number of games
+    :param sequential: Play games one by one instead of all at once.
+    :param seed: Seed of the batch (seed of the first game, when games are played one by one)
+    :param repeat: Number of repetitions
+    :return: Dictionary of metrics (operation is one game, so ops_per_sec are games per second, memory is not measured).
+    """
+    latencies = []
+    for i in range(0, repeat):
+        start = time.perf_counter()
+        if sequential:
+            scores = []
+            for game in range(seed, seed + count):
+                state = engine.GameState(size, size, game, planners.create('astar'))
+                while state.step_ai():
+                    pass
+                scores.append(state.final_score)
+        else:
+            scores = batch.BatchState(count, size, size, seed).run().tolist()
+        latencies.append((time.perf_counter() - start) / count)
+    return _metrics(latencies, [], 0, scores)
+
+
+def bench_arena(size, snakes, ticks, seed=0):
+    """
+    Measure game-ticks of arena with many snakes (arena.Arena.step, planning of all snakes included).
+
+    :param size: Number of tiles in one row and one column
+    :param snakes: Number of snakes
+    :param ticks: Maximal number of game-ticks
+    :param seed: Seed of the arena
+    :return: Dictionary of metrics (score is sum of scores of all snakes, ticks is the limit of game-ticks).
+    """
+    latencies = []
+    tracemalloc.start()
+    game = arena.Arena(snakes, size, size, seed=seed)
+    while game.clock < ticks:
+        start = time.perf_counter()
+        alive = game.step()
+        latencies.append(time.perf_counter() - start)
+        if not alive:
+            break
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = _metrics(latencies, [], peak, [sum(snake.score for snake in game.snakes)])
+    result['ticks'] = ticks  # Score depends on number of game-ticks
+    return result
+
+
+def bench_startup(repeat=5):
+    """
+    Measure cold start of batch worker (new interpreter, import of game modules and one small game).
+
+    :param repeat: Number of started interpreters
+    :return: Dictionary of metrics (with indicator, if pyglet was imported).
+    """
+    latencies = []
+    pyglet = False
+    for i in range(0, repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', STARTUP_CODE], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        latencies.append(time.perf_counter() - start)
+        pyglet = pyglet or output.strip() == 'True'
+    result = _metrics(latencies, [], 0)
+    result['pyglet'] = pyglet
+    return result
+
+
+def startup_regressions(results, target=STARTUP_TARGET_MS):
+    """
+    Check cold start of batch worker.
+
+    :param results: Dictionary of results (case name -> metrics)
+    :param target: Maximal median cold start (milliseconds)
+    :return: List of messages about regressions (empty, when there is no regression).
+    """
+    regressions = []
+    startup = results.get('startup-worker')
+    if startup is not None:
+        if startup['p50_ms'] > target:
+            regressions.append('startup-worker p50_ms: {} > target {}'.format(startup['p50_ms'], target))
+        if startup['pyglet']:
+            regressions.append('startup-worker: pyglet was imported by batch worker')
+    return regressions
+
+
+def scaling_regressions(results):
+    """
+    Check, that BatchState plays more games per second than GameState with the biggest measured number of games.
+
+    :param results: Dictionary of results (case name -> metrics)
+    :return: List of messages about regressions (empty, when there is no regression).
+    """
+    counts = [count for count in BATCH_GAMES + QUICK_BATCH_GAMES if 'batch-10x10-{}'.format(count) in results]
+    if not counts:
+        return []
+    batch_case = 'batch-10x10-{}'.format(max(counts))
+    sequential_case = 'sequential-10x10-{}'.format(max(counts))
+    batch_speed = results[batch_case]['ops_per_sec']
+    sequential_speed = results[sequential_case]['ops_per_sec']
+    if batch_speed <= sequential_speed:
+        return ['{} ops_per_sec: {} <= {} of {}'.format(batch_case, batch_speed, sequential_speed, sequential_case)]
+    return []
+
+
+def _metrics(latencies, nodes, peak, scores=None):
+    """
+    Summarize measured values.
+
+    :param latencies: List of durations of operations (seconds)
+    :param nodes: List of numbers of checked squares (can be empty)
+    :param peak: Peak of allocated memory (bytes)
+    :param scores: List of achieved scores (None for measurement without games)
+    :return: Dictionary of metrics.
+    """
+    latencies = np.array(latencies)
+    return {'ops_per_sec': round(len(latencies) / latencies.sum(), 2),
+            'nodes': round(float(np.mean(nodes)), 1) if nodes else None,
+            'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 4),
+            'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 4),
+            'peak_kb': round(peak / 1024, 1),
+            'score': round(float(np.mean(scores)), 1) if scores else None}
+
+
+def run(quick=False):
+    """
+    Run all benchmark cases.
+
+    :param quick: Use only small boards and fewer repetitions.
+    :return: Dictionary of results (case name -> metrics).
+    """
+    results = {}
+    repeat = 3 if quick else 5
+    for size in (SIZES[:2] if quick else SIZES):
+        for fill in FILLS:
+            cases = [synthetic_field(size, fill, seed) for seed in range(0, FIELDS_PER_CASE)]
+            results['astar-{}x{}-fill{}'.format(size, size, fill)] = bench_planner(astar.calculate_path, cases, repeat)
+            results['wavefront-{}x{}-fill{}'.format(size, size, fill)] = bench_planner(wavefront.calculate_path,
+                                                                                      cases, repeat)
+    if os.path.exists(STATES):
+        results['astar-recorded'] = bench_planner(astar.calculate_path, recorded_states(), repeat * 3)
+        results['wavefront-recorded'] = bench_planner(wavefront.calculate_path, recorded_states(), repeat * 3)
+    results['startup-worker'] = bench_startup(3 if quick else 5)
+    results['game-25x25'] = bench_game(25, range(0, 2 if quick else 5))
+    for name in GAME_PLANNERS:  # Hamiltonian cycle needs even number of columns or rows
+        results['game-12x12-' + name] = bench_game(12, range(0, 2 if quick else 5), name)
+    for count in (QUICK_BATCH_GAMES if quick else BATCH_GAMES):
+        results['batch-10x10-{}'.format(count)] = bench_batch(10, count)
+        results['sequential-10x10-{}'.format(count)] = bench_batch(10, count, sequential=True)
+    for snakes in ARENA_SNAKES:
+        results['arena-64x64-{}'.format(snakes)] = bench_arena(64, snakes, 200 if quick else 500)
+    return results
+
+
+def median_results(runs):
+    """
+    Merge results of more runs (median of each metric), so one slow or fast run does not move the result.
+
+    :param runs: List of dictionaries of results (case name -> metrics)
+    :return: Dictionary of results (case name -> metrics).
+    """
+    results = {}
+    for case, values in runs[0].items():
+        results[case] = {}
+        for name, value in values.items():
+            if isinstance(value, bool):
+                results[case][name] = any(run[case][name] for run in runs)
+            elif value is None or name == 'ticks':
+                results[case][name] = value
+            else:
+                results[case][name] = round(float(np.median([run[case][name] for run in runs])), 4)
+    return results
+
+
+def load_baseline(path, mode):
+    """
+    Load baseline results of one mode.
+
+    Quick and full runs use different boards, seeds and game-ticks, so each mode has its own baseline
+    (keys 'quick' and 'full' of the file). File without modes is baseline of full run.
+
+    :param path: File with baseline results
+    :param mode: 'quick' or 'full'
+    :return: Dictionary of baseline results (case name -> metrics), empty if mode was not recorded.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        baseline = json.load(file)
+    if 'quick' not in baseline and 'full' not in baseline:
+        baseline = {'full': baseline}
+    return baseline.get(mode, {})
+
+
+def save_baseline(path, mode, results):
+    """
+    Save results as baseline of one mode (baseline of the other mode is kept).
+
+    :param path: File with baseline results
+    :param mode: 'quick' or 'full'
+    :param results: Dictionary of results (case name -> metrics)
+    :return: Nothing
+    """
+    baseline = {other: load_baseline(path, other) for other in ('quick', 'full') if other != mode}
+    baseline[mode] = results
+    with open(path, 'w') as file:
+        json.dump({name: values for name, values in baseline.items() if values}, file, indent=1, sort_keys=True)
+
+
+def compare(results, baseline, tolerance, metrics=None):
+    """
+    Compare results with baseline.
+
+    :param results: Dictionary of results (case name -> metrics)
+    :param baseline: Dictionary of baseline results (case name -> metrics)
+    :param tolerance: Allowed relative worsening (0.25 = 25 %)
+    :param metrics: List of compared metrics (None for all metrics)
+    :return: List of messages about regressions (empty, when there is no regression).
+    """
+    regressions = []
+    for case, values in results.items():
+        for name, value in values.items():
+            base = baseline.get(case, {}).get(name)
+            if value is None or not base or (metrics is not None and name not in metrics):
+                continue
+            if name == 'score' and values.get('ticks') != baseline[case].get('ticks'):
+                continue  # Games of different length (e.g. arena in quick run against full baseline)
+            if name in HIGHER_IS_WORSE and value > base * (1 + tolerance):
+                regressions.append('{} {}: {} > {} (+{:.0%})'.format(case, name, value, base, value / base - 1))
+            if name in LOWER_IS_WORSE and value < base * (1 - tolerance):
+                regressions.append('{} {}: {} < {} (-{:.0%})'.format(case, name, value, base, 1 - value / base))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Console entry point for benchmarks.
+
+    Prints table of results. With --check returns exit code 1, when some metric is worse than baseline
+    (or cold start is too slow, or BatchState is not faster than playing games one by one).
+
+    :param argv: Command line arguments (None for sys.argv)
+    :return: Exit code
+    """
+    parser = argparse.ArgumentParser(description='Benchmarks of pathfinding and game-ticks.')
+    parser.add_argument('--quick', action='store_true', help='only small boards and fewer repetitions')
+    parser.add_argument('--check', action='store_true', help='fail, when results are worse than baseline')
+    parser.add_argument('--runs', type=int, default=1,
+                        help='number of runs, median of each metric is used (default: 1, 3 or more for baseline)')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative worsening (default: 0.5)')
+    parser.add_argument('--metrics', default='ops_per_sec,nodes,p50_ms,peak_kb,score',
+                        help='comma separated list of checked metrics '
+                             '(default: ops_per_sec,nodes,p50_ms,peak_kb,score)')
+    parser.add_argument('--startup-target', type=float, default=STARTUP_TARGET_MS,
+                        help='maximal cold start of batch worker in ms (default: {})'.format(STARTUP_TARGET_MS))
+    parser.add_argument('--baseline', default=BASELINE, help='file with baseline results (quick and full run)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='save results as new baseline of the mode (quick or full)')
+    parser.add_argument('--record-states', action='store_true', help='record late-game situations and exit')
+    parser.add_argument('-o', '--output', default=None, help='save results to JSON file')
+    args = parser.parse_args(argv)
+
+    if args.record_states:
+        record_states()
+        return 0
+    results = median_results([run(args.quick) for i in range(0, max(1, args.runs))])
+    print('{:<28} {:>12} {:>10} {:>10} {:>10} {:>10} {:>8}'.format('case', 'ops/s', 'nodes', 'p50 ms', 'p99 ms',
+                                                                    'peak KB', 'score'))
+    for case, m in results.items():
+        print('{:<28} {:>12} {:>10} {:>10} {:>10} {:>10} {:>8}'.format(case, m['ops_per_sec'], str(m['nodes']),
+                                                                        m['p50_ms'], m['p99_ms'], m['peak_kb'],
+                                                                        str(m['score'])))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=1)
+    mode = 'quick' if args.quick else 'full'
+    if args.update_baseline:
+        save_baseline(args.baseline, mode, results)
+    if args.check:
+        baseline = load_baseline(args.baseline, mode)
+        if not baseline:
+            print('No {} baseline in {} (use --update-baseline)'.format(mode, args.baseline))
+        regressions = compare(results, baseline, args.tolerance, args.metrics.split(','))
+        regressions += startup_regressions(results, args.startup_target)
+        regressions += scaling_regressions(results)
+        for message in regressions:
+            print('REGRESSION ' + message)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
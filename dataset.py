@@ -0,0 +1,222 @@
+import glob
+import os
+import struct
+import uuid
+import numpy as np
+import engine
+import replay
+
+MAGIC = b'SNKD'  # Start of the shard file
+VERSION = 1  # Version of the file format
+HEADER = struct.Struct('<4sHHIIQ8x')  # Magic, version, bytes of one field value, columns, rows, number of samples
+COUNT_OFFSET = 16  # Position of the number of samples in the header
+BUFFER_SIZE = 4096  # Number of buffered samples before writing to the file
+SHARD_SIZE = 1 << 18  # Maximal number of samples in one shard file
+
+
+def sample_dtype(columns, rows, field_dtype=None):
+    """
+    Create type of one sample (fixed size record).
+
+    :param columns: Number of tiles in one row
+    :param rows: Number of tiles in one column
+    :param field_dtype: Integer type of the game field (None for the smallest type, see engine.field_dtype)
+    :return: Numpy structured type with 'field' (game field before the move, same as GameState.game_field),
+             'head' and 'apple' (positions) and 'direction' (code of the move, see replay.MOVES).
+    """
+    if field_dtype is None:
+        field_dtype = engine.field_dtype(columns, rows)
+    return np.dtype([('field', field_dtype, (columns, rows)), ('head', '<i2', (2,)), ('apple', '<i2', (2,)),
+                     ('direction', 'u1')])
+
+
+class Writer:
+    """
+    Writes samples (game situation and direction chosen by the snake) to shard files for training.
+
+    Every shard has small header (board, type of the field, number of samples) and fixed size samples
+    (see sample_dtype), so shards can be memory-mapped by class Dataset. Samples are written to the buffer
+    and appended to the shard when the buffer is full or on flush, then number of samples in the header
+    is updated. New shard is started after SHARD_SIZE samples. Every writer has its own shards
+    (name contains random tag), so more processes can write to the same directory.
+    """
+
+    def __init__(self, directory, columns, rows, shard_size=SHARD_SIZE, tag=None):
+        """
+        Declaration of class parameters.
+
+        :param directory: Directory for shard files (created, if it does not exist)
+        :param columns: Number of tiles in one row
+        :param rows: Number of tiles in one column
+        :param shard_size: Maximal number of samples in one shard file
+        :param tag: Part of names of the shard files (None for random tag)
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory  # Directory for shard files
+        self.columns = columns  # Number of tiles in one row
+        self.rows = rows  # Number of tiles in one column
+        self.shard_size = shard_size  # Maximal number of samples in one shard
+        self.tag = tag or uuid.uuid4().hex[:12]  # Part of names of the shard files
+        self.dtype = sample_dtype(columns, rows)  # Type of one sample
+        self.buffer = np.zeros(BUFFER_SIZE, dtype=self.dtype)  # Samples, which were not written yet
+        self.fields = self.buffer['field']  # Views of parts of buffered samples
+        self.heads = self.buffer['head']
+        self.apples = self.buffer['apple']
+        self.directions = self.buffer['direction']
+        self.buffered = 0  # Number of samples in the buffer
+        self.file = None  # Current shard file
+        self.shards = 0  # Number of created shards
+        self.count = 0  # Number of samples in current shard
+        self.samples = 0  # Number of written samples (all shards)
+
+    def add(self, state):
+        """
+        Add sample of the current game situation and direction of the next move
+        (called by GameState.step before each move, also before the last move, which ends the game).
+
+        :param state: Game state (class GameState) before the move
+        :return: Nothing
+        """
+        if state.columns != self.columns or state.rows != self.rows:
+            raise ValueError('Game {}x{} does not match dataset {}x{}'.format(state.columns, state.rows,
+                                                                               self.columns, self.rows))
+        i = self.buffered
+        field = self.fields[i]
+        np.subtract(state.vacancy, state.clock, out=field, casting='unsafe')
+        np.maximum(field, 0, out=field)
+        if state.apple != (-1, -1):
+            field[state.apple[0], state.apple[1]] = state.length + 1
+        self.heads[i] = state.head
+        self.apples[i] = state.apple
+        self.directions[i] = replay.MOVE_CODES[state.direction]
+        self.buffered += 1
+        if self.buffered == BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Append buffered samples to the shard files and update number of samples in their headers.
+
+        :return: Nothing
+        """
+        start = 0
+        while start < self.buffered:
+            if self.file is None or self.count == self.shard_size:
+                self.next_shard()
+            stop = min(self.buffered, start + self.shard_size - self.count)
+            self.file.write(self.buffer[start:stop].data)
+            self.count += stop - start
+            self.samples += stop - start
+            start = stop
+            self.file.seek(COUNT_OFFSET)
+            self.file.write(struct.pack('<Q', self.count))
+            self.file.seek(0, os.SEEK_END)
+            self.file.flush()
+        self.buffered = 0
+
+    def next_shard(self):
+        """
+        Close current shard and create new one.
+
+        :return: Nothing
+        """
+        if self.file is not None:
+            self.file.close()
+        path = os.path.join(self.directory, 'shard-{}-{:05d}.snkd'.format(self.tag, self.shards))
+        self.shards += 1
+        self.count = 0
+        self.file = open(path, 'w+b')
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.dtype['field'].base.itemsize, self.columns, self.rows, 0))
+
+    def close(self):
+        """
+        Write rest of the samples and close the shard file.
+
+        :return: Nothing
+        """
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class Dataset:
+    """
+    Reads all shards of the directory as one sequence of samples without loading them into memory.
+
+    Shards are memory-mapped, slices inside one shard are views of the file (without copying).
+    Only samples written when the dataset was opened are visible (number of samples in the header).
+    """
+
+    def __init__(self, directory):
+        """
+        Open and check all shard files of the directory.
+
+        :param directory: Directory with shard files
+        """
+        self.shards = []  # Memory-mapped shards (structured arrays, see sample_dtype)
+        self.columns = None  # Number of tiles in one row
+        self.rows = None  # Number of tiles in one column
+        for path in sorted(glob.glob(os.path.join(directory, 'shard-*.snkd'))):
+            with open(path, 'rb') as file:
+                magic, version, itemsize, columns, rows, count = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError('{} is not a dataset shard (version {})'.format(path, VERSION))
+            if self.columns is None:
+                self.columns, self.rows = columns, rows
+            elif (columns, rows) != (self.columns, self.rows):
+                raise ValueError('Shard {} has board {}x{}, dataset has {}x{}'.format(path, columns, rows,
+                                                                                     self.columns, self.rows))
+            if count:
+                dtype = sample_dtype(columns, rows, np.dtype('<i{}'.format(itemsize)))
+                self.shards.append(np.memmap(path, dtype=dtype, mode='r', offset=HEADER.size, shape=(count,)))
+        self.offsets = np.cumsum([0] + [len(shard) for shard in self.shards])  # First sample of each shard
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def locate(self, index):
+        """
+        Find shard of the sample.
+
+        :param index: Number of the sample in the dataset
+        :return: Tuple of number of the shard and number of the sample in the shard.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError('sample {} is out of range 0-{}'.format(index, len(self) - 1))
+        shard = int(np.searchsorted(self.offsets, index, side='right')) - 1
+        return shard, index - int(self.offsets[shard])
+
+    def __getitem__(self, key):
+        """
+        Get sample or samples.
+
+        :param key: Number of the sample or slice (step 1)
+        :return: Sample (structured record) or structured array of samples. Slice inside one shard
+                 is view of the file, slice across more shards is copied.
+        """
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError('Only slices with step 1 are supported')
+            if start >= stop:
+                return np.zeros(0, dtype=self.shards[0].dtype if self.shards else None)
+            first, offset = self.locate(start)
+            last = self.locate(stop - 1)[0]
+            if first == last:
+                return self.shards[first][offset:offset + stop - start]
+            return np.concatenate([self.shards[first][offset:]] + self.shards[first + 1:last] +
+                                  [self.shards[last][:stop - int(self.offsets[last])]])
+        shard, offset = self.locate(int(key) if key >= 0 else len(self) + int(key))
+        return self.shards[shard][offset]
+
+    def batches(self, batch_size):
+        """
+        Go through all samples in batches (views of the files, last batch of each shard can be smaller).
+
+        :param batch_size: Maximal number of samples in one batch
+        :return: Generator of structured arrays of samples.
+        """
+        for shard in self.shards:
+            for start in range(0, len(shard), batch_size):
+                yield shard[start:start + batch_size]
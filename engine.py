@@ -0,0 +1,637 @@
+import numpy as np
+import collections
+import copy
+import functools
+import math
+import time
+import astar
+
+SNAPSHOT_VALUES = ('head', 'apple', 'length', 'direction', 'clock', 'clock_base', 'ticks', 'active', 'cause',
+                   'final_score', 'stuck', 'seed', 'field_hash')  # Immutable values of GameState kept in snapshot
+HASH_MODULUS = (1 << 61) - 1  # Prime modulus of the hash of the game field
+HASH_CLOCK_LIMIT = 1 << 15  # Clock is moved back at least this often on big boards (size of hash tables)
+
+
+def field_dtype(columns, rows):
+    """
+    Select the smallest integer type for the game field.
+
+    Values of the game field are at most columns * rows + 1. Vacancy field keeps clock values,
+    so the type has space for at least twice as much (clock is moved back, when it reaches the limit).
+
+    :param columns: Number of tiles in one row
+    :param rows: Number of tiles in one column
+    :return: Numpy integer type.
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if np.iinfo(dtype).max >= 2 * (columns * rows + 1):
+            return dtype
+    return np.int64
+
+
+@functools.lru_cache(maxsize=None)
+def hash_tables(columns, rows, limit):
+    """
+    Create random keys and powers for hash of the game field (same for all games with same board).
+
+    Hash is sum of key[square] * base ** vacancy[square] over squares of the snake (Zobrist-like hash,
+    which is changed only for the head and the tail during the move). Multiplying by base ** -clock
+    gives same value for same game field at any clock (see GameState.field_key).
+
+    :param columns: Number of tiles in one row
+    :param rows: Number of tiles in one column
+    :param limit: Maximal value of the vacancy field and the clock
+    :return: Tuple of list of keys (x * rows + y), list of powers of base and list of powers of inverse base.
+    """
+    rng = np.random.default_rng(0x5EED)
+    keys = [int(key) for key in rng.integers(1, HASH_MODULUS, columns * rows, dtype=np.int64)]
+    base = int(rng.integers(2, HASH_MODULUS, dtype=np.int64))
+    inverse = pow(base, -1, HASH_MODULUS)
+    powers = [1] * (limit + 1)
+    inverse_powers = [1] * (limit + 1)
+    for i in range(1, limit + 1):
+        powers[i] = powers[i - 1] * base % HASH_MODULUS
+        inverse_powers[i] = inverse_powers[i - 1] * inverse % HASH_MODULUS
+    return keys, powers, inverse_powers
+
+
+class CellSet:
+    """
+    Set of squares with constant time adding, removing and random choice.
+
+    Squares are kept in list (in any order) and position of each square in that list is kept in second list.
+    Removed square is replaced by the last square of the list (swap-remove).
+    """
+
+    def __init__(self, columns, rows):
+        """
+        Declaration of class parameters. Set is filled with all squares.
+
+        :param columns: Number of tiles in one row
+        :param rows: Number of tiles in one column
+        """
+        self.rows = rows  # Number of tiles in one column
+        self.cells = list(range(0, columns * rows))  # Squares in set (x * rows + y)
+        self.position = list(range(0, columns * rows))  # Position of each square in cells (-1 if not in set)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, square):
+        return self.position[square[0] * self.rows + square[1]] != -1
+
+    def add(self, square):
+        """
+        Add square to the set.
+
+        :param square: Position of the square (x, y)
+        :return: Nothing
+        """
+        index = square[0] * self.rows + square[1]
+        if self.position[index] == -1:
+            self.position[index] = len(self.cells)
+            self.cells.append(index)
+
+    def remove(self, square):
+        """
+        Remove square from the set.
+
+        :param square: Position of the square (x, y)
+        :return: Nothing
+        """
+        index = square[0] * self.rows + square[1]
+        pos = self.position[index]
+        if pos != -1:
+            last = self.cells.pop()
+            if last != index:
+                self.cells[pos] = last
+                self.position[last] = pos
+            self.position[index] = -1
+
+    def choice(self, rng):
+        """
+        Select random square from the set.
+
+        :param rng: Numpy random generator
+        :return: Position of the square (x, y)
+        """
+        return divmod(self.cells[int(rng.integers(0, len(self.cells)))], self.rows)
+
+    def copy(self):
+        """
+        Create independent copy of the set.
+
+        :return: New set (class CellSet)
+        """
+        other = CellSet.__new__(CellSet)
+        other.rows = self.rows
+        other.cells = self.cells[:]
+        other.position = self.position[:]
+        return other
+
+
+class Snapshot:
+    """
+    Copy of the game situation, which can be restored later (see GameState.snapshot and GameState.restore).
+
+    Keeps only values, which change during the game (vacancy field, body, head, apple, clock, RNG state...),
+    settings of the game (size, planner, profiler, recorder) are not part of the snapshot.
+    """
+
+    __slots__ = ['vacancy', 'body', 'free', 'rng_state', 'values']
+
+    def __init__(self, vacancy, body, free, rng_state, values):
+        """
+        Declaration of class parameters.
+
+        :param vacancy: Copy of the vacancy field
+        :param body: Squares of the snake (tuple, last element is head)
+        :param free: Copy of the set of free squares (class CellSet)
+        :param rng_state: State of the random generator (bit_generator.state)
+        :param values: Tuple of other values (see SNAPSHOT_VALUES)
+        """
+        self.vacancy = vacancy  # Copy of the vacancy field
+        self.body = body  # Squares of the snake
+        self.free = free  # Copy of the set of free squares
+        self.rng_state = rng_state  # State of the random generator
+        self.values = values  # Other values of the game state (see SNAPSHOT_VALUES)
+
+
+class GameState:
+    """
+    Manages core snake game without any graphics.
+
+    Holds game situation (game field, head, apple, length and path of the AI)
+    and all in-game technical behavior. Can be used without window (batch runs, tests),
+    class Snake is only renderer and controller on top of it.
+    """
+
+    def __init__(self, columns=25, rows=25, seed=None, planner=astar.calculate_path):
+        """
+        Declaration of class parameters.
+
+        :param columns: Number of tiles in one row
+        :param rows: Number of tiles in one column
+        :param seed: Seed for random generator (placing apples). None for random seed.
+        :param planner: Function for calculating path (same parameters and return value as astar.calculate_path)
+                        or object with such method __call__ and method update(state) called every game-tick.
+        """
+        self.columns = columns  # Number of tiles in one row
+        self.rows = rows  # Number of tiles in one column
+        self.start_pos = (math.floor(self.columns / 2), math.floor(self.rows / 2))  # Starting position for snake
+        self.seed = seed  # Seed of the current game
+        self.rng = None  # Random generator for placing apples
+        self.planner = planner  # Pathfinding algorithm
+        self.planning_time = 0.0  # Seconds spent in pathfinding algorithm in current game
+        self.precheck_time = 0.0  # Seconds spent in checking reachability of apple (part of planning_time)
+        self.plans = 0  # Number of calls of pathfinding algorithm in current game
+        self.search_stats = {}  # Statistics of the last search (see astar.search)
+        self.profiler = None  # Profiler for recording durations of parts of the game-tick (None for no recording)
+        self.recorder = None  # Recorder of moves to replay file (replay.Recorder, None for no recording)
+        self.plan_cache = None  # Cache of calculated paths (plancache.PlanCache, None for no caching)
+        self.exporter = None  # Writer of samples for training (dataset.Writer, None for no export)
+        self.cause = ''  # Cause of the end of the game ('wall', 'body', 'full' or 'quit')
+        self.final_score = 0  # Achieved score
+        self.length = 1  # Length of snake (length of 1 is head without body)
+        self.active = 0  # Indicates if game is active (is inactive after crashing the snake or before the game.
+        self.ticks = 0  # Number of game-ticks in current game
+        self.direction = (0, 0)  # Direction for the next snake move (X axis, Y axis)
+        self.head = self.start_pos  # Position of head of the snake
+        self.apple = (-1, -1)  # Postion of apple
+        self.vacancy = None  # Numpy array with value of clock, when the square will be free
+        self.clock = 0  # Number of game-ticks, when snake did not grow (since the last move of clock back)
+        self.clock_base = 0  # Sum of all moves of clock back (clock + clock_base never goes back)
+        self.dtype = field_dtype(columns, rows)  # Integer type of the vacancy field
+        self.clock_limit = 0  # Maximal value of clock + length (clock is moved back, when it is reached)
+        self.field_hash = None  # Hash of the snake squares and their vacancy values (None, if hash is not kept)
+        self.hash_keys = None  # Random key of each square (None, until plan cache asks for hash)
+        self.hash_powers = None  # Powers of the hash base
+        self.hash_inverse_powers = None  # Powers of the inverse of the hash base
+        self.body = collections.deque()  # Squares of the snake (Last element is head)
+        self.free = None  # Squares without the snake
+        self.dir_list = []  # List of directions to take (Last element is first direction to take)
+        self.stuck = 0  # Indicates if AI found no way to apple (-> Keep same direction for snake)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """
+        Prepare new game.
+
+        Set mandatory parameters to new or default values.
+
+        :param seed: Seed for random generator (placing apples). None for random seed.
+        :return: Nothing
+        """
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.direction = (0, 0)
+        self.head = self.start_pos
+        self.length = 1
+        self.ticks = 0
+        self.planning_time = 0.0
+        self.precheck_time = 0.0
+        self.plans = 0
+        self.cause = ''
+        self.final_score = 0
+        self.apple = (int(self.rng.integers(0, self.columns)), int(self.rng.integers(0, self.rows)))
+        while self.apple == self.start_pos:  # Placing apple in empty space
+            self.apple = (int(self.rng.integers(0, self.columns)), int(self.rng.integers(0, self.rows)))
+        self.clock = 0
+        self.clock_base = 0
+        self.clock_limit = int(np.iinfo(self.dtype).max)
+        self.hash_keys = self.hash_powers = self.hash_inverse_powers = None
+        self.field_hash = None
+        self.vacancy = np.full((self.columns, self.rows), 0, dtype=self.dtype)  # Pre-filled with 0 (All are free)
+        self.body = collections.deque()
+        self.free = CellSet(self.columns, self.rows)
+        self.update_game_field(True)  # Positioning head
+        self.dir_list = []
+        self.stuck = 0
+        self.active = 1
+
+    @property
+    def game_field(self):
+        """
+        Numpy array representing game
+
+        Biggest number is apple, Biggest number-1 is head of the snake.
+        Other non-zero numbers is body of the snake (Number of game-ticks, until the square will be free).
+        Array is created on demand from vacancy field.
+
+        :return: Numpy array of the game situation
+        """
+        field = self.vacancy - self.clock
+        np.maximum(field, 0, out=field)
+        if self.apple != (-1, -1):
+            field[self.apple[0], self.apple[1]] = self.length + 1
+        return field
+
+    def field_key(self):
+        """
+        Hash of the game field without the apple (same for same snake at any clock and in any game with same board).
+
+        Hash is kept only after the first call (only games with plan cache pay for it).
+
+        :return: Integer hash
+        """
+        if self.hash_keys is None:
+            self.start_hash()
+        return self.field_hash * self.hash_inverse_powers[self.clock] % HASH_MODULUS
+
+    def start_hash(self):
+        """
+        Create hash tables and calculate hash of the game field from the body (then it is kept by each move).
+
+        Clock is moved back more often on big boards, so hash tables stay small (see HASH_CLOCK_LIMIT).
+
+        :return: Nothing
+        """
+        self.clock_limit = min(int(np.iinfo(self.dtype).max),
+                               max(HASH_CLOCK_LIMIT, 2 * (self.columns * self.rows + 1)))
+        self.hash_keys, self.hash_powers, self.hash_inverse_powers = hash_tables(self.columns, self.rows,
+                                                                                 self.clock_limit)
+        self.field_hash = 0
+        if self.clock + self.length > self.clock_limit:
+            self.rebase_clock()
+        self.field_hash = sum(self.hash_keys[x * self.rows + y] * self.hash_powers[self.vacancy[x, y]]
+                              for x, y in self.body) % HASH_MODULUS
+
+    def snapshot(self):
+        """
+        Save the game situation (see class Snapshot). Path of the AI is not saved.
+
+        :return: Snapshot of the game
+        """
+        return Snapshot(self.vacancy.copy(), tuple(self.body), self.free.copy(), self.rng.bit_generator.state,
+                        tuple(getattr(self, name) for name in SNAPSHOT_VALUES))
+
+    def restore(self, snapshot):
+        """
+        Return the game to the saved situation (same snapshot can be restored many times).
+
+        Path of the AI is cleared, so it is calculated again.
+
+        :param snapshot: Snapshot of the game (see snapshot)
+        :return: Nothing
+        """
+        if self.vacancy.shape == snapshot.vacancy.shape:
+            np.copyto(self.vacancy, snapshot.vacancy)
+        else:
+            self.vacancy = snapshot.vacancy.copy()
+        self.body = collections.deque(snapshot.body)
+        self.free = snapshot.free.copy()
+        self.rng.bit_generator.state = snapshot.rng_state
+        for name, value in zip(SNAPSHOT_VALUES, snapshot.values):
+            setattr(self, name, value)
+        if self.hash_keys is not None and (self.field_hash is None or self.clock + self.length > self.clock_limit):
+            self.start_hash()  # Snapshot was saved without hash
+        self.dir_list = []
+
+    def clone(self):
+        """
+        Create independent copy of the game (e.g. for trying moves of lookahead planner).
+
+        Copy has same game situation, random generator in same state (places same apples)
+        and same planner and plan cache, but no profiler, recorder and exporter.
+        Moves of the copy do not change this game.
+        Copying of the random generator is slower than restoring snapshot, so for many tries
+        one copy is created and snapshots are restored to it (see restore).
+
+        :return: New game state (class GameState)
+        """
+        other = GameState.__new__(GameState)
+        other.__dict__.update(self.__dict__)
+        other.vacancy = self.vacancy.copy()
+        other.body = self.body.copy()
+        other.free = self.free.copy()
+        other.rng = copy.deepcopy(self.rng)
+        other.dir_list = self.dir_list[:]
+        other.search_stats = {}
+        other.profiler = None
+        other.recorder = None
+        other.exporter = None
+        return other
+
+    def end_game(self, cause='quit'):
+        """
+        Set the game to its inactive state.
+
+        :param cause: Cause of the end of the game ('wall', 'body', 'full' or 'quit')
+        :return: Nothing
+        """
+        self.active = 0
+        self.cause = cause
+        self.final_score = self.length - 1
+
+    def get_direction(self):
+        """
+        Calls algorithm, which return calculated path from head to apple.
+
+        Used algorithm is set by parameter planner (basic A* by default).
+        Calculated path is saved as one of the class parameters. (dir_list)
+        Path is represented as list of direction,
+        which are selected one by one to direct snake for every following square.
+        Directions is used for telling the snake, where to move next each frame.
+
+        Directions:
+            Go up    = ( 0,  1)
+            Go down  = ( 0, -1)
+            Go left  = (-1,  0)
+            Go right = ( 1,  0)
+
+        :return: Nothing
+        """
+        start = time.perf_counter()
+        self.dir_list = self.find_path()
+        self.planning_time += time.perf_counter() - start
+        self.plans += 1
+        if not self.dir_list:
+            self.dir_list = []
+            self.stuck = 1
+
+    def find_path(self):
+        """
+        Calculate path from head to apple by the planner.
+
+        With plan cache, path is taken from the cache, when same situation (game field, head and apple)
+        was already calculated. Cache returns copy of the path, so taking directions does not change it.
+        Situation without path is stored too (empty list). Path of planner with limited work (e.g. BudgetPlanner),
+        which does not lead to apple, is not stored, so cached path is always complete.
+
+        :return: List of direction (None or empty list, if there is no path).
+        """
+        key = None
+        if self.plan_cache is not None:
+            key = (self.field_key(), self.length, self.head, self.apple)
+            dir_list = self.plan_cache.get(key)
+            if dir_list is not None:
+                self.search_stats.clear()
+                if hasattr(self.planner, 'complete'):
+                    self.planner.complete = True  # Stored path leads to apple (no search was stopped by limit)
+                return dir_list
+        if self.planner is astar.calculate_path:
+            dir_list = astar.search(self.game_field, self.length, self.head, self.apple,
+                                    self.columns, self.rows, self.search_stats)[0]
+        else:
+            dir_list = self.planner(self.game_field, self.length, self.head, self.apple, self.columns, self.rows)
+        if key is not None and getattr(self.planner, 'complete', True):
+            self.plan_cache.put(key, dir_list)
+        return dir_list
+
+    def record_plan(self):
+        """
+        Record statistics of the last calculated path to the profiler.
+
+        :return: Nothing
+        """
+        self.profiler.count('expanded', self.search_stats.get('expanded', 0))
+        self.profiler.count('max_opened', self.search_stats.get('max_opened', 0))
+        self.profiler.count('path_length', len(self.dir_list))
+        self.profiler.count('replans', self.plans)
+
+    def update_direction(self):
+        """
+        Change direction of the head of the snake.
+
+        Take following direction from direction list and set it as current direction.
+        Remove that direction from direction list.
+
+        :return: Nothing
+        """
+        if self.dir_list:
+            self.direction = self.dir_list.pop()
+
+    def place_apple(self):
+        """
+        Place apple in free area.
+
+        After taking the apple places apple in are, where is unocuppied space.
+        Square is selected from the set of free squares, which is updated with every move.
+
+        :return: Nothing
+        """
+        if self.length < self.columns * self.rows - 1:
+            self.apple = self.free.choice(self.rng)
+        else:
+            self.apple = (-1, -1)
+
+    def collision_sides(self):
+        """
+        Check for collisions with window borders.
+
+        :return: Nothing
+        """
+        new_pos = (self.head[0] + self.direction[0], self.head[1] + self.direction[1])
+        if new_pos[0] < 0 or new_pos[0] > self.columns - 1 or new_pos[1] < 0 or new_pos[1] > self.rows - 1:
+            self.end_game('wall')
+
+    def collision_apple(self):
+        """
+        Check if snake eated the apple.
+
+        When snake hits the apple, increase the length of the snake.
+
+        :return: True, if apple was eaten, otherwise False.
+        """
+        if self.head[0] == self.apple[0] and self.head[1] == self.apple[1]:
+            self.length = self.length + 1
+            return True
+        return False
+
+    def collision_body(self):
+        """
+        Check if snake hit itself.
+
+        If yes, then end the game.
+
+        :return: Nothing
+        """
+        new_pos = (self.head[0] + self.direction[0], self.head[1] + self.direction[1])
+        if new_pos[0] >= self.columns or new_pos[1] >= self.rows:
+            self.end_game('wall')
+        elif 0 < self.vacancy[new_pos[0], new_pos[1]] - self.clock < self.length:
+            self.end_game('body')
+
+    def is_free(self, direction):
+        """
+        Check if head can move in the direction during next game-tick.
+
+        :param direction: Direction of the move
+        :return: True, if square is inside the game and it is not body of the snake.
+        """
+        x = self.head[0] + direction[0]
+        y = self.head[1] + direction[1]
+        return 0 <= x < self.columns and 0 <= y < self.rows and self.vacancy[x, y] <= self.clock
+
+    def survival_move(self):
+        """
+        Select direction, when there is no path to apple.
+
+        Selects free square with the most free neighbours (squares free during following game-tick).
+        Current direction is preferred, when more squares are equally good.
+
+        :return: Direction of the move
+        """
+        best = self.direction
+        best_value = -1
+        for direction in (self.direction, (0, 1), (0, -1), (-1, 0), (1, 0)):
+            if direction == (0, 0) or not self.is_free(direction):
+                continue
+            x = self.head[0] + direction[0]
+            y = self.head[1] + direction[1]
+            value = 0
+            for nx, ny in ((x, y + 1), (x, y - 1), (x - 1, y), (x + 1, y)):
+                if (0 <= nx < self.columns and 0 <= ny < self.rows and (nx, ny) != self.head and
+                        self.vacancy[nx, ny] <= self.clock + 1):
+                    value += 1
+            if value > best_value:
+                best = direction
+                best_value = value
+        return best
+
+    def update_game_field(self, grow=False):
+        """
+        Update body of the snake and vacancy field after move of the head.
+
+        Only squares of the head and the tail are changed.
+        When snake did not grow, clock moves and the tail square is free.
+        When snake grows, clock stays (All squares of the body stay one game-tick longer).
+        Hash of the game field is changed only for the head and the tail (see hash_tables).
+
+        :param grow: Indicates if snake has eaten apple during this game-tick.
+        :return: Nothing
+        """
+        if not grow:
+            self.clock += 1
+            tail = self.body.popleft()
+            self.free.add(tail)
+            if self.hash_keys is not None:
+                self.field_hash -= (self.hash_keys[tail[0] * self.rows + tail[1]] *
+                                    self.hash_powers[self.vacancy[tail[0], tail[1]]])
+        if self.clock + self.length > self.clock_limit:
+            self.rebase_clock()
+        self.body.append(self.head)
+        self.free.remove(self.head)
+        self.vacancy[self.head[0], self.head[1]] = self.clock + self.length
+        if self.hash_keys is not None:
+            self.field_hash = (self.field_hash + self.hash_keys[self.head[0] * self.rows + self.head[1]] *
+                               self.hash_powers[self.clock + self.length]) % HASH_MODULUS
+
+    def rebase_clock(self):
+        """
+        Move clock back to 0, so values of vacancy field fit into its integer type.
+
+        Happens at most once per columns * rows game-ticks (see field_dtype and HASH_CLOCK_LIMIT).
+
+        :return: Nothing
+        """
+        if self.hash_keys is not None:
+            self.field_hash = self.field_hash * self.hash_inverse_powers[self.clock] % HASH_MODULUS
+        np.maximum(self.vacancy, self.clock, out=self.vacancy)
+        self.vacancy -= self.clock
+        self.clock_base += self.clock
+        self.clock = 0
+
+    def step(self, direction=None):
+        """
+        Move the snake by one square.
+
+        Check for collisions, update positions and game field.
+
+        :param direction: Direction of the move. None for keeping current direction.
+        :return: True, if game is still active, otherwise False.
+        """
+        if self.active != 1:
+            return False
+        if direction is not None:
+            self.direction = direction
+        if self.exporter is not None:
+            self.exporter.add(self)
+        profiler = self.profiler
+        if profiler is not None:
+            start = time.perf_counter()
+        self.collision_sides()
+        if self.active == 1:
+            self.collision_body()
+        if profiler is not None:
+            middle = time.perf_counter()
+            profiler.add('collisions', start, middle)
+        if self.active == 1:
+            self.ticks += 1
+            self.head = (self.head[0] + self.direction[0], self.head[1] + self.direction[1])
+            grow = self.collision_apple()
+            self.update_game_field(grow)
+            if grow:
+                self.place_apple()
+                if self.apple == (-1, -1):  # Whole board is filled
+                    self.end_game('full')
+            if self.recorder is not None:
+                self.recorder.record(self.direction, self.apple if grow else None)
+            if profiler is not None:
+                profiler.add('game_field', middle, time.perf_counter())
+        return self.active == 1
+
+    def step_ai(self):
+        """
+        Move the snake by one square in the direction chosen by AI.
+
+        Path is calculated, when there are no directions left.
+        Planner with method update (e.g. IncrementalPlanner) is called every game-tick instead.
+
+        :return: True, if game is still active, otherwise False.
+        """
+        if self.active != 1:
+            return False
+        start = time.perf_counter()
+        plans = self.plans
+        if hasattr(self.planner, 'update'):  # Planner checks (and repairs) the path every game-tick
+            self.planner.update(self)
+            self.planning_time += time.perf_counter() - start
+        elif not self.dir_list and self.stuck == 0:
+            self.get_direction()
+        if self.profiler is not None:
+            self.profiler.add('planning', start, time.perf_counter())
+            if self.plans != plans:
+                self.record_plan()
+        self.update_direction()
+        return self.step()
@@ -0,0 +1,129 @@
+import functools
+
+DIRECTIONS = [(0, 1), (0, -1), (-1, 0), (1, 0)]  # Up, Down, Left, Right
+
+
+@functools.lru_cache(maxsize=None)
+def cycle(columns, rows):
+    """
+    Create Hamiltonian cycle (closed path through all squares) for the board. Cycle is created once for each size.
+
+    Cycle goes up the first column, then in serpentine through other columns (without the first row)
+    and returns along the first row. When number of columns is odd, rows are used instead of columns.
+
+    :param columns: Number of tiles in one row
+    :param rows: Number of tiles in one column
+    :return: Tuple of two tuples indexed by square (x * rows + y):
+             position of the square in the cycle and direction to the following square.
+    """
+    HamiltonianPlanner.check_board(columns, rows)
+    transposed = columns % 2 == 1
+    if transposed:
+        columns, rows = rows, columns
+    path = [(0, y) for y in range(0, rows)]
+    for x in range(1, columns):
+        path += [(x, y) for y in (range(rows - 1, 0, -1) if x % 2 else range(1, rows))]
+    path += [(x, 0) for x in range(columns - 1, 0, -1)]
+    if transposed:
+        columns, rows = rows, columns
+        path = [(y, x) for x, y in path]
+    order = [0] * (columns * rows)
+    steps = [(0, 0)] * (columns * rows)
+    for i, (x, y) in enumerate(path):
+        following = path[(i + 1) % len(path)]
+        order[x * rows + y] = i
+        steps[x * rows + y] = (following[0] - x, following[1] - y)
+    return tuple(order), tuple(steps)
+
+
+class HamiltonianPlanner:
+    """
+    Pathfinding, which moves the snake along Hamiltonian cycle of the board.
+
+    Body of the snake lies on the cycle in the same order as the cycle, so following the cycle never crashes
+    and the snake fills the whole board. Every game-tick only head, tail and apple are looked up in the cycle
+    (cost does not depend on length of the snake).
+    Shortcut (move to neighbour square further in the cycle) is taken only when it does not skip the apple
+    and at least half of the cycle stays free in front of the head (squares skipped by shortcuts are free
+    only after the tail passes them, so growing snake needs the free part of the cycle in front of it).
+    """
+
+    def __init__(self, shortcuts=True, shortcut_limit=0.5):
+        """
+        Declaration of class parameters.
+
+        :param shortcuts: Indicates if shortcuts are taken
+        :param shortcut_limit: Maximal part of the cycle between tail and head (including skipped squares)
+                               after shortcut
+        """
+        self.shortcuts = shortcuts  # Indicates if shortcuts are taken
+        self.shortcut_limit = shortcut_limit  # Maximal part of the cycle between tail and head after shortcut
+
+    @staticmethod
+    def check_board(columns, rows):
+        """
+        Check, that Hamiltonian cycle exists for the board (see planners.check).
+
+        :param columns: Number of tiles in one row
+        :param rows: Number of tiles in one column
+        :return: Nothing
+        """
+        if columns < 2 or rows < 2 or (columns % 2 and rows % 2):
+            raise ValueError('Hamiltonian cycle does not exist for board {}x{} '
+                             '(both sides must be at least 2 and one of them even)'.format(columns, rows))
+
+    def __call__(self, game_field, length, head, apple, width, height):
+        """
+        Calculate path to apple along the cycle (without shortcuts).
+
+        :param game_field: Numpy array of the game situation
+        :param length: Length of the snake
+        :param head: Position of the head of the snake
+        :param apple: Position of the apple
+        :param width: Columns in game (squares in one row).
+        :param height: Rows in game (squares in one column).
+        :return: List of direction (where to move square by square).
+        """
+        steps = cycle(width, height)[1]
+        if not (0 <= apple[0] < width and 0 <= apple[1] < height):
+            return None
+        dir_list = []
+        square = (head[0], head[1])
+        while square != (apple[0], apple[1]):
+            direction = steps[square[0] * height + square[1]]
+            dir_list.append(direction)
+            square = (square[0] + direction[0], square[1] + direction[1])
+        dir_list.reverse()
+        return dir_list
+
+    def update(self, state):
+        """
+        Select direction of the next move. Called every game-tick.
+
+        :param state: Game state (class GameState)
+        :return: Nothing
+        """
+        order, steps = cycle(state.columns, state.rows)
+        rows = state.rows
+        size = state.columns * rows
+        head = state.head
+        position = order[head[0] * rows + head[1]]
+        direction = steps[head[0] * rows + head[1]]
+        if self.shortcuts and state.apple != (-1, -1):
+            tail = state.body[0]
+            tail_distance = (order[tail[0] * rows + tail[1]] - position - 1) % size + 1  # Head is tail -> size
+            apple_distance = (order[state.apple[0] * rows + state.apple[1]] - position) % size
+            limit = size * (1 - self.shortcut_limit)  # Minimal free part of the cycle in front of the head
+            best = 1
+            for dx, dy in DIRECTIONS:
+                x = head[0] + dx
+                y = head[1] + dy
+                if not (0 <= x < state.columns and 0 <= y < rows):
+                    continue
+                distance = (order[x * rows + y] - position) % size
+                if (best < distance <= apple_distance and tail_distance - distance - 1 >= limit and
+                        state.vacancy[x, y] <= state.clock):
+                    best = distance
+                    direction = (dx, dy)
+        state.dir_list = []
+        state.direction = direction
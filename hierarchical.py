@@ -0,0 +1,402 @@
+import heapq
+import numpy as np
+import astar
+
+CLUSTER_SIZE = 16  # Number of tiles in one row and one column of cluster
+LONG_ENTRANCE = 6  # Free part of border at least this long has two entrances (at its ends), otherwise one
+
+
+def entrances(free):
+    """
+    Find entrances of the border between two clusters.
+
+    :param free: Numpy bool array of squares along the border (True, if squares on both sides are free)
+    :return: List of positions along the border (middle of short free part, both ends of long free part).
+    """
+    result = []
+    start = None
+    for i, value in enumerate(free.tolist() + [False]):
+        if value and start is None:
+            start = i
+        elif not value and start is not None:
+            if i - start >= LONG_ENTRANCE:
+                result += [start, i - 1]
+            else:
+                result.append((start + i - 1) // 2)
+            start = None
+    return result
+
+
+def distances_in(cells, stride, start):
+    """
+    Calculate distance from start to every square of the cluster (breadth-first search).
+
+    :param cells: Flat list of squares of the cluster surrounded by blocked squares (see padded_cells)
+    :param stride: Distance of neighbouring squares in row (rows of the cluster + 2)
+    :param start: Index of the start square (it can be blocked, e.g. head)
+    :return: Flat list of distances (-1 for unreachable square).
+    """
+    distances = [-1] * len(cells)
+    distances[start] = 0
+    seen = cells[:]  # Blocked or already reached squares
+    seen[start] = True
+    queue = [start]
+    for index in queue:  # Queue grows during the loop
+        distance = distances[index] + 1
+        for nxt in (index - stride, index + stride, index - 1, index + 1):
+            if not seen[nxt]:
+                seen[nxt] = True
+                distances[nxt] = distance
+                queue.append(nxt)
+    return distances
+
+
+def padded_cells(blocked):
+    """
+    Convert squares of the cluster to flat list with blocked squares around (no bounds checks in search).
+
+    :param blocked: Numpy bool array of squares of the cluster (True for blocked square)
+    :return: Flat list (index (x + 1) * (rows + 2) + y + 1), True for blocked square.
+    """
+    padded = np.ones((blocked.shape[0] + 2, blocked.shape[1] + 2), dtype=bool)
+    padded[1:-1, 1:-1] = blocked
+    return padded.ravel().tolist()
+
+
+class HierarchicalPlanner:
+    """
+    Pathfinding on two levels for very big boards (HPA*).
+
+    Board is split into clusters. Entrances are free squares on borders of neighbouring clusters,
+    abstract graph connects entrances of one cluster by their distances inside the cluster
+    and entrances on both sides of the border. Path is first searched in abstract graph (A*),
+    then only its leading segment (at least refine_distance squares) is refined by astar.search
+    in the window of clusters, which the segment goes through. Refinement uses the same rule
+    for body of the snake as astar.calculate_path, abstract graph takes whole body as walls.
+    Snake follows the segment and searches again at its end, for new apple or when next square is blocked.
+
+    Clusters are built only when the abstract search reaches them. Before each search, only clusters
+    which the body entered or left since the last search (and their neighbours, if entrances
+    on the shared border changed) are invalidated. When abstract search does not find path
+    (e.g. through squares of the tail, which will be free), flat A* on the whole board is used.
+    """
+
+    def __init__(self, cluster_size=CLUSTER_SIZE, refine_distance=None):
+        """
+        Declaration of class parameters.
+
+        :param cluster_size: Number of tiles in one row and one column of cluster
+        :param refine_distance: Minimal length of refined segment of abstract path (None for two clusters)
+        """
+        self.cluster_size = cluster_size  # Number of tiles in one row and one column of cluster
+        self.refine_distance = refine_distance or 2 * cluster_size  # Minimal length of refined segment
+        self.columns = None  # Columns of the board, for which abstract graph is built
+        self.rows = None  # Rows of the board, for which abstract graph is built
+        self.blocked = None  # Numpy bool array of squares, which are walls in abstract graph (body of the snake)
+        self.body = set()  # Squares of the body at the last search
+        self.ticks = 0  # Game-tick of the last search
+        self.borders = {}  # Border ('v' or 'h', x, y of first cluster) -> list of pairs of entrance squares
+        self.clusters = {}  # Cluster (x, y) -> abstract graph inside it (entrance -> list of (square, distance))
+        self.apple = None  # Apple, for which was path calculated
+        self.built = 0  # Number of built clusters
+        self.invalidated = 0  # Number of invalidated clusters
+        self.expanded = 0  # Number of checked entrances (last abstract search)
+        self.fallbacks = 0  # Number of searches by flat A*
+
+    def __call__(self, game_field, length, head, apple, width, height):
+        """
+        Calculate leading segment of path from head to apple (same parameters as astar.calculate_path).
+
+        Changed squares are found by comparing whole game field (update with state tracks only the body).
+
+        :param game_field: Numpy array of the game situation
+        :param length: Length of the snake
+        :param head: Position of the head of the snake
+        :param apple: Position of the apple
+        :param width: Columns in game (squares in one row).
+        :param height: Rows in game (squares in one column).
+        :return: List of direction (to apple or to the end of the refined segment).
+        """
+        blocked = (game_field != 0) & (game_field != length + 1)
+        if self.blocked is None or (self.columns, self.rows) != (width, height):
+            self.reset(width, height, blocked)
+        else:
+            changed = [tuple(square) for square in np.argwhere(blocked != self.blocked).tolist()]
+            self.blocked = blocked
+            self.invalidate(changed)
+        self.body = set()  # Body is not known, next update compares whole game field
+        self.ticks = 0
+        return self.plan(head, apple, length, game_field, 0)
+
+    def update(self, state):
+        """
+        Follow refined segment or search again. Called every game-tick.
+
+        :param state: Game state (class GameState)
+        :return: Nothing
+        """
+        if state.apple != self.apple or not state.dir_list or not state.is_free(state.dir_list[-1]):
+            self.replan(state)
+        if not state.dir_list:
+            state.direction = state.survival_move()
+
+    def replan(self, state):
+        """
+        Update abstract graph by squares, which the body entered or left, and calculate new segment of path.
+
+        :param state: Game state (class GameState)
+        :return: Nothing
+        """
+        self.apple = state.apple
+        state.plans += 1
+        body = set(state.body)
+        if (self.blocked is None or (self.columns, self.rows) != (state.columns, state.rows) or
+                state.ticks < self.ticks or not self.body):
+            self.reset(state.columns, state.rows, state.vacancy > state.clock)
+        else:
+            changed = self.body ^ body
+            for square in changed:
+                self.blocked[square] = square in body
+            self.invalidate(changed)
+        self.body = body
+        self.ticks = state.ticks
+        state.dir_list = self.plan(state.head, state.apple, state.length, state.vacancy, state.clock) or []
+
+    def reset(self, columns, rows, blocked):
+        """
+        Forget abstract graph (new game or board).
+
+        :param columns: Number of tiles in one row
+        :param rows: Number of tiles in one column
+        :param blocked: Numpy bool array of squares of the body
+        :return: Nothing
+        """
+        self.columns = columns
+        self.rows = rows
+        self.blocked = blocked
+        self.borders = {}
+        self.clusters = {}
+
+    def cluster_of(self, square):
+        """
+        Find cluster of the square.
+
+        :param square: Position of the square
+        :return: Position of the cluster (x, y)
+        """
+        return square[0] // self.cluster_size, square[1] // self.cluster_size
+
+    def bounds(self, cluster):
+        """
+        Find squares of the cluster (clusters at the edges of the board can be smaller).
+
+        :param cluster: Position of the cluster
+        :return: Tuple of first column, column after the last, first row and row after the last.
+        """
+        x0 = cluster[0] * self.cluster_size
+        y0 = cluster[1] * self.cluster_size
+        return x0, min(x0 + self.cluster_size, self.columns), y0, min(y0 + self.cluster_size, self.rows)
+
+    def neighbours(self, cluster):
+        """
+        Find borders of the cluster.
+
+        :param cluster: Position of the cluster
+        :return: List of (border, neighbouring cluster).
+        """
+        cx, cy = cluster
+        result = []
+        if cx > 0:
+            result.append((('v', cx - 1, cy), (cx - 1, cy)))
+        if (cx + 1) * self.cluster_size < self.columns:
+            result.append((('v', cx, cy), (cx + 1, cy)))
+        if cy > 0:
+            result.append((('h', cx, cy - 1), (cx, cy - 1)))
+        if (cy + 1) * self.cluster_size < self.rows:
+            result.append((('h', cx, cy), (cx, cy + 1)))
+        return result
+
+    def border(self, key):
+        """
+        Find entrances of the border (from current abstract walls).
+
+        :param key: Border ('v' for border with the right cluster, 'h' with the upper cluster, first cluster)
+        :return: List of pairs of neighbouring squares (square in first cluster, square in second cluster).
+        """
+        direction, cx, cy = key
+        if direction == 'v':
+            x = (cx + 1) * self.cluster_size - 1
+            y0, y1 = self.bounds((cx, cy))[2:]
+            free = ~(self.blocked[x, y0:y1] | self.blocked[x + 1, y0:y1])
+            return [((x, y0 + i), (x + 1, y0 + i)) for i in entrances(free)]
+        y = (cy + 1) * self.cluster_size - 1
+        x0, x1 = self.bounds((cx, cy))[:2]
+        free = ~(self.blocked[x0:x1, y] | self.blocked[x0:x1, y + 1])
+        return [((x0 + i, y), (x0 + i, y + 1)) for i in entrances(free)]
+
+    def invalidate(self, squares):
+        """
+        Invalidate clusters of changed squares (they are built again, when abstract search reaches them).
+
+        Known borders of these clusters are found again. When entrances of the border changed,
+        also the cluster on the other side is invalidated.
+
+        :param squares: Squares, which were blocked or freed (self.blocked is already changed)
+        :return: Nothing
+        """
+        dirty = {self.cluster_of(square) for square in squares}
+        for cluster in list(dirty):
+            for key, other in self.neighbours(cluster):
+                if key in self.borders:
+                    pairs = self.border(key)
+                    if pairs != self.borders[key]:
+                        self.borders[key] = pairs
+                        dirty.add(other)
+        for cluster in dirty:
+            if self.clusters.pop(cluster, None) is not None:
+                self.invalidated += 1
+
+    def graph(self, cluster):
+        """
+        Get abstract graph inside the cluster (built, if it is not valid).
+
+        :param cluster: Position of the cluster
+        :return: Dictionary (entrance -> list of (square, distance)), including entrances on the other side.
+        """
+        if cluster in self.clusters:
+            return self.clusters[cluster]
+        graph = {}
+        for key, other in self.neighbours(cluster):
+            if key not in self.borders:
+                self.borders[key] = self.border(key)
+            for pair in self.borders[key]:
+                inside, outside = pair if self.cluster_of(pair[0]) == cluster else pair[::-1]
+                graph.setdefault(inside, []).append((outside, 1))
+        x0, x1, y0, y1 = self.bounds(cluster)
+        stride = y1 - y0 + 2
+        blocked = self.blocked[x0:x1, y0:y1]
+        cells = padded_cells(blocked) if blocked.any() else None  # Distances in empty cluster are Manhattan
+        nodes = list(graph)
+        for i, node in enumerate(nodes):
+            if cells is not None:
+                distances = distances_in(cells, stride, (node[0] - x0 + 1) * stride + node[1] - y0 + 1)
+            for other in nodes[i + 1:]:
+                if cells is None:
+                    distance = abs(node[0] - other[0]) + abs(node[1] - other[1])
+                else:
+                    distance = distances[(other[0] - x0 + 1) * stride + other[1] - y0 + 1]
+                if distance > 0:
+                    graph[node].append((other, distance))
+                    graph[other].append((node, distance))
+        self.clusters[cluster] = graph
+        self.built += 1
+        return graph
+
+    def local_edges(self, square, target=None):
+        """
+        Connect square (head or apple) to entrances of its cluster.
+
+        :param square: Position of the square
+        :param target: Other square in the same cluster (None for no other square)
+        :return: List of (square, distance) for reachable entrances (and target).
+        """
+        cluster = self.cluster_of(square)
+        x0, x1, y0, y1 = self.bounds(cluster)
+        stride = y1 - y0 + 2
+        nodes = list(self.graph(cluster))
+        if target is not None:
+            nodes.append(target)
+        blocked = self.blocked[x0:x1, y0:y1]
+        if not blocked.any():  # Empty cluster
+            return [(node, abs(node[0] - square[0]) + abs(node[1] - square[1])) for node in nodes if node != square]
+        distances = distances_in(padded_cells(blocked), stride, (square[0] - x0 + 1) * stride + square[1] - y0 + 1)
+        edges = [(node, distances[(node[0] - x0 + 1) * stride + node[1] - y0 + 1]) for node in nodes]
+        return [(node, distance) for node, distance in edges if distance > 0]
+
+    def search(self, head, apple):
+        """
+        A* algorithm in abstract graph.
+
+        :param head: Position of the head of the snake
+        :param apple: Position of the apple
+        :return: List of (square, distance from head) from head to apple, None if there is no abstract path.
+        """
+        same = self.cluster_of(head) == self.cluster_of(apple)
+        start_edges = self.local_edges(head, apple if same else None)
+        goal_edges = dict(self.local_edges(apple))  # Distance from entrance of the apple cluster to apple
+        best = {head: 0}  # Lowest known distance from head
+        parent = {head: None}
+        opened = [(abs(head[0] - apple[0]) + abs(head[1] - apple[1]), 0, head)]
+        self.expanded = 0
+        while opened:
+            f, g, node = heapq.heappop(opened)
+            if g > best[node]:  # Outdated entry
+                continue
+            if node == apple:
+                path = []
+                while node is not None:
+                    path.append((node, best[node]))
+                    node = parent[node]
+                return path[::-1]
+            self.expanded += 1
+            edges = start_edges if node == head else self.graph(self.cluster_of(node))[node]
+            if node in goal_edges:
+                edges = edges + [(apple, goal_edges[node])]
+            for nxt, distance in edges:
+                ng = g + distance
+                if ng < best.get(nxt, ng + 1):
+                    best[nxt] = ng
+                    parent[nxt] = node
+                    heapq.heappush(opened, (ng + abs(nxt[0] - apple[0]) + abs(nxt[1] - apple[1]), ng, nxt))
+        return None
+
+    def plan(self, head, apple, length, field, clock):
+        """
+        Search abstract path and refine its leading segment.
+
+        :param head: Position of the head of the snake
+        :param apple: Position of the apple
+        :param length: Length of the snake
+        :param field: Numpy array, from which game field is made (vacancy field or game field)
+        :param clock: Value subtracted from field (clock of the vacancy field, 0 for game field)
+        :return: List of direction (None, if there is no path).
+        """
+        if not (0 <= apple[0] < self.columns and 0 <= apple[1] < self.rows):  # No apple on the board (Full board)
+            return None
+        path = self.search(head, apple)
+        dir_list = None
+        if path is not None:
+            end = next((i for i, (square, distance) in enumerate(path) if distance >= self.refine_distance),
+                       len(path) - 1)
+            clusters = [self.cluster_of(square) for square, distance in path[:end + 1]]
+            x0 = min(cx for cx, cy in clusters) * self.cluster_size
+            y0 = min(cy for cx, cy in clusters) * self.cluster_size
+            x1 = min((max(cx for cx, cy in clusters) + 1) * self.cluster_size, self.columns)
+            y1 = min((max(cy for cx, cy in clusters) + 1) * self.cluster_size, self.rows)
+            dir_list = self.refine(head, path[end][0], apple, length, field, clock, (x0, x1, y0, y1))
+        if not dir_list:  # Flat A* on the whole board
+            self.fallbacks += 1
+            dir_list = self.refine(head, apple, apple, length, field, clock, (0, self.columns, 0, self.rows))
+        return dir_list
+
+    @staticmethod
+    def refine(head, goal, apple, length, field, clock, window):
+        """
+        Calculate path from head to goal inside the window (astar.search on part of the game field).
+
+        :param head: Position of the head of the snake
+        :param goal: Position of the end of the path (entrance or apple)
+        :param apple: Position of the apple
+        :param length: Length of the snake
+        :param field: Numpy array, from which game field is made (vacancy field or game field)
+        :param clock: Value subtracted from field
+        :param window: Tuple of first column, column after the last, first row and row after the last.
+        :return: List of direction (None, if there is no path).
+        """
+        x0, x1, y0, y1 = window
+        game_field = field[x0:x1, y0:y1].astype(np.int64) - clock
+        np.maximum(game_field, 0, out=game_field)
+        if x0 <= apple[0] < x1 and y0 <= apple[1] < y1:
+            game_field[apple[0] - x0, apple[1] - y0] = length + 1
+        return astar.search(game_field, length, (head[0] - x0, head[1] - y0), (goal[0] - x0, goal[1] - y0),
+                            x1 - x0, y1 - y0)[0]
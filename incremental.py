@@ -0,0 +1,123 @@
+import numpy as np
+import time
+import astar
+
+
+class IncrementalPlanner:
+    """
+    Pathfinding, which keeps calculated path between game-ticks and repairs it only when needed.
+
+    Game state keeps time (clock), when each body square will be free (vacancy field).
+    These times do not change, until the head enters the square again, so path calculated by A*
+    stays valid while the snake follows it. Every game-tick only the next square of the path is checked.
+    Path is calculated again only for new apple, when the next square is blocked,
+    or (when no path exists) after some body square around the searched area becomes free.
+    When there is no path, snake makes survival move instead of going straight into the wall.
+    Before A* is called, fast flood fill (astar.reachable) checks, if the apple can be reached at all.
+    """
+
+    def __init__(self, precheck=True):
+        """
+        Declaration of class parameters.
+
+        :param precheck: Indicates if reachability of the apple is checked before calling A*.
+        """
+        self.precheck = precheck  # Indicates if reachability of the apple is checked before calling A*
+        self.apple = None  # Apple, for which was path calculated
+        self.retry_clock = None  # Clock (with clock_base), when to search again (None: only for new apple)
+        self.ticks = 0  # Game-tick of the last update (lower game-tick means new game)
+        self.searches = 0  # Number of calls of A* algorithm
+        self.region_size = 0  # Number of squares reachable from head (found by the last failed search)
+
+    def __call__(self, game_field, length, head, apple, width, height):
+        """
+        Calculate path from scratch (same as astar.calculate_path).
+
+        :param game_field: Numpy array of the game situation
+        :param length: Length of the snake
+        :param head: Position of the head of the snake
+        :param apple: Position of the apple
+        :param width: Columns in game (squares in one row).
+        :param height: Rows in game (squares in one column).
+        :return: List of direction (where to move square by square).
+        """
+        self.searches += 1
+        return astar.calculate_path(game_field, length, head, apple, width, height)
+
+    def update(self, state):
+        """
+        Check path of the snake and repair it, if needed. Called every game-tick.
+
+        :param state: Game state (class GameState)
+        :return: Nothing
+        """
+        if state.ticks < self.ticks:  # New game (planner is reused), path and retry clock are from the old one
+            self.apple = None
+            self.retry_clock = None
+        self.ticks = state.ticks
+        if state.apple != self.apple:  # New apple
+            self.replan(state)
+        elif state.dir_list:
+            if not state.is_free(state.dir_list[-1]):  # Next square is blocked
+                self.replan(state)
+        elif self.retry_clock is not None and state.clock + state.clock_base >= self.retry_clock:
+            # Searched area is not closed
+            self.replan(state)
+        if not state.dir_list:
+            state.direction = state.survival_move()
+
+    def replan(self, state):
+        """
+        Calculate new path from head to apple.
+
+        When there is no path, remember clock, when the first body square around searched area will be free.
+
+        :param state: Game state (class GameState)
+        :return: Nothing
+        """
+        self.apple = state.apple
+        self.retry_clock = None
+        state.plans += 1
+        game_field = state.game_field
+        if self.precheck:
+            start = time.perf_counter()
+            found, self.region_size, region = astar.reachable(game_field, state.length, state.head, state.apple,
+                                                              state.columns, state.rows)
+            state.precheck_time += time.perf_counter() - start
+            if not found:
+                state.search_stats['expanded'] = state.search_stats['max_opened'] = 0
+                self.set_stuck(state, region)
+                return
+        self.searches += 1
+        dir_list, closed = astar.search(game_field, state.length, state.head, state.apple,
+                                        state.columns, state.rows, state.search_stats)
+        if dir_list:
+            state.dir_list = dir_list
+            state.stuck = 0
+        else:
+            if closed is not None:
+                closed = np.array(closed).reshape(state.columns, state.rows)
+                self.region_size = int(closed.sum())
+            self.set_stuck(state, closed)
+
+    def set_stuck(self, state, region):
+        """
+        Set state without path to apple.
+
+        Remember clock, when the first body square around reachable area will be free.
+
+        :param state: Game state (class GameState)
+        :param region: Numpy bool array of squares reachable from head (None, if there is no apple)
+        :return: Nothing
+        """
+        state.dir_list = []
+        state.stuck = 1
+        if region is not None:
+            border = np.zeros_like(region)  # Squares next to reachable area
+            border[1:] |= region[:-1]
+            border[:-1] |= region[1:]
+            border[:, 1:] |= region[:, :-1]
+            border[:, :-1] |= region[:, 1:]
+            border &= ~region & (state.vacancy > state.clock)
+            if border.any():
+                self.retry_clock = int(state.vacancy[border].min()) + state.clock_base
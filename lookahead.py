@@ -0,0 +1,161 @@
+import time
+import astar
+
+
+class Rollout:
+    """
+    Result of one simulated option (moves played on copy of the game, see LookaheadPlanner.rollout).
+    """
+
+    __slots__ = ['dir_list', 'ate', 'alive', 'tail_reachable', 'region_size']
+
+    def __init__(self, dir_list, ate, alive, tail_reachable, region_size):
+        """
+        Declaration of class parameters.
+
+        :param dir_list: Simulated moves (Last element is first direction to take)
+        :param ate: Indicates if snake has eaten the apple at the end of the moves
+        :param alive: Indicates if snake survived the moves
+        :param tail_reachable: Indicates if the tail was reachable from head after the moves
+        :param region_size: Number of squares reachable from head after the moves
+        """
+        self.dir_list = dir_list  # Simulated moves
+        self.ate = ate  # Indicates if snake has eaten the apple
+        self.alive = alive  # Indicates if snake survived the moves
+        self.tail_reachable = tail_reachable  # Indicates if the tail was reachable after the moves
+        self.region_size = region_size  # Number of squares reachable from head after the moves
+
+    @property
+    def safe(self):
+        """
+        Snake survived and can still follow its tail (it can not be trapped).
+
+        :return: True, if option is safe.
+        """
+        return self.alive and self.tail_reachable
+
+
+class LookaheadPlanner:
+    """
+    Pathfinding, which tries options on copies of the game before choosing one (see GameState.clone).
+
+    Options are played on one copy of the game, to which snapshot of the game is restored before each option.
+    Shortest path to apple (A*) is played first. It is used, when the snake survives it
+    and its tail is reachable after eating (snake can follow its tail, so it is not trapped).
+    Otherwise paths to apple through other neighbours of the head are tried and, when no path is safe,
+    snake makes one move keeping the tail reachable with the biggest reachable area (and decides again next tick).
+    Options are tried only until the time budget runs out (the first option is always tried).
+    When the apple is not eaten for columns * rows game-ticks (snake only follows its tail),
+    shortest path, which the snake survives, is used even if it is not safe.
+    """
+
+    def __init__(self, time_budget=0.01):
+        """
+        Declaration of class parameters.
+
+        :param time_budget: Maximal time (seconds) for trying options during one game-tick
+        """
+        self.time_budget = time_budget  # Maximal time for trying options during one game-tick
+        self.apple = None  # Apple, for which was path chosen
+        self.apple_tick = 0  # Game-tick, when the apple appeared
+        self.game = None  # Copy of the game for playing options
+        self.snapshot = None  # Snapshot of the game, from which options start
+        self.rollouts = 0  # Number of tried options
+        self.rejected = 0  # Number of unsafe shortest paths
+
+    def __call__(self, game_field, length, head, apple, width, height):
+        """
+        Calculate shortest path (same as astar.calculate_path, options are tried only in update).
+
+        :param game_field: Numpy array of the game situation
+        :param length: Length of the snake
+        :param head: Position of the head of the snake
+        :param apple: Position of the apple
+        :param width: Columns in game (squares in one row).
+        :param height: Rows in game (squares in one column).
+        :return: List of direction (where to move square by square).
+        """
+        return astar.calculate_path(game_field, length, head, apple, width, height)
+
+    def update(self, state):
+        """
+        Follow chosen path or choose new one. Called every game-tick.
+
+        :param state: Game state (class GameState)
+        :return: Nothing
+        """
+        if state.apple != self.apple or not state.dir_list or not state.is_free(state.dir_list[-1]):
+            self.choose(state)
+        if not state.dir_list:
+            state.direction = state.survival_move()
+
+    def choose(self, state):
+        """
+        Try options and set path of the safest one (see class description).
+
+        :param state: Game state (class GameState)
+        :return: Nothing
+        """
+        deadline = time.perf_counter() + self.time_budget
+        if state.apple != self.apple:
+            self.apple = state.apple
+            self.apple_tick = state.ticks
+        state.plans += 1
+        state.dir_list = []
+        if self.game is None or (self.game.columns, self.game.rows) != (state.columns, state.rows):
+            self.game = state.clone()
+        self.snapshot = state.snapshot()
+        best = self.rollout()
+        if best.ate and (best.safe or (best.alive and state.ticks - self.apple_tick > state.columns * state.rows)):
+            state.dir_list = best.dir_list
+            return
+        self.rejected += 1
+        first = best.dir_list[-1] if best.dir_list else None
+        moves = [direction for direction in ((0, 1), (0, -1), (-1, 0), (1, 0)) if state.is_free(direction)]
+        for direction in moves:  # Paths to apple through other neighbours
+            if direction == first or time.perf_counter() > deadline:
+                continue
+            option = self.rollout(direction)
+            if option.safe and option.ate:
+                state.dir_list = option.dir_list
+                return
+        best = None
+        for direction in moves:  # One move keeping the tail reachable
+            if best is not None and time.perf_counter() > deadline:
+                break
+            option = self.rollout(direction, to_apple=False)
+            if best is None or ((option.safe, option.region_size) > (best.safe, best.region_size)):
+                best = option
+        if best is not None and best.alive:
+            state.dir_list = best.dir_list
+
+    def rollout(self, direction=None, to_apple=True):
+        """
+        Play option on copy of the game (from self.snapshot) and check the situation after it.
+
+        :param direction: First move (None for going to apple directly)
+        :param to_apple: Go to apple by the shortest path (after the first move)
+        :return: Result of the option (class Rollout).
+        """
+        self.rollouts += 1
+        game = self.game
+        game.restore(self.snapshot)
+        dir_list = []
+        length = game.length
+        if direction is not None:
+            dir_list.append(direction)
+            game.step(direction)
+        if to_apple and game.active == 1:
+            path = game.find_path() or []  # Same situations are tried often, plan cache of the game is used
+            for move in reversed(path):
+                if not game.step(move):
+                    break
+            dir_list = path + dir_list
+        ate = game.length > length
+        if game.cause == 'full':
+            return Rollout(dir_list, ate, True, True, 0)
+        if game.active != 1:
+            return Rollout(dir_list, ate, False, False, 0)
+        found, region_size = astar.reachable(game.game_field, game.length, game.head, game.body[0],
+                                             game.columns, game.rows, stop_at_apple=False)[:2]
+        return Rollout(dir_list, ate, True, found or game.length == 1, region_size)
@@ -1,85 +1,152 @@
-import pyglet as pg
-import snake as snake
+import argparse
+import planners
+import stats
 
-"""Basic declarations."""
-window = pg.window.Window(width=250, height=250, caption='Snake')  # Menu window
-background = pg.graphics.Batch()  # Button backgrounds
-foreground = pg.graphics.Batch()  # Labels
-
-# Manual play option
-play_size = (150, 50)  # Size of the button
+"""Menu settings."""
+window_size = (250, 250)  # Size of the menu window
+play_size = (150, 50)  # Size of the manual play button
 play_color = (55, 255, 55)  # Color of the button
 play_color_hover = (55, 155, 55)  # Hover color of the button
-play_position = (window.width / 2 - play_size[0] / 2, window.height - 50 - play_size[1])  # Position of the button
-playS = pg.shapes.Rectangle(play_position[0], play_position[1],
-                            play_size[0], play_size[1],
-                            color=play_color, batch=background)  # Shape of the button
-play_label = pg.text.Label('Manual play', font_name='Calibri', font_size=15,
-                           x=play_position[0] + play_size[0] / 2,
-                           y=play_position[1] + play_size[1] / 2,
-                           anchor_x='center', anchor_y='center',
-                           color=(0, 0, 0, 255), batch=foreground)  # Label of the button
-
-# Automated play option
-ai_size = (150, 50)  # Size of the button
+play_position = (window_size[0] / 2 - play_size[0] / 2, window_size[1] - 50 - play_size[1])  # Position of the button
+ai_size = (150, 50)  # Size of the AI play button
 ai_color = (55, 255, 55)  # Color of the button
 ai_color_hover = (55, 155, 55)  # Hover color of the button
-ai_position = (window.width / 2 - ai_size[0] / 2,
-               window.height - 50 - play_size[1] - 25 - ai_size[1])  # Position of the button
-aiS = pg.shapes.Rectangle(ai_position[0], ai_position[1],
-                          ai_size[0], ai_size[1],
-                          color=ai_color, batch=background)  # Shape of the button
-ai_label = pg.text.Label('AI play', font_name='Calibri', font_size=15,
-                         x=ai_position[0] + ai_size[0] / 2,
-                         y=ai_position[1] + ai_size[1] / 2,
-                         anchor_x='center', anchor_y='center',
-                         color=(0, 0, 0, 255), batch=foreground)  # Label of the button
-
-# Score Labels
-score_label1 = pg.text.Label('Last score: 0', font_name='Calibri', font_size=10,
-                             x=play_position[0] + play_size[0] / 2,
-                             y=20,
-                             anchor_x='center', anchor_y='center',
-                             color=(255, 255, 255, 255), batch=foreground)
-score_label2 = pg.text.Label('Last score: 0', font_name='Calibri', font_size=10,
-                             x=play_position[0] + play_size[0] / 2,
-                             y=10,
-                             anchor_x='center', anchor_y='center',
-                             color=(255, 255, 255, 255), batch=foreground)
-
-cursor_hover = window.get_system_mouse_cursor(window.CURSOR_HAND)  # Hover cursor type
-cursor_normal = window.get_system_mouse_cursor(window.CURSOR_DEFAULT)  # Normal cursor type
-snake_instance = snake.Snake()  # Instance of class Snake
-finished_runs = 0  # Counter for finished snake game
-score_min = 0  # Lowest achieved score
-score_max = 0  # Highest achieved score
-score_avg = 0  # Average of achieved scores
-score_list = []  # List of achieved score
-
-
-@window.event
+ai_position = (window_size[0] / 2 - ai_size[0] / 2,
+               window_size[1] - 50 - play_size[1] - 25 - ai_size[1])  # Position of the button
+
+"""Menu state (windows and shapes are created in main, so importing this file does not open any window)."""
+window = None  # Menu window
+background = None  # Button backgrounds
+foreground = None  # Labels
+playS = None  # Shape of the manual play button
+aiS = None  # Shape of the AI play button
+score_label1 = None  # Label with the last score
+score_label2 = None  # Label with score statistics
+cursor_hover = None  # Hover cursor type
+cursor_normal = None  # Normal cursor type
+snake_instance = None  # Instance of class Snake
+score_stats = stats.GameStats()  # Statistics of finished games
+drawn_runs = -1  # Number of finished games shown in score labels
+game_running = False  # Indicates if game was active during the last tick
+
+
+def parse_args(argv=None):
+    """
+    Game settings from command line.
+
+    :param argv: Command line arguments (None for sys.argv)
+    :return: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description='Snake game with A* controlled snake.')
+    parser.add_argument('--columns', type=int, default=25, help='number of tiles in one row')
+    parser.add_argument('--rows', type=int, default=25, help='number of tiles in one column')
+    parser.add_argument('--square-size', type=int, default=20, help='size of one tile (pixels)')
+    parser.add_argument('--speed', type=float, default=30.0, help='game-ticks per second')
+    parser.add_argument('--planner', choices=sorted(planners.PLANNERS), default='astar',
+                        help='pathfinding algorithm for AI play')
+    parser.add_argument('--background', action='store_true',
+                        help='calculate paths in worker thread (game does not wait for long calculations)')
+    parser.add_argument('--turbo', action='store_true',
+                        help='start AI play in turbo mode (many game-ticks per frame, toggled by T in the game)')
+    parser.add_argument('--turbo-slice', type=float, default=10.0,
+                        help='time for game-ticks in one frame in turbo mode (milliseconds)')
+    parser.add_argument('--turbo-multiplier', type=float, default=None,
+                        help='speed of turbo mode as multiple of --speed (default: as fast as the time slice allows)')
+    args = parser.parse_args(argv)
+    try:
+        planners.check(args.planner, args.columns, args.rows, args.background)
+    except ValueError as error:
+        parser.error(str(error))
+    return args
+
+
+def main(argv=None):
+    """
+    Entry point of the game. Create menu window and start pyglet application.
+
+    Pyglet (and window of the game) is imported only here, so other files can be used without display.
+
+    :param argv: Command line arguments (None for sys.argv)
+    :return: Nothing
+    """
+    global window, background, foreground, playS, aiS, score_label1, score_label2
+    global cursor_hover, cursor_normal, snake_instance, score_stats
+    import pyglet as pg
+    import snake
+
+    args = parse_args(argv)
+    window = pg.window.Window(width=window_size[0], height=window_size[1], caption='Snake')  # Menu window
+    background = pg.graphics.Batch()  # Button backgrounds
+    foreground = pg.graphics.Batch()  # Labels
+
+    # Manual play option
+    playS = pg.shapes.Rectangle(play_position[0], play_position[1],
+                                play_size[0], play_size[1],
+                                color=play_color, batch=background)  # Shape of the button
+    pg.text.Label('Manual play', font_name='Calibri', font_size=15,
+                  x=play_position[0] + play_size[0] / 2,
+                  y=play_position[1] + play_size[1] / 2,
+                  anchor_x='center', anchor_y='center',
+                  color=(0, 0, 0, 255), batch=foreground)  # Label of the button
+
+    # Automated play option
+    aiS = pg.shapes.Rectangle(ai_position[0], ai_position[1],
+                              ai_size[0], ai_size[1],
+                              color=ai_color, batch=background)  # Shape of the button
+    pg.text.Label('AI play', font_name='Calibri', font_size=15,
+                  x=ai_position[0] + ai_size[0] / 2,
+                  y=ai_position[1] + ai_size[1] / 2,
+                  anchor_x='center', anchor_y='center',
+                  color=(0, 0, 0, 255), batch=foreground)  # Label of the button
+
+    # Score Labels
+    score_label1 = pg.text.Label('Last score: 0', font_name='Calibri', font_size=10,
+                                 x=play_position[0] + play_size[0] / 2,
+                                 y=20,
+                                 anchor_x='center', anchor_y='center',
+                                 color=(255, 255, 255, 255), batch=foreground)
+    score_label2 = pg.text.Label('Last score: 0', font_name='Calibri', font_size=10,
+                                 x=play_position[0] + play_size[0] / 2,
+                                 y=10,
+                                 anchor_x='center', anchor_y='center',
+                                 color=(255, 255, 255, 255), batch=foreground)
+
+    cursor_hover = window.get_system_mouse_cursor(window.CURSOR_HAND)  # Hover cursor type
+    cursor_normal = window.get_system_mouse_cursor(window.CURSOR_DEFAULT)  # Normal cursor type
+    snake_instance = snake.Snake(columns=args.columns, rows=args.rows, square_size=args.square_size,
+                                 game_speed=args.speed, planner=args.planner,
+                                 background_planning=args.background, turbo=args.turbo,
+                                 turbo_slice=args.turbo_slice / 1000,
+                                 turbo_multiplier=args.turbo_multiplier)  # Instance of class Snake
+    score_stats = stats.GameStats(args.columns, args.rows)
+
+    window.push_handlers(on_draw, on_mouse_motion, on_mouse_release)
+    pg.clock.schedule_interval(update, 1 / snake_instance.game_speed)  # Sets function, which is periodically called.
+    pg.app.run()  # Starts pyglet application
+
+
 def on_draw():
     """
     Draw graphics to Menu window.
 
     Draw buttons background, its labels and standalone labels.
+    Text of score labels is changed only after finished game (new text means new layout of the label).
 
     :return: Nothing
     """
-    global finished_runs
-    global score_min
-    global score_max
-    global score_avg
-    global score_list
+    global drawn_runs
 
     window.clear()
-    score_label1.text = 'Last score: {}, Runs: {}'.format(snake_instance.final_score, finished_runs)
-    score_label2.text = 'Score: min={}, max={}, avg={:.2f}'.format(score_min, score_max, score_avg)
+    if score_stats.count != drawn_runs:
+        drawn_runs = score_stats.count
+        score = score_stats.score
+        score_label1.text = 'Last score: {}, Runs: {}'.format(score.last or 0, score.count)
+        score_label2.text = 'Score: min={}, max={}, avg={:.2f}, p90={:.0f}'.format(
+            score.min or 0, score.max or 0, score.mean, score.percentile(90) or 0)
     background.draw()  # Button backgrounds
     foreground.draw()  # Text
 
 
-@window.event
 def on_mouse_motion(x, y, dx, dy):
     """
     Is called, when mouse is moving.
@@ -122,7 +189,6 @@ def on_mouse_motion(x, y, dx, dy):
         window.set_mouse_cursor(cursor_normal)
 
 
-@window.event
 def on_mouse_release(x, y, button, modifiers):
     """
     Is called, when mouse button is released.
@@ -147,38 +213,18 @@ def on_mouse_release(x, y, button, modifiers):
         snake_instance.play_style = 2
         snake_instance.run()
 
-def test_run():
+def record_score():
     """
-    Used for forcing AI to play some amount of games.
+    Add score of the finished game to the statistics (constant time and memory, see stats.GameStats).
 
-    Used for fast testing for large number of playthroughs
+    Many games without window can be played using 'runner.py' (command snake-batch).
 
     :return: Nothing
     """
-    global finished_runs
-    global score_min
-    global score_max
-    global score_avg
-    global score_list
-
-    if snake_instance.active == 0 and finished_runs < 101:
-        if finished_runs > 0:
-            score_list.append(snake_instance.final_score)
-        if finished_runs == 1:
-            score_min = score_avg = score_max = snake_instance.final_score
-        else:
-            if snake_instance.final_score > score_max:
-                score_max = snake_instance.final_score
-            if snake_instance.final_score < score_min:
-                score_min = snake_instance.final_score
-            if finished_runs > 0:
-                score_avg = sum(score_list) / finished_runs
-        print('run {0}.: min={1}, max={2}, avg={3}'.format(finished_runs, score_min, score_max, score_avg))
-        snake_instance.play_style = 2
-        snake_instance.run()
-        finished_runs += 1
+    state = snake_instance.state
+    score_stats.add(state.final_score, state.ticks, state.planning_time)
+
 
-@window.event
 def update(self):
     """
     Periodically updates parts of the program, that needs to be updated.
@@ -189,15 +235,13 @@ def update(self):
     :param self: Itself. Can be used to access some variables etc. Not used here.
     :return: Nothing
     """
-    global finished_runs
-    global score_min
-    global score_max
-    global score_avg
-    global score_list
+    global game_running
 
     snake_instance.update(snake_instance)
-    test_run()
+    if game_running and snake_instance.active == 0:  # Game has ended (crash or ESCAPE) since the last tick
+        record_score()
+    game_running = snake_instance.active == 1
 
 
-pg.clock.schedule_interval(update, 1 / snake_instance.game_speed)  # Sets function, which is periodically called.
-pg.app.run()  # Starts pyglet application
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import collections
+import sys
+
+NO_PATH = ()  # Stored path of situation without path (found as stored, returned as empty list)
+
+class PlanCache:
+    """
+    Cache of calculated paths with least recently used eviction (see GameState.find_path).
+
+    Key is the game situation (hash of the game field, length, head and apple, see GameState.field_key),
+    so the same situation in later game-ticks or in other games with same board and planner uses the stored path.
+    Paths are stored as tuples and returned as new lists, so taking directions from the path does not change
+    the cache. Cache is limited by number of paths and optionally by approximate memory of stored paths.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=None):
+        """
+        Declaration of class parameters.
+
+        :param max_entries: Maximal number of stored paths
+        :param max_bytes: Maximal approximate memory of stored paths in bytes (None for no limit)
+        """
+        self.max_entries = max_entries  # Maximal number of stored paths
+        self.max_bytes = max_bytes  # Maximal memory of stored paths
+        self.entries = collections.OrderedDict()  # Stored paths (Last is the most recently used)
+        self.bytes = 0  # Approximate memory of stored paths
+        self.hits = 0  # Number of found paths
+        self.misses = 0  # Number of paths, which were not found
+        self.evictions = 0  # Number of removed paths
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def size(dir_list):
+        """
+        Approximate memory of stored path (directions are shared tuples, only the tuple of path is counted).
+
+        :param dir_list: Stored path (tuple)
+        :return: Size in bytes
+        """
+        return sys.getsizeof(dir_list)
+
+    def get(self, key):
+        """
+        Find path of the situation.
+
+        :param key: Game situation
+        :return: Copy of the path (list, empty for situation without path) or None, if it is not stored.
+        """
+        dir_list = self.entries.get(key)
+        if dir_list is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return list(dir_list)
+
+    def put(self, key, dir_list):
+        """
+        Store path of the situation and remove the least recently used paths over the limits.
+
+        :param key: Game situation
+        :param dir_list: Path (None or empty list for situation without path)
+        :return: Nothing
+        """
+        if self.max_entries <= 0:
+            return
+        dir_list = tuple(dir_list) if dir_list else NO_PATH
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= self.size(old)
+        self.entries[key] = dir_list
+        self.bytes += self.size(dir_list)
+        while len(self.entries) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes
+                                                       and len(self.entries) > 1):
+            self.bytes -= self.size(self.entries.popitem(last=False)[1])
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Remove all stored paths (counters stay).
+
+        :return: Nothing
+        """
+        self.entries.clear()
+        self.bytes = 0
+
+    def summary(self):
+        """
+        Summarize the cache.
+
+        :return: Dictionary with 'entries', 'bytes', 'hits', 'misses', 'evictions' and 'hit_rate'.
+        """
+        lookups = self.hits + self.misses
+        return {'entries': len(self.entries), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hit_rate': self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,69 @@
+import astar
+import background
+import hamiltonian
+import hierarchical
+import incremental
+import lookahead
+import wavefront
+
+PLANNERS = {'astar': lambda: astar.calculate_path,
+            'incremental': incremental.IncrementalPlanner,
+            'hamiltonian': hamiltonian.HamiltonianPlanner,
+            'wavefront': wavefront.WavefrontPlanner,
+            'budget': astar.BudgetPlanner,
+            'lookahead': lookahead.LookaheadPlanner,
+            'hierarchical': hierarchical.HierarchicalPlanner}  # Pathfinding algorithms (name -> creates planner)
+
+
+def register(name, factory):
+    """
+    Add pathfinding algorithm, so it can be selected by name (runner, main, bench).
+
+    Planner is a function with same parameters and return value as astar.calculate_path,
+    or object with such method __call__ and method update(state), which is called every game-tick
+    and sets path (GameState.dir_list) or direction (GameState.direction) of the snake.
+    Factory can have method check_board(columns, rows) for unsupported boards (see check).
+
+    :param name: Name of the algorithm
+    :param factory: Function without parameters, which creates new planner (one planner is used for one game)
+    :return: Nothing
+    """
+    PLANNERS[name] = factory
+
+
+def check(name, columns, rows, background_planning=False):
+    """
+    Check, that pathfinding algorithm exists and can play on the board (before any game is started).
+
+    Factory of the planner can have method check_board(columns, rows), which raises ValueError
+    for unsupported board (e.g. Hamiltonian cycle needs even number of columns or rows).
+
+    :param name: Name of the algorithm (key of PLANNERS)
+    :param columns: Number of tiles in one row
+    :param rows: Number of tiles in one column
+    :param background_planning: Paths will be calculated in worker thread (only for algorithms without update)
+    :return: Nothing
+    """
+    if name not in PLANNERS:
+        raise ValueError('Unknown planner {} (available: {})'.format(name, ', '.join(sorted(PLANNERS))))
+    if background_planning and hasattr(PLANNERS[name], 'update'):
+        raise ValueError('Planner {} checks its path every game-tick and can not run in background'.format(name))
+    check_board = getattr(PLANNERS[name], 'check_board', None)
+    if check_board is not None:
+        check_board(columns, rows)
+
+
+def create(name, background_planning=False):
+    """
+    Create new planner for one game.
+
+    :param name: Name of the algorithm (key of PLANNERS)
+    :param background_planning: Calculate paths in worker thread (see background.BackgroundPlanner).
+                                Only for algorithms, which are functions (without method update).
+    :return: Planner (function or object, see register).
+    """
+    if name not in PLANNERS:
+        raise ValueError('Unknown planner {} (available: {})'.format(name, ', '.join(sorted(PLANNERS))))
+    if background_planning:
+        return background.BackgroundPlanner(PLANNERS[name]())
+    return PLANNERS[name]()
@@ -0,0 +1,139 @@
+import json
+import time
+import numpy as np
+
+PHASES = ['planning', 'collisions', 'game_field', 'graphics']  # Measured parts of the game-tick (seconds)
+COUNTERS = ['expanded', 'max_opened', 'path_length', 'replans']  # Statistics of pathfinding (one per search)
+
+
+class Profiler:
+    """
+    Records durations of parts of the game-tick and statistics of pathfinding.
+
+    Every channel (phase or counter) has ring buffer of fixed size with time of the record and its value,
+    so only the last records are kept and memory does not grow.
+    Game state (GameState.profiler) and window (Snake) record to it only when it is set (not None).
+    """
+
+    def __init__(self, size=1024):
+        """
+        Declaration of class parameters.
+
+        :param size: Number of kept records for each channel
+        """
+        self.size = size  # Number of kept records for each channel
+        self.origin = time.perf_counter()  # Time of creation (start of the trace)
+        self.times = {}  # Channel -> ring buffer of times of records (seconds since origin)
+        self.records = {}  # Channel -> ring buffer of recorded values
+        self.counts = {}  # Channel -> number of all records
+        for name in PHASES + COUNTERS:
+            self.add_channel(name)
+
+    def add_channel(self, name):
+        """
+        Create empty ring buffers for new channel.
+
+        :param name: Name of the channel
+        :return: Nothing
+        """
+        self.times[name] = [0.0] * self.size
+        self.records[name] = [0.0] * self.size
+        self.counts[name] = 0
+
+    def add(self, name, start, end):
+        """
+        Record duration of the phase.
+
+        :param name: Name of the phase
+        :param start: Start of the phase (time.perf_counter)
+        :param end: End of the phase (time.perf_counter)
+        :return: Nothing
+        """
+        index = self.counts[name] % self.size
+        self.times[name][index] = start - self.origin
+        self.records[name][index] = end - start
+        self.counts[name] += 1
+
+    def count(self, name, value):
+        """
+        Record value of the counter.
+
+        :param name: Name of the counter
+        :param value: Value of the counter
+        :return: Nothing
+        """
+        index = self.counts[name] % self.size
+        self.times[name][index] = time.perf_counter() - self.origin
+        self.records[name][index] = value
+        self.counts[name] += 1
+
+    def values(self, name):
+        """
+        Get kept records of the channel from the oldest one.
+
+        :param name: Name of the channel
+        :return: Numpy array of values.
+        """
+        return self._ordered(self.records[name], self.counts[name])
+
+    def _ordered(self, buffer, count):
+        """
+        Order ring buffer from the oldest record.
+
+        :param buffer: Ring buffer
+        :param count: Number of all records
+        :return: Numpy array of values.
+        """
+        if count <= self.size:
+            return np.array(buffer[:count])
+        index = count % self.size
+        return np.array(buffer[index:] + buffer[:index])
+
+    def summary(self):
+        """
+        Summarize kept records of all channels.
+
+        :return: Dictionary (channel -> dictionary with 'count', 'last', 'mean', 'p50', 'p99' and 'max').
+        """
+        result = {}
+        for name in self.records:
+            values = self.values(name)
+            if len(values) == 0:
+                result[name] = {'count': 0, 'last': 0, 'mean': 0, 'p50': 0, 'p99': 0, 'max': 0}
+                continue
+            result[name] = {'count': self.counts[name], 'last': float(values[-1]), 'mean': float(values.mean()),
+                            'p50': float(np.percentile(values, 50)), 'p99': float(np.percentile(values, 99)),
+                            'max': float(values.max())}
+        return result
+
+    def chrome_trace(self):
+        """
+        Convert kept records to Chrome trace format (chrome://tracing, Perfetto).
+
+        Phases are complete events ('X'), counters are counter events ('C'). Times are in microseconds.
+
+        :return: Dictionary with list of trace events.
+        """
+        events = []
+        for name in self.records:
+            times = self._ordered(self.times[name], self.counts[name])
+            values = self.values(name)
+            for start, value in zip(times.tolist(), values.tolist()):
+                if name in COUNTERS:
+                    events.append({'name': name, 'ph': 'C', 'ts': start * 1e6, 'pid': 0, 'tid': 0,
+                                   'args': {name: value}})
+                else:
+                    events.append({'name': name, 'ph': 'X', 'ts': start * 1e6, 'dur': value * 1e6,
+                                   'pid': 0, 'tid': 0})
+        events.sort(key=lambda event: event['ts'])
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path):
+        """
+        Save kept records as Chrome trace (JSON file).
+
+        :param path: Path to the file
+        :return: Nothing
+        """
+        with open(path, 'w') as file:
+            json.dump(self.chrome_trace(), file)
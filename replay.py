@@ -0,0 +1,233 @@
+import bisect
+import collections
+import mmap
+import struct
+import numpy as np
+import engine
+
+MAGIC = b'SNKR'  # Start of the replay file
+END_MAGIC = b'SNKE'  # End of the replay file
+VERSION = 2  # Version of the file format
+HEADER = struct.Struct('<4sHIIQBiiii')  # Magic, version, columns, rows, seed, seed is set, head (x, y), apple (x, y)
+HEADER_V1 = struct.Struct('<4sHIIqiiii')  # Header of version 1 (signed seed, -1 for no seed)
+FOOTER = struct.Struct('<QII8s4s')  # Ticks, apples, final score, cause, magic
+APPLE = struct.Struct('<ii')  # Position of the apple
+MOVES = [(0, 1), (0, -1), (-1, 0), (1, 0), (0, 0)]  # Up, Down, Left, Right, Stay (lowest 3 bits of move byte)
+MOVE_CODES = {move: code for code, move in enumerate(MOVES)}  # Direction -> code of the move
+ATE = 8  # Bit of the move byte, which indicates that apple was eaten (new apple was placed)
+BUFFER_SIZE = 1 << 16  # Number of buffered moves before writing to the file
+KEYFRAME_INTERVAL = 256  # Minimal number of game-ticks between two keyframes of the reader
+
+
+class Recorder:
+    """
+    Writes replay of one game to compact binary file.
+
+    File has header (board, seed, starting head and apple), one byte for each game-tick
+    (direction of the move and indicator of eaten apple), positions of all following apples and footer.
+    Recording of one game-tick is one append to the buffer, which is written to the file when it is full.
+    """
+
+    def __init__(self, path, state):
+        """
+        Create replay file and write its header.
+
+        :param path: Path to the replay file
+        :param state: Game state (class GameState) at the start of the game
+        """
+        self.file = open(path, 'wb')  # Replay file
+        self.buffer = bytearray()  # Moves, which were not written yet
+        self.apples = []  # Positions of apples placed after eating
+        self.ticks = 0  # Number of recorded moves
+        seed = state.seed if state.seed is not None else 0
+        if not 0 <= seed < 1 << 64:
+            raise ValueError('Seed {} can not be recorded (0 to 2^64-1)'.format(seed))
+        self.file.write(HEADER.pack(MAGIC, VERSION, state.columns, state.rows, seed, state.seed is not None,
+                                    state.head[0], state.head[1], state.apple[0], state.apple[1]))
+
+    def record(self, direction, apple=None):
+        """
+        Record one move of the snake.
+
+        :param direction: Direction of the move
+        :param apple: Position of the new apple, when apple was eaten during this move (otherwise None)
+        :return: Nothing
+        """
+        if apple is None:
+            self.buffer.append(MOVE_CODES[direction])
+        else:
+            self.buffer.append(MOVE_CODES[direction] | ATE)
+            self.apples.append(apple)
+        if len(self.buffer) >= BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Write buffered moves to the file.
+
+        :return: Nothing
+        """
+        self.ticks += len(self.buffer)
+        self.file.write(self.buffer)
+        self.buffer.clear()
+
+    def close(self, state):
+        """
+        Write rest of the moves, positions of apples and footer, then close the file.
+
+        :param state: Game state (class GameState) at the end of the game
+        :return: Nothing
+        """
+        self.flush()
+        for apple in self.apples:
+            self.file.write(APPLE.pack(apple[0], apple[1]))
+        self.file.write(FOOTER.pack(self.ticks, len(self.apples), state.final_score,
+                                    state.cause.encode()[:8], END_MAGIC))
+        self.file.close()
+
+
+class Replay:
+    """
+    Reads replay file and reconstructs game situation for any game-tick.
+
+    File is memory-mapped, moves are read directly from it without copying.
+    Situation is reconstructed from the nearest previous keyframe (saved during the first pass through the moves).
+    Keyframe keeps only squares of the body (from tail to head) and number of eaten apples, and keyframes
+    are at least KEYFRAME_INTERVAL and at least length of the snake game-ticks apart,
+    so memory of keyframes grows with number of game-ticks, not with size of the board.
+    """
+
+    def __init__(self, path):
+        """
+        Open and check replay file.
+
+        :param path: Path to the replay file
+        """
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)  # Content of the file
+        magic, version = struct.unpack_from('<4sH', self.data, 0)
+        if version == 1:
+            header = HEADER_V1
+            (magic, version, self.columns, self.rows, self.seed,
+             head_x, head_y, apple_x, apple_y) = header.unpack_from(self.data, 0)
+            self.seed = self.seed if self.seed != -1 else None
+        else:
+            header = HEADER
+            (magic, version, self.columns, self.rows, self.seed, seed_set,
+             head_x, head_y, apple_x, apple_y) = header.unpack_from(self.data, 0)
+            self.seed = self.seed if seed_set else None
+        ticks, apples, self.final_score, cause, end_magic = FOOTER.unpack_from(self.data, len(self.data) - FOOTER.size)
+        if magic != MAGIC or end_magic != END_MAGIC or version not in (1, VERSION):
+            raise ValueError('{} is not a replay file (version {})'.format(path, VERSION))
+        self.ticks = ticks  # Number of moves
+        self.cause = cause.rstrip(b'\0').decode()  # Cause of the end of the game
+        self.start = (head_x, head_y)  # Starting position of the head
+        self.moves = np.frombuffer(self.data, dtype=np.uint8, count=ticks, offset=header.size)  # Move bytes
+        self.apples = [(apple_x, apple_y)] + [APPLE.unpack_from(self.data, header.size + ticks + i * APPLE.size)
+                                              for i in range(0, apples)]  # All apples (first one at start)
+        self.dtype = engine.field_dtype(self.columns, self.rows)
+        self.keyframes = None  # Saved situations (body squares and number of eaten apples)
+        self.keyframe_ticks = None  # Game-tick of each keyframe
+
+    def close(self):
+        """
+        Close memory-mapped file.
+
+        :return: Nothing
+        """
+        self.moves = None
+        self.data.close()
+
+    def build_keyframes(self):
+        """
+        Go through all moves and save keyframes.
+
+        :return: Nothing
+        """
+        self.keyframes = []
+        self.keyframe_ticks = []
+        situation = self._start()
+        situation[5] = collections.deque([self.start])
+        for tick in range(0, self.ticks + 1):
+            if not self.keyframe_ticks or tick - self.keyframe_ticks[-1] >= max(KEYFRAME_INTERVAL, situation[4]):
+                self.keyframes.append(self._keyframe(situation))
+                self.keyframe_ticks.append(tick)
+            if tick < self.ticks:
+                self._move(situation, self.moves[tick])
+
+    def situation(self, tick):
+        """
+        Reconstruct game situation after given number of game-ticks.
+
+        :param tick: Number of game-ticks (0 is start of the game, ticks is the end)
+        :return: Tuple of game field (same as GameState.game_field), head, apple and length of the snake.
+        """
+        if not 0 <= tick <= self.ticks:
+            raise IndexError('tick {} is out of range 0-{}'.format(tick, self.ticks))
+        if self.keyframes is None:
+            self.build_keyframes()
+        index = bisect.bisect_right(self.keyframe_ticks, tick) - 1
+        body, eaten = self.keyframes[index]
+        vacancy = np.full(self.columns * self.rows, 0, dtype=np.int64)
+        vacancy[body] = np.arange(1, len(body) + 1)  # Body values are from 1 (tail) to length (head)
+        head = divmod(int(body[-1]), self.rows)
+        situation = [vacancy.reshape(self.columns, self.rows), 0, head, eaten, len(body), None]
+        for move in self.moves[self.keyframe_ticks[index]:tick]:
+            self._move(situation, move)
+        vacancy, clock, head, eaten, length = situation[:5]
+        game_field = np.maximum(vacancy - clock, 0).astype(self.dtype)
+        apple = self.apples[eaten]
+        if apple != (-1, -1):
+            game_field[apple[0], apple[1]] = length + 1
+        return game_field, head, apple, length
+
+    def game_field(self, tick):
+        """
+        Reconstruct game field after given number of game-ticks.
+
+        :param tick: Number of game-ticks
+        :return: Numpy array of the game situation (same as GameState.game_field).
+        """
+        return self.situation(tick)[0]
+
+    def _start(self):
+        """
+        Create situation at the start of the game.
+
+        :return: List of vacancy field, clock, head, number of eaten apples, length and body (None, if not kept).
+        """
+        vacancy = np.full((self.columns, self.rows), 0, dtype=np.int64)
+        vacancy[self.start[0], self.start[1]] = 1
+        return [vacancy, 0, self.start, 0, 1, None]
+
+    def _keyframe(self, situation):
+        """
+        Create compact copy of the situation (only squares of the body).
+
+        :param situation: List of vacancy field, clock, head, number of eaten apples, length and body
+        :return: Tuple of numpy array of body squares (x * rows + y, from tail to head) and number of eaten apples.
+        """
+        body = np.array(situation[5], dtype=np.int64).reshape(-1, 2)
+        return (body[:, 0] * self.rows + body[:, 1]).astype(np.int32), situation[3]
+
+    def _move(self, situation, move):
+        """
+        Apply one move to the situation (same rules as GameState.update_game_field).
+
+        :param situation: List of vacancy field, clock, head, number of eaten apples, length and body
+        :param move: Move byte
+        :return: Nothing
+        """
+        direction = MOVES[move & 7]
+        head = (situation[2][0] + direction[0], situation[2][1] + direction[1])
+        if move & ATE:
+            situation[3] += 1
+            situation[4] += 1
+        else:
+            situation[1] += 1
+        situation[2] = head
+        situation[0][head[0], head[1]] = situation[1] + situation[4]
+        if situation[5] is not None:
+            situation[5].append(head)
+            if not move & ATE:
+                situation[5].popleft()
@@ -0,0 +1,255 @@
+import argparse
+import concurrent.futures
+import csv
+import dataset
+import json
+import os
+import sys
+import numpy as np
+import engine
+import plancache
+import planners
+import replay
+import stats
+
+FIELDS = ['game', 'seed', 'score', 'ticks', 'planning_time', 'precheck_time', 'cause', 'cache_hits',
+          'cache_misses']  # Items of one result
+_writers = {}  # (directory, columns, rows) -> dataset writer of this process (shared by all its games)
+_caches = {}  # (planner, columns, rows, size) -> plan cache of this process (shared by all its games)
+
+
+def dataset_writer(directory, columns, rows):
+    """
+    Get dataset writer of this process (created on first use, samples of all games go to its shards).
+
+    :param directory: Directory for shard files
+    :param columns: Number of tiles in one row
+    :param rows: Number of tiles in one column
+    :return: Writer (class dataset.Writer)
+    """
+    key = (directory, columns, rows)
+    if key not in _writers:
+        _writers[key] = dataset.Writer(directory, columns, rows)
+    return _writers[key]
+
+
+def plan_cache(planner, columns, rows, size):
+    """
+    Get plan cache of this process (created on first use, paths are shared by all its games with same planner).
+
+    :param planner: Name of the pathfinding algorithm
+    :param columns: Number of tiles in one row
+    :param rows: Number of tiles in one column
+    :param size: Maximal number of stored paths
+    :return: Cache (class plancache.PlanCache)
+    """
+    key = (planner, columns, rows, size)
+    if key not in _caches:
+        _caches[key] = plancache.PlanCache(size)
+    return _caches[key]
+
+
+def play_game(game, seed, columns, rows, planner, replay_dir=None, dataset_dir=None, cache_size=0):
+    """
+    Play one game controlled by AI without any window.
+
+    :param game: Number of the game
+    :param seed: Seed for random generator of the game
+    :param columns: Number of tiles in one row
+    :param rows: Number of tiles in one column
+    :param planner: Name of the pathfinding algorithm (key of planners.PLANNERS)
+    :param replay_dir: Directory for replay files (None for no recording)
+    :param dataset_dir: Directory for training samples (None for no export, see dataset.Writer)
+    :param cache_size: Maximal number of paths in plan cache of the process (0 for no caching)
+    :return: Dictionary with result of the game (items in FIELDS).
+    """
+    state = engine.GameState(columns, rows, seed, planners.create(planner))
+    cache = plan_cache(planner, columns, rows, cache_size) if cache_size > 0 else None
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    state.plan_cache = cache
+    if replay_dir is not None:
+        state.recorder = replay.Recorder(os.path.join(replay_dir, 'game-{}.snkr'.format(game)), state)
+    if dataset_dir is not None:
+        state.exporter = dataset_writer(dataset_dir, columns, rows)
+    while state.step_ai():
+        pass
+    if state.recorder is not None:
+        state.recorder.close(state)
+    if state.exporter is not None:
+        state.exporter.flush()  # Samples of finished game are in the shard file
+    return {'game': game, 'seed': seed, 'score': state.final_score, 'ticks': state.ticks,
+            'planning_time': round(state.planning_time, 6), 'precheck_time': round(state.precheck_time, 6),
+            'cause': state.cause, 'cache_hits': cache.hits - hits if cache is not None else 0,
+            'cache_misses': cache.misses - misses if cache is not None else 0}
+
+
+def game_seeds(base_seed, games):
+    """
+    Create independent seeds for each game.
+
+    Seeds are spawned from one base seed, so results do not depend on number of workers.
+
+    :param base_seed: Base seed (None for random seed)
+    :param games: Number of games
+    :return: Generator of seeds (int) for each game.
+    """
+    for child in np.random.SeedSequence(base_seed).spawn(games):
+        yield int(child.generate_state(1)[0])
+
+
+def run_games(games, workers=None, columns=25, rows=25, base_seed=None, planner='astar', replay_dir=None,
+              dataset_dir=None, cache_size=0):
+    """
+    Play games in separate processes.
+
+    :param games: Number of games
+    :param workers: Number of processes (None for number of processors)
+    :param columns: Number of tiles in one row
+    :param rows: Number of tiles in one column
+    :param base_seed: Base seed (None for random seed)
+    :param planner: Name of the pathfinding algorithm (key of planners.PLANNERS)
+    :param replay_dir: Directory for replay files of all games (None for no recording)
+    :param dataset_dir: Directory for training samples of all games (None for no export)
+    :param cache_size: Maximal number of paths in plan cache of each process (0 for no caching)
+    :return: Generator of results in order of finishing.
+    """
+    workers = workers or os.cpu_count() or 1
+    seeds = enumerate(game_seeds(base_seed, games))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for game, seed in seeds:  # Keep only few games waiting, so memory does not grow with number of games.
+            pending.add(executor.submit(play_game, game, seed, columns, rows, planner, replay_dir,
+                                        dataset_dir, cache_size))
+            if len(pending) >= workers * 4:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
+
+
+def play_games(games, columns, rows, planner, replay_dir=None, dataset_dir=None, cache_size=0):
+    """
+    Play several games in one process and collect only their statistics.
+
+    :param games: List of (number of the game, seed)
+    :param columns: Number of tiles in one row
+    :param rows: Number of tiles in one column
+    :param planner: Name of the pathfinding algorithm (key of planners.PLANNERS)
+    :param replay_dir: Directory for replay files (None for no recording)
+    :param dataset_dir: Directory for training samples (None for no export, see dataset.Writer)
+    :param cache_size: Maximal number of paths in plan cache of the process (0 for no caching)
+    :return: Statistics of the games (class stats.GameStats).
+    """
+    game_stats = stats.GameStats(columns, rows)
+    for game, seed in games:
+        game_stats.add_result(play_game(game, seed, columns, rows, planner, replay_dir, dataset_dir,
+                                        cache_size))
+    return game_stats
+
+
+def run_stats(games, workers=None, columns=25, rows=25, base_seed=None, planner='astar', chunk_size=64,
+              replay_dir=None, dataset_dir=None, cache_size=0):
+    """
+    Play games in separate processes and return only their statistics.
+
+    Each process sends statistics of whole chunk of games instead of each result,
+    statistics from all processes are merged.
+
+    :param games: Number of games
+    :param workers: Number of processes (None for number of processors)
+    :param columns: Number of tiles in one row
+    :param rows: Number of tiles in one column
+    :param base_seed: Base seed (None for random seed)
+    :param planner: Name of the pathfinding algorithm (key of planners.PLANNERS)
+    :param chunk_size: Number of games played by process in one request
+    :param replay_dir: Directory for replay files of all games (None for no recording)
+    :param dataset_dir: Directory for training samples of all games (None for no export)
+    :param cache_size: Maximal number of paths in plan cache of each process (0 for no caching)
+    :return: Statistics of all games (class stats.GameStats).
+    """
+    workers = workers or os.cpu_count() or 1
+    seeds = list(enumerate(game_seeds(base_seed, games)))
+    chunk_size = max(1, min(chunk_size, -(-games // workers)))
+    game_stats = stats.GameStats(columns, rows)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_games, seeds[i:i + chunk_size], columns, rows, planner, replay_dir,
+                                   dataset_dir, cache_size)
+                   for i in range(0, len(seeds), chunk_size)]
+        for future in concurrent.futures.as_completed(futures):
+            game_stats.merge(future.result())
+    return game_stats
+
+
+def main(argv=None):
+    """
+    Console entry point for playing many games controlled by AI.
+
+    Results of each game are written as soon as the game ends (JSON lines or CSV).
+    With --summary statistics of all games are written at the end (to standard error output),
+    with --summary-only only the statistics are written (to output).
+
+    :param argv: Command line arguments (None for sys.argv)
+    :return: Nothing
+    """
+    parser = argparse.ArgumentParser(description='Play many snake games controlled by AI without window.')
+    parser.add_argument('-n', '--games', type=int, default=100, help='number of games')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='number of processes (default: all cores)')
+    parser.add_argument('--columns', type=int, default=25, help='number of tiles in one row')
+    parser.add_argument('--rows', type=int, default=25, help='number of tiles in one column')
+    parser.add_argument('--seed', type=int, default=None, help='base seed (default: random)')
+    parser.add_argument('--planner', choices=sorted(planners.PLANNERS), default='astar', help='pathfinding algorithm')
+    parser.add_argument('--replay-dir', default=None, help='directory for replay files of all games')
+    parser.add_argument('--dataset-dir', default=None,
+                        help='directory for training samples (game field, head, apple, direction) of all games')
+    parser.add_argument('--plan-cache', type=int, default=0, metavar='N',
+                        help='cache up to N calculated paths in each process (default: no caching)')
+    parser.add_argument('-o', '--output', default='-', help='output file (default: standard output)')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default=None,
+                        help='output format (default: by file extension, jsonl otherwise)')
+    parser.add_argument('--summary', action='store_true', help='write statistics of all games to standard error')
+    parser.add_argument('--summary-only', action='store_true',
+                        help='write only statistics of all games '
+                             '(JSON, results of games are not sent between processes)')
+    args = parser.parse_args(argv)
+    try:
+        planners.check(args.planner, args.columns, args.rows)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.replay_dir:
+        os.makedirs(args.replay_dir, exist_ok=True)
+    if args.summary_only:
+        game_stats = run_stats(args.games, args.workers, args.columns, args.rows, args.seed, args.planner,
+                               replay_dir=args.replay_dir, dataset_dir=args.dataset_dir, cache_size=args.plan_cache)
+        output = sys.stdout if args.output == '-' else open(args.output, 'w')
+        output.write(json.dumps(game_stats.summary()) + '\n')
+        if output is not sys.stdout:
+            output.close()
+        return
+
+    output_format = args.format or ('csv' if args.output.endswith('.csv') else 'jsonl')
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    game_stats = stats.GameStats(args.columns, args.rows)
+    try:
+        writer = None
+        if output_format == 'csv':
+            writer = csv.DictWriter(output, fieldnames=FIELDS)
+            writer.writeheader()
+        for result in run_games(args.games, args.workers, args.columns, args.rows, args.seed, args.planner,
+                                args.replay_dir, args.dataset_dir, args.plan_cache):
+            if writer:
+                writer.writerow(result)
+            else:
+                output.write(json.dumps(result) + '\n')
+            output.flush()
+            game_stats.add_result(result)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if args.summary:
+        sys.stderr.write(json.dumps(game_stats.summary()) + '\n')
+
+
+if __name__ == '__main__':
+    main()
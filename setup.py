@@ -8,5 +8,10 @@ setup(
     license='',
     author='František Vančát',
     author_email='',
-    description=''
+    description='',
+    install_requires=['numpy', 'pyglet'],
+    entry_points={
+        'console_scripts': ['snake-batch=runner:main', 'snake-arena=arena:main'],
+        'gui_scripts': ['snake=main:main'],
+    },
 )
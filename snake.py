@@ -1,60 +1,82 @@
-import numpy as np
 import pyglet as pg
-import math
-import astar
+import collections
+import time
+import engine
+import planners
+import profiler
+
+
+def _state_attribute(name):
+    """
+    Create property, which passes access of the attribute to the game state.
+
+    :param name: Name of the attribute of the class GameState
+    :return: Property for the class Snake
+    """
+    return property(lambda self: getattr(self.state, name),
+                    lambda self, value: setattr(self.state, name, value))
 
 
 class Snake(pg.window.Window):
     """
     Manages core snake game.
 
-    Includes game window and all in-game technical and graphical behavior,
-    except for pathfinding algorithm, which has its own file.
+    Includes game window and all graphical behavior and keyboard controls.
+    Game situation and rules are in class GameState (file 'engine.py'),
+    pathfinding algorithm has its own file.
     """
 
-    def __init__(self, play_style=1):
+    final_score = _state_attribute('final_score')  # Achieved score
+    columns = _state_attribute('columns')  # Number of tiles in one row
+    rows = _state_attribute('rows')  # Number of tiles in one column
+    start_pos = _state_attribute('start_pos')  # Starting position for snake
+    length = _state_attribute('length')  # Length of snake (length of 1 is head without body)
+    direction = _state_attribute('direction')  # Direction for the next snake move (X axis, Y axis)
+    head = _state_attribute('head')  # Position of head of the snake
+    apple = _state_attribute('apple')  # Postion of apple
+    game_field = _state_attribute('game_field')  # Numpy array representing game
+    dir_list = _state_attribute('dir_list')  # List of directions to take (Last element is first direction to take)
+    active = _state_attribute('active')  # Indicates if game is active
+    stuck = _state_attribute('stuck')  # Indicates if AI found no way to apple (-> Keep same direction for snake)
+
+    def __init__(self, play_style=1, columns=25, rows=25, square_size=20, game_speed=30.0, planner='astar',
+                 background_planning=False, turbo=False, turbo_slice=0.01, turbo_multiplier=None):
         """
         Declaration of class parameters.
 
         :param play_style: Represents type of controls.
                            1: Manual play - Player controls snake using keyboard input.
                            2: Automated play - Snake is controlled by AI.
-        """
-        # self.test = 100  # Number of test runs
-        self.final_score = 0  # Achieved score
-        self.square_size = 20  # Size of one game tile
-        self.columns = 25  # Number of tiles in one row
-        self.rows = 25  # Number of tiles in one column
-        self.length = 1  # Length of snake (length of 1 is head without body)
+        :param columns: Number of tiles in one row
+        :param rows: Number of tiles in one column
+        :param square_size: Size of one game tile (pixels)
+        :param game_speed: Refresh rate for game-ticks (game-ticks per second)
+        :param planner: Name of the pathfinding algorithm for automated play (key of planners.PLANNERS)
+        :param background_planning: Calculate paths in worker thread, so game-tick does not wait for them
+        :param turbo: Start automated play in turbo mode (many game-ticks per drawn frame, toggled by T)
+        :param turbo_slice: Time (seconds) for game-ticks in one frame in turbo mode
+        :param turbo_multiplier: Speed of turbo mode as multiple of game_speed (None for as fast as turbo_slice allows)
+        """
+        self.state = engine.GameState(columns, rows, planner=planners.create(
+            planner, background_planning))  # Game situation and rules (without graphics)
+        self.square_size = square_size  # Size of one game tile
         self.play_style = play_style  # 1 = manual, 2 = AI (A*)
         self.keypress = 0  # Indicates if key was pressed during last game-tick.
         self.active = 0  # Indicates if game is active (is inactive after crashing the snake or before the game.
-        self.game_speed = 30.0  # Refresh rate for game-ticks
+        self.game_speed = game_speed  # Refresh rate for game-ticks
+        self.turbo = turbo  # Indicates if automated play runs in turbo mode (game-ticks are made while drawing)
+        self.turbo_slice = turbo_slice  # Time for game-ticks in one frame in turbo mode
+        self.turbo_multiplier = turbo_multiplier  # Speed of turbo mode as multiple of game_speed (None for maximum)
+        self.turbo_time = None  # Time of the last frame in turbo mode (None before the first frame)
+        self.turbo_ticks = 0.0  # Game-ticks, which are left from the last frame (multiplier is not whole number)
         self.green = (55, 255, 55)  # Color - Light green
         self.greenD = (25, 155, 25)  # Color - Dark green
         self.blue = (55, 55, 255)  # Color - Blue
         self.red = (255, 55, 55)  # Color - Red
         self.gray = (150, 150, 150)  # Color - Gray
-        self.start_pos = (math.floor(self.columns / 2), math.floor(self.rows / 2))  # Starting position for snake
-        self.direction = (0, 0)  # Direction for the next snake move (X axis, Y axis)
-        self.head = self.start_pos  # Position of head of the snake
-        self.apple = (np.random.randint(0, self.columns), np.random.randint(0, self.rows))  # Postion of apple
-        while self.apple == self.start_pos:  # Placing apple in empty space
-            self.apple = (np.random.randint(0, self.columns), np.random.randint(0, self.rows))
-
-        """
-        Numpy array representing game 
-
-        Biggest number is apple, Biggest number-1 is head of the snake.
-        Other non-zero numbers is body of the snake.
-        """
-        self.game_field = np.full((self.columns, self.rows), 0)  # Pre-filled array with 0
-        self.game_field[self.start_pos[0], self.start_pos[1]] = self.length  # Positioning head in numpy array
-        self.game_field[self.apple[0], self.apple[1]] = self.length + 1  # Positioning apple in numpy array
 
         self.batch = pg.graphics.Batch()  # Graphic group for snake and apple
         self.ai_lines = pg.graphics.Batch()  # Graphic group for lines (Path for automated snake)
-        self.stuck = 0  # Indicates if AI found no way to apple (-> Keep same direction for snake)
 
         # Window for the game
         super().__init__(width=self.columns * self.square_size, height=self.rows * self.square_size, caption='0')
@@ -64,9 +86,11 @@ class Snake(pg.window.Window):
                                           self.apple[1] * self.square_size,
                                           self.square_size, self.square_size,
                                           color=self.red, batch=self.batch)  # Shape for apple
-        self.dir_list = []  # List of directions to take (Last element is first direction to take)
-        self.draw_list = []  # List of parts of the snake, which will be drawn
-        self.draw_line = []  # List of coordinates to connect with lines (path of the automated snake)
+        self.draw_list = collections.deque()  # Shapes of parts of the snake (Last element is head)
+        self.draw_line = None  # Shape of the path of the automated snake
+        self.drawn_plan = 0  # Number of the path (GameState.plans), which is drawn
+        self.overlay = None  # Label with performance statistics (None when hidden, toggled by F3)
+        self.overlay_time = 0.0  # Time of the last update of the overlay text
 
     def run(self):
         """
@@ -83,43 +107,92 @@ class Snake(pg.window.Window):
         Updates all graphic.
 
         Called in update function (once per tick).
+        Shapes are reused, only the head and the tail of the snake are moved.
+        New shape is created only after eating the apple.
+        Path is drawn again only when it was calculated again.
 
         :return: Nothing
         """
-        self.draw_list = []
-        for i in range(0, self.columns):
-            for j in range(0, self.rows):
-                if self.game_field[i, j] == self.length:
-                    self.draw_list.append(pg.shapes.Rectangle(i * self.square_size,
-                                                              j * self.square_size,
-                                                              self.square_size,
-                                                              self.square_size,
-                                                              color=self.greenD, batch=self.batch))  # Head
-                elif 0 < self.game_field[i, j] < self.length:
-                    self.draw_list.append(pg.shapes.Rectangle(i * self.square_size,
-                                                              j * self.square_size,
-                                                              self.square_size,
-                                                              self.square_size,
-                                                              color=self.green, batch=self.batch))  # Body
-        if self.dir_list:  # If there are directions, draw them
-            coords = self.dir_to_coord(self.dir_list, self.head)
-            self.draw_line = []
-            for i in range(0, len(coords) - 1):
-                self.draw_line.append(pg.shapes.Line(coords[i][0], coords[i][1], coords[i + 1][0], coords[i + 1][1], 2,
-                                                     color=self.blue, batch=self.ai_lines))
-        else:
-            self.draw_line = []
+        head = self.draw_list[-1]
+        if len(self.draw_list) < self.length:  # Apple was eaten, tail stays and new segment is added
+            segment = pg.shapes.Rectangle(self.head[0] * self.square_size, self.head[1] * self.square_size,
+                                          self.square_size, self.square_size,
+                                          color=self.greenD, batch=self.batch)
+        else:  # Tail segment is moved to the new position of the head
+            segment = self.draw_list.popleft()
+            segment.x = self.head[0] * self.square_size
+            segment.y = self.head[1] * self.square_size
+        head.color = self.green  # Body
+        segment.color = self.greenD  # Head
+        self.draw_list.append(segment)
+        self.update_line()
+
+    def sync_graphics(self):
+        """
+        Move all shapes of the snake to the squares of its body.
+
+        Used in turbo mode, when many game-ticks are made between drawn frames.
+        Shapes are reused, shapes are added or removed only when the length changed.
+
+        :return: Nothing
+        """
+        body = self.state.body
+        while len(self.draw_list) > len(body):
+            self.draw_list.popleft().delete()
+        while len(self.draw_list) < len(body):
+            self.draw_list.appendleft(pg.shapes.Rectangle(0, 0, self.square_size, self.square_size,
+                                                          color=self.green, batch=self.batch))
+        for segment, (x, y) in zip(self.draw_list, body):
+            segment.x = x * self.square_size
+            segment.y = y * self.square_size
+            segment.color = self.green  # Body
+        self.draw_list[-1].color = self.greenD  # Head
+        self.appleS.x = self.apple[0] * self.square_size
+        self.appleS.y = self.apple[1] * self.square_size
+        super().set_caption(str(self.length - 1))
+        self.update_line()
+
+    def update_line(self):
+        """
+        Draw path of the automated snake again, when it was calculated again.
+
+        :return: Nothing
+        """
+        if self.state.plans != self.drawn_plan:  # Path was calculated again
+            self.drawn_plan = self.state.plans
+            self.delete_line()
+            if self.dir_list:
+                self.draw_line = pg.shapes.MultiLine(*self.dir_to_coord(self.dir_list, self.head), thickness=2,
+                                                     color=self.blue, batch=self.ai_lines)
+        elif not self.dir_list:
+            self.delete_line()
+
+    def delete_line(self):
+        """
+        Remove shape of the path of the automated snake.
+
+        :return: Nothing
+        """
+        if self.draw_line is not None:
+            self.draw_line.delete()
+            self.draw_line = None
 
     def on_draw(self):
         """
         Clear screen and draw prepared graphics
 
+        In turbo mode game-ticks are made before drawing (see turbo_frame).
+
         :return: Nothing
         """
+        if self.turbo_running:
+            self.turbo_frame()
         self.clear()
+        if self.draw_line is not None:
+            self.ai_lines.draw()  # Body of the snake covers part of the path, which was already taken
         self.batch.draw()
-        if self.draw_line:
-            self.ai_lines.draw()
+        if self.overlay is not None:
+            self.overlay.draw()
 
     def on_key_press(self, symbol, modifiers):
         """
@@ -148,42 +221,101 @@ class Snake(pg.window.Window):
                     self.direction = (1, 0)
         if symbol == pg.window.key.ESCAPE:  # Quit the current game
             self.end_game()
+        if symbol == pg.window.key.F3:  # Show or hide performance overlay
+            self.toggle_overlay()
+        if symbol == pg.window.key.T:  # Switch between real-time and turbo mode
+            self.toggle_turbo()
+
+    @property
+    def turbo_running(self):
+        """
+        Indicates if game-ticks are made in turbo mode (only automated play).
+
+        :return: True, if turbo mode is on and AI plays.
+        """
+        return self.turbo and self.play_style != 1 and self.active == 1
 
-    def get_direction(self):
+    def toggle_turbo(self):
         """
-        Calls algorithm, which return calculated path from head to apple.
+        Switch between real-time (one game-tick per update) and turbo mode (many game-ticks per drawn frame).
 
-        Currently used algorithm is basic A*.
-        Calculated path is saved as one of the class parameters. (dir_list)
-        Path is represented as list of direction,
-        which are selected one by one to direct snake for every following square.
-        Directions is used for telling the snake, where to move next each frame.
+        :return: Nothing
+        """
+        self.turbo = not self.turbo
+        self.turbo_time = None
+        self.turbo_ticks = 0.0
+
+    def turbo_frame(self):
+        """
+        Make game-ticks for one drawn frame in turbo mode, then update graphics once.
 
-        Directions:
-            Go up    = ( 0,  1)
-            Go down  = ( 0, -1)
-            Go left  = (-1,  0)
-            Go right = ( 1,  0)
+        Game-ticks are made until the time slice runs out, or (with multiplier) until the game
+        is turbo_multiplier times faster than real-time (but at most for the time slice).
 
         :return: Nothing
         """
-        self.dir_list = astar.calculate_path(self.game_field, self.length, self.head,
-                                             self.apple, self.columns, self.rows)
-        if not self.dir_list:
-            self.stuck = 1
+        start = time.perf_counter()
+        limit = float('inf')  # Number of game-ticks for this frame
+        if self.turbo_multiplier is not None:
+            if self.turbo_time is not None:
+                self.turbo_ticks += (start - self.turbo_time) * self.game_speed * self.turbo_multiplier
+            limit = int(self.turbo_ticks)
+            self.turbo_ticks -= limit
+        self.turbo_time = start
+        ticks = 0
+        while ticks < limit and self.state.step_ai():
+            ticks += 1
+            if time.perf_counter() - start >= self.turbo_slice:
+                break
+        if self.active != 1:
+            self.end_game()
+            return
+        if self.state.profiler is not None:
+            middle = time.perf_counter()
+            self.sync_graphics()
+            self.state.profiler.add('graphics', middle, time.perf_counter())
+            if self.overlay is not None:
+                self.update_overlay()
+        else:
+            self.sync_graphics()
+
+    def toggle_overlay(self):
+        """
+        Show or hide performance overlay.
+
+        Showing overlay starts recording to the profiler (if it is not recording already).
 
-    def update_direction(self):
+        :return: Nothing
         """
-        Change direction of the head of the snake.
+        if self.overlay is None:
+            if self.state.profiler is None:
+                self.state.profiler = profiler.Profiler()
+            self.overlay = pg.text.Label('', font_name='Calibri', font_size=9, x=4, y=self.height - 4,
+                                         width=self.width - 8, anchor_x='left', anchor_y='top',
+                                         multiline=True, color=(255, 255, 255, 255))
+            self.overlay_time = 0.0
+        else:
+            self.overlay.delete()
+            self.overlay = None
 
-        Take following direction from direction list and set it as current direction.
-        Remove that direction from direction list.
+    def update_overlay(self):
+        """
+        Update text of the performance overlay (at most twice a second).
 
         :return: Nothing
         """
-        if self.dir_list:
-            self.direction = self.dir_list[len(self.dir_list) - 1]
-            self.dir_list.pop(len(self.dir_list) - 1)
+        now = time.perf_counter()
+        if now - self.overlay_time < 0.5:
+            return
+        self.overlay_time = now
+        summary = self.state.profiler.summary()
+        lines = ['{}: {:.3f} ms (p99 {:.3f})'.format(name, summary[name]['mean'] * 1000, summary[name]['p99'] * 1000)
+                 for name in profiler.PHASES]
+        lines.append('expanded: {:.0f}, max opened: {:.0f}'.format(summary['expanded']['last'],
+                                                                   summary['max_opened']['last']))
+        lines.append('path: {:.0f}, replans: {:.0f}'.format(summary['path_length']['last'],
+                                                            summary['replans']['last']))
+        self.overlay.text = '\n'.join(lines)
 
     def dir_to_coord(self, directions, start):
         """
@@ -202,29 +334,6 @@ class Snake(pg.window.Window):
                            coords[-1][1] + (directions[i][1] * self.square_size)))
         return coords
 
-    def place_apple(self):
-        """
-        Place apple in free area.
-
-        After taking the apple (Or at the start of the new game) places apple in are, where is unocuppied space.
-
-        :return: Nothing
-        """
-        if self.length < self.columns*self.rows-1:
-            empty = []
-            for i in range(0, self.columns):
-                for j in range(0, self.rows):
-                    if self.game_field[i, j] == 0:
-                        empty.append((i, j))
-            apple_pos = np.random.randint(0, len(empty))
-            self.apple = (empty[apple_pos][0], empty[apple_pos][1])
-            self.appleS.x = self.apple[0] * self.square_size
-            self.appleS.y = self.apple[1] * self.square_size
-        else:
-            self.apple = (-1, -1)
-            self.appleS.x = self.apple[0] * self.square_size
-            self.appleS.y = self.apple[1] * self.square_size
-
     def init_game(self):
         """
         Prepare new game.
@@ -233,19 +342,19 @@ class Snake(pg.window.Window):
 
         :return: Nothing
         """
-        self.direction = (0, 0)
-        self.head = self.start_pos
-        self.length = 1
-        self.apple = (np.random.randint(0, self.columns), np.random.randint(0, self.rows))
-        while self.apple == self.start_pos:
-            self.apple = (np.random.randint(0, self.columns), np.random.randint(0, self.rows))
+        self.state.reset()
         self.appleS.x = self.apple[0] * self.square_size
         self.appleS.y = self.apple[1] * self.square_size
-        self.game_field = np.full((self.columns, self.rows), 0)
-        self.game_field[self.head[0], self.head[1]] = self.length
-        self.game_field[self.apple[0], self.apple[1]] = self.length + 1
-        self.dir_list = []
-        self.stuck = 0
+        for segment in self.draw_list:
+            segment.delete()
+        self.draw_list.clear()
+        self.draw_list.append(pg.shapes.Rectangle(self.head[0] * self.square_size, self.head[1] * self.square_size,
+                                                  self.square_size, self.square_size,
+                                                  color=self.greenD, batch=self.batch))  # Head
+        self.delete_line()
+        self.drawn_plan = self.state.plans
+        self.turbo_time = None
+        self.turbo_ticks = 0.0
         super().set_caption(str(self.length - 1))
 
     def on_close(self):
@@ -264,83 +373,44 @@ class Snake(pg.window.Window):
         Set the game to its inactive state.
 
         Set some parameters to default values to make game inactive.
+        Game, which is still active, is ended by the player (cause 'quit'),
+        cause of the game ended by the game state ('wall', 'body' or 'full') is kept.
 
         :return: Nothing
         """
-        self.active = 0
-        self.final_score = self.length - 1
+        if self.state.active == 1:
+            self.state.end_game()
         self.set_visible(False)
 
-    def collision_sides(self):
-        """
-        Check for collisions with window borders.
-
-        :return: Nothing
-        """
-        new_pos = (self.head[0] + self.direction[0], self.head[1] + self.direction[1])
-        if new_pos[0] < 0 or new_pos[0] > self.columns - 1 or new_pos[1] < 0 or new_pos[1] > self.rows - 1:
-            self.end_game()
-
-    def collision_apple(self):
-        """
-        Check if snake eated the apple.
-
-        When snake hits the apple, increase the length of the snake and place new apple.
-
-        :return: Nothing
-        """
-        if self.head[0] == self.apple[0] and self.head[1] == self.apple[1]:
-            self.length = self.length + 1
-            for i in range(0, self.columns):
-                for j in range(0, self.rows):
-                    if self.game_field[i, j] != 0:
-                        self.game_field[i, j] += 1
-            super().set_caption(str(self.length - 1))
-            self.place_apple()
-
-    def collision_body(self):
-        """
-        Check if snake hit itself.
-
-        If yes, then end the game.
-
-        :return: Nothing
-        """
-        new_pos = (self.head[0] + self.direction[0], self.head[1] + self.direction[1])
-        if new_pos[0] >= self.columns or new_pos[1] >= self.rows:
-            self.end_game()
-        elif 0 < self.game_field[new_pos[0], new_pos[1]] < self.length:
-            self.end_game()
-
-    def update_game_field(self):
-        """
-        Update numpy array representing the game situation.
-
-        :return: Nothing
-        """
-        self.game_field -= 1
-        self.game_field[self.head[0], self.head[1]] = self.length
-        self.game_field[self.apple[0], self.apple[1]] = self.length + 1
-        self.game_field = np.clip(self.game_field, 0, None)
-
     def update(self, dt):
         """
         Update game situation.
 
-        Check for collisions, update positions, graphics and calculate path
+        Move the snake using the game state (AI or keyboard direction), then update graphics.
+        In turbo mode game-ticks are made while drawing instead (see turbo_frame).
 
         :param dt: Number of seconds since the last tick
         :return: Nothing
         """
-        if self.active == 1:
+        if self.active == 1 and not self.turbo_running:
             self.keypress = 0
-            if not self.dir_list and self.stuck == 0 and self.play_style != 1:
-                self.get_direction()
-            self.update_direction()
-            self.collision_sides()
-            self.collision_body()
+            length = self.length
+            if self.play_style != 1:
+                self.state.step_ai()
+            else:
+                self.state.step()
             if self.active == 1:
-                self.head = (self.head[0] + self.direction[0], self.head[1] + self.direction[1])
-                self.collision_apple()
-                self.update_game_field()
-                self.update_graphics()
+                if self.length != length:  # Apple was eaten
+                    self.appleS.x = self.apple[0] * self.square_size
+                    self.appleS.y = self.apple[1] * self.square_size
+                    super().set_caption(str(self.length - 1))
+                if self.state.profiler is not None:
+                    start = time.perf_counter()
+                    self.update_graphics()
+                    self.state.profiler.add('graphics', start, time.perf_counter())
+                    if self.overlay is not None:
+                        self.update_overlay()
+                else:
+                    self.update_graphics()
+            else:
+                self.end_game()
@@ -0,0 +1,213 @@
+import math
+
+PERCENTILES = [50, 90, 99]  # Approximated percentiles in summaries
+
+
+class Stream:
+    """
+    Statistics of one value (e.g. score) computed one record at a time in constant memory.
+
+    Keeps count, minimum, maximum, mean and variance (Welford's online algorithm)
+    and histogram with fixed bins, from which percentiles are approximated.
+    Values outside of the histogram range are counted in the first or the last bin.
+    Two streams with same bins can be merged (e.g. results from more processes).
+    """
+
+    def __init__(self, low=0.0, high=1.0, bins=64, log=False):
+        """
+        Declaration of class parameters.
+
+        :param low: Lower bound of the histogram
+        :param high: Upper bound of the histogram
+        :param bins: Number of bins of the histogram
+        :param log: Use logarithmic bins (low has to be positive)
+        """
+        self.low = low  # Lower bound of the histogram
+        self.high = high  # Upper bound of the histogram
+        self.log = log  # Indicates if bins are logarithmic
+        self.histogram = [0] * bins  # Number of values in each bin
+        self.count = 0  # Number of values
+        self.mean = 0.0  # Mean of values
+        self.m2 = 0.0  # Sum of squared differences from the mean
+        self.min = None  # Smallest value
+        self.max = None  # Biggest value
+        self.last = None  # Last added value
+
+    def _position(self, value):
+        """
+        Convert value to position in the histogram (0 is low, number of bins is high).
+
+        :param value: Value
+        :return: Position (float)
+        """
+        if self.log:
+            value = math.log(max(value, self.low))
+            return (value - math.log(self.low)) / (math.log(self.high) - math.log(self.low)) * len(self.histogram)
+        return (value - self.low) / (self.high - self.low) * len(self.histogram)
+
+    def _value(self, position):
+        """
+        Convert position in the histogram to value (see _position).
+
+        :param position: Position (float)
+        :return: Value
+        """
+        part = position / len(self.histogram)
+        if self.log:
+            return math.exp(math.log(self.low) + part * (math.log(self.high) - math.log(self.low)))
+        return self.low + part * (self.high - self.low)
+
+    def add(self, value):
+        """
+        Add one value.
+
+        :param value: Value
+        :return: Nothing
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.count == 1:
+            self.min = self.max = value
+        elif value < self.min:
+            self.min = value
+        elif value > self.max:
+            self.max = value
+        self.last = value
+        index = min(max(int(self._position(value)), 0), len(self.histogram) - 1)
+        self.histogram[index] += 1
+
+    def merge(self, other):
+        """
+        Add all values of other stream (with same bins).
+
+        :param other: Other stream (class Stream)
+        :return: Nothing
+        """
+        if (other.low, other.high, other.log, len(other.histogram)) != (self.low, self.high, self.log,
+                                                                        len(self.histogram)):
+            raise ValueError('Streams with different bins can not be merged')
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.min, self.max = other.min, other.max
+        else:
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.last = other.last
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    @property
+    def variance(self):
+        """
+        Variance of values (population variance).
+
+        :return: Variance (0 for less than two values)
+        """
+        return self.m2 / self.count if self.count > 1 else 0.0
+
+    def percentile(self, q):
+        """
+        Approximate percentile from the histogram (linear inside of the bin).
+
+        :param q: Percentile (0-100)
+        :return: Approximated value (None for no values)
+        """
+        if self.count == 0:
+            return None
+        rank = q / 100 * self.count
+        total = 0
+        for index, number in enumerate(self.histogram):
+            if number and total + number >= rank:
+                value = self._value(index + (rank - total) / number)
+                return min(max(value, self.min), self.max)
+            total += number
+        return self.max
+
+    def summary(self):
+        """
+        Summarize the stream.
+
+        :return: Dictionary with 'count', 'mean', 'std', 'min', 'max' and percentiles ('p50', 'p90', 'p99').
+        """
+        result = {'count': self.count, 'mean': self.mean, 'std': math.sqrt(self.variance),
+                  'min': self.min, 'max': self.max}
+        for q in PERCENTILES:
+            result['p{}'.format(q)] = self.percentile(q)
+        return result
+
+
+class GameStats:
+    """
+    Statistics of finished games (score, game-ticks and planning time per game) in constant memory.
+
+    Used by menu window (main.py) and by batch runs (runner.py), where statistics of games played
+    in each process are merged.
+    """
+
+    def __init__(self, columns=25, rows=25):
+        """
+        Declaration of class parameters.
+
+        :param columns: Number of tiles in one row (range of the score histogram)
+        :param rows: Number of tiles in one column (range of the score histogram)
+        """
+        self.score = Stream(0, columns * rows, bins=min(columns * rows, 256))  # Achieved scores
+        self.ticks = Stream(1, 1e8, bins=128, log=True)  # Game-ticks in one game
+        self.planning_time = Stream(1e-6, 1e4, bins=128, log=True)  # Seconds of pathfinding in one game
+
+    @property
+    def count(self):
+        """
+        Number of finished games.
+
+        :return: Number of games
+        """
+        return self.score.count
+
+    def add(self, score, ticks, planning_time):
+        """
+        Add finished game.
+
+        :param score: Achieved score
+        :param ticks: Number of game-ticks
+        :param planning_time: Seconds spent in pathfinding algorithm
+        :return: Nothing
+        """
+        self.score.add(score)
+        self.ticks.add(ticks)
+        self.planning_time.add(planning_time)
+
+    def add_result(self, result):
+        """
+        Add finished game from result of runner (see runner.play_game).
+
+        :param result: Dictionary with 'score', 'ticks' and 'planning_time'
+        :return: Nothing
+        """
+        self.add(result['score'], result['ticks'], result['planning_time'])
+
+    def merge(self, other):
+        """
+        Add all games of other statistics (e.g. from other process).
+
+        :param other: Other statistics (class GameStats)
+        :return: Nothing
+        """
+        self.score.merge(other.score)
+        self.ticks.merge(other.ticks)
+        self.planning_time.merge(other.planning_time)
+
+    def summary(self):
+        """
+        Summarize all statistics.
+
+        :return: Dictionary (name -> summary of the stream, see Stream.summary).
+        """
+        return {'games': self.count, 'score': self.score.summary(), 'ticks': self.ticks.summary(),
+                'planning_time': self.planning_time.summary()}
@@ -1,6 +1,28 @@
+import arena
 import astar
+import background
+import batch
+import bench
+import dataset
+import engine
+import hamiltonian
+import hierarchical
+import incremental
+import json
+import lookahead
 import numpy as np
-import snake
+import os
+import plancache
+import planners
+import profiler
+import pytest
+import replay
+import runner
+import stats
+import subprocess
+import sys
+import threading
+import wavefront
 
 
 def test_path1():
@@ -39,7 +61,107 @@ def test_path3():
 	assert x == y == 0
 
 
+def test_path4():
+	arr = np.full((5, 5), 0)
+	arr[0][0] = 1
+	arr[1][0] = arr[1][1] = arr[1][2] = arr[1][3] = 9  # Wall, that will not disappear in time.
+	arr[4][0] = 2
+	path = astar.calculate_path(arr, 1, (0, 0), (4, 0), 5, 5)
+	assert len(path) == 12
+	arr[1][4] = 9
+	assert astar.calculate_path(arr, 1, (0, 0), (4, 0), 5, 5) is None
+
+
+def test_path5():
+	field, length, head, apple = bench.synthetic_field(20, 0.3, 2)
+	path, complete = astar.calculate_path_budget(field, length, head, apple, 20, 20)
+	assert complete and path == astar.calculate_path(field, length, head, apple, 20, 20)
+	path, complete = astar.calculate_path_budget(field, length, head, apple, 20, 20, max_expanded=5)
+	assert not complete and 0 < len(path) <= 5
+	x, y = head
+	for g, (dx, dy) in enumerate(reversed(path), 1):
+		x, y = x + dx, y + dy
+		assert field[x, y] == 0 or field[x, y] < g
+	assert abs(x - apple[0]) + abs(y - apple[1]) < abs(head[0] - apple[0]) + abs(head[1] - apple[1])
+	planner = astar.BudgetPlanner(max_expanded=5)
+	assert planner(field, length, head, apple, 20, 20) == path and planner.partial_paths == 1
+	assert astar.calculate_path_budget(field, length, head, apple, 20, 20, time_budget=0)[1] is False
+
+
+def test_path6():
+	arr = np.full((5, 5), 0)
+	arr[0][0] = 1
+	arr[4][4] = 2
+	target = [(1, 0), (1, 0), (1, 0), (1, 0), (0, 1), (0, 1), (0, 1), (0, 1)]  # Ties: smaller h, then order of sides
+	assert astar.calculate_path(arr, 1, (0, 0), (4, 4), 5, 5) == target
+	cases = bench.recorded_states() + [bench.synthetic_field(15, 0.5, seed) for seed in range(0, 10)]
+	for field, length, head, apple in cases:  # Paths are valid and shortest, None only without any path
+		path = astar.calculate_path(field, length, head, apple, field.shape[0], field.shape[1])
+		distance = wavefront.distance_field(field, length, head, field.shape[0], field.shape[1])[apple]
+		assert (path is None) == (distance < 0)
+		if path is not None:
+			assert len(path) == distance
+			x, y = head
+			for g, (dx, dy) in enumerate(reversed(path), 1):
+				x, y = x + dx, y + dy
+				assert field[x, y] in (0, length + 1) or field[x, y] < g
+			assert (x, y) == apple
+
+
+def test_reach1():
+	arr = np.full((5, 5), 0)
+	arr[0][0] = 1
+	arr[1][0] = arr[1][1] = arr[1][2] = arr[1][3] = 9
+	arr[4][0] = 2
+	found, size, region = astar.reachable(arr, 1, (0, 0), (4, 0), 5, 5, stop_at_apple=False)
+	assert found and size == 25 and region.all()  # Wall disappears before the whole board is filled
+	arr[1][4] = 9
+	found, size, region = astar.reachable(arr, 1, (0, 0), (4, 0), 5, 5)
+	assert not found and size == 5
+	assert region.sum() == 5 and region[0].all()
+
+
+def test_wave1():
+	for seed in range(0, 10):
+		field, length, head, apple = bench.synthetic_field(15, 0.5, seed)
+		path = wavefront.calculate_path(field, length, head, apple, 15, 15)
+		expected = astar.calculate_path(field, length, head, apple, 15, 15)
+		assert (path is None) == (expected is None)
+		if path:
+			assert len(path) == len(expected)
+			x, y = head
+			for g, (dx, dy) in enumerate(reversed(path), 1):
+				x, y = x + dx, y + dy
+				assert field[x, y] in (0, length + 1) or field[x, y] < g
+			assert (x, y) == apple
+	arr = np.full((5, 5), 0)
+	arr[2, :] = [1, 2, 3, 4, 5]  # Snake with head at the top
+	arr[0, 0] = 6
+	planner = wavefront.WavefrontPlanner()
+	assert len(planner(arr, 5, (2, 4), (0, 0), 5, 5)) == 6
+	assert planner.distances[2, 1] == 5 and planner.distances[2, 0] == 6
+	assert planner.region_size == 25 and planner.tail_reachable
+
+
+def load_snake():
+	pyglet = pytest.importorskip('pyglet')
+	try:
+		import snake
+		pyglet.display.get_display()
+	except Exception:  # Window of the game needs display (or PYGLET_HEADLESS=1)
+		pytest.skip('no display')
+	return snake
+
+
+def test_import1():
+	code = 'import sys, bench, engine, main, planners, runner; print("pyglet" in sys.modules)'
+	result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+							capture_output=True, text=True)
+	assert result.stdout.strip() == 'False'
+
+
 def test_snk1():
+	snake = load_snake()
 	snk = snake.Snake(play_style=2)
 	snk.run()
 	snk.apple = (0, 0)
@@ -52,6 +174,7 @@ def test_snk1():
 
 
 def test_snk2():
+	snake = load_snake()
 	snk = snake.Snake(play_style=2)
 	snk.run()
 	snk.apple = (0, 0)
@@ -65,6 +188,7 @@ def test_snk2():
 
 
 def test_snk3():
+	snake = load_snake()
 	snk = snake.Snake(play_style=1)
 	snk.run()
 	snk.apple = (1, 1)
@@ -75,3 +199,529 @@ def test_snk3():
 	assert snk.head == (0, 0)
 	assert snk.active == 0
 	assert snk.final_score == 0
+	assert snk.state.cause == 'wall'  # Cause is kept, when window ends the game
+	snk.run()
+	snk.end_game()
+	assert snk.state.cause == 'quit'
+
+
+def test_snk4():
+	snake = load_snake()
+	snk = snake.Snake(play_style=2)
+	snk.run()
+	shapes = []
+	for i in range(0, 300):
+		snk.update(snk)
+		if snk.active == 0:
+			break
+		cells = {(int(r.x) // snk.square_size, int(r.y) // snk.square_size) for r in snk.draw_list}
+		field = {tuple(c) for c in np.argwhere((snk.game_field > 0) & (snk.game_field <= snk.length))}
+		assert cells == field
+		shapes.append(snk.draw_list[0])
+	assert len(set(map(id, shapes))) <= snk.length + 1
+	snk.end_game()
+
+
+def test_snk5():
+	snake = load_snake()
+	snk = snake.Snake(play_style=2, turbo=True, turbo_multiplier=None)
+	snk.run()
+	snk.update(snk)
+	assert snk.state.ticks == 0
+	snk.on_draw()
+	assert snk.state.ticks > 1 or snk.active == 0
+	if snk.active == 1:
+		cells = [(int(r.x) // snk.square_size, int(r.y) // snk.square_size) for r in snk.draw_list]
+		assert cells == list(snk.state.body)
+		snk.toggle_turbo()
+		ticks = snk.state.ticks
+		snk.update(snk)
+		assert snk.state.ticks == ticks + 1
+	snk.end_game()
+
+
+def test_engine1():
+	game1 = engine.GameState(seed=5)
+	game2 = engine.GameState(seed=5)
+	for i in range(0, 200):
+		game1.step_ai()
+		game2.step_ai()
+	assert game1.length == game2.length > 1
+	assert game1.head == game2.head
+	assert (game1.game_field == game2.game_field).all()
+
+
+def test_engine2():
+	game = engine.GameState(columns=5, rows=5, seed=1)
+	game.apple = (0, 0)
+	while game.step((1, 0)):
+		pass
+	assert game.active == 0
+	assert game.head == (4, 2)
+	assert game.ticks == 2
+
+
+def test_engine3():
+	game = engine.GameState(columns=10, rows=10, seed=2)
+	while game.step_ai() and game.length < 8:
+		pass
+	field = game.game_field
+	assert [field[x, y] for x, y in game.body] == list(range(1, game.length + 1))
+	assert field[game.apple[0], game.apple[1]] == game.length + 1
+	assert np.count_nonzero(field) == game.length + 1
+
+
+def test_engine4():
+	game = engine.GameState(columns=10, rows=10, seed=4)
+	while game.step_ai() and game.length < 15:
+		assert len(game.free) == 100 - game.length
+		assert game.apple in game.free
+	free = {divmod(i, 10) for i in game.free.cells}
+	assert free == {tuple(c) for c in np.argwhere(game.vacancy <= game.clock)}
+
+
+def test_engine5():
+	assert engine.field_dtype(5, 5) == np.int8
+	assert engine.field_dtype(25, 25) == np.int16
+	assert engine.field_dtype(500, 500) == np.int32
+	game1 = engine.GameState(6, 6, 7, incremental.IncrementalPlanner())
+	game2 = engine.GameState(6, 6, 7, incremental.IncrementalPlanner())
+	game2.dtype = np.int64
+	game2.reset(7)
+	while game1.active == 1:
+		assert game1.step_ai() == game2.step_ai()
+		assert game1.head == game2.head
+		assert (game1.game_field == game2.game_field).all()
+	assert game1.clock_base > 0  # Clock was moved back
+	assert game1.final_score == game2.final_score
+
+
+def test_cells1():
+	cells = engine.CellSet(3, 2)
+	cells.remove((0, 0))
+	cells.remove((2, 1))
+	cells.remove((2, 1))
+	assert len(cells) == 4 and (0, 0) not in cells and (1, 1) in cells
+	cells.add((0, 0))
+	assert sorted(cells.cells) == [0, 1, 2, 3, 4]
+	for i in range(0, 5):
+		cells.remove(divmod(i, 2))
+	cells.add((2, 1))
+	assert cells.choice(np.random.default_rng(0)) == (2, 1)
+
+
+def test_incremental1():
+	planner = incremental.IncrementalPlanner()
+	game = engine.GameState(columns=5, rows=5, seed=0, planner=planner)
+	game.vacancy[:] = 0
+	game.vacancy[1, :] = game.clock + 3  # Wall, which will disappear after 3 game-ticks
+	game.head = (0, 2)
+	game.body.clear()
+	game.body.append(game.head)
+	game.vacancy[0, 2] = game.clock + 1
+	game.apple = (4, 2)
+	game.step_ai()
+	assert game.stuck == 1 and game.active == 1
+	assert planner.retry_clock == 3
+	assert planner.region_size == 5 and planner.searches == 0
+	for i in range(0, 10):
+		game.step_ai()
+		if game.length == 2:
+			break
+	assert game.length == 2 and game.active == 1
+	assert planner.searches == 1
+	game.reset(0)  # New game with same planner, first apple is same as the last apple of the old game
+	planner.apple = game.apple
+	planner.retry_clock = 10 ** 6
+	game.step_ai()
+	assert planner.retry_clock is None and game.stuck == 0 and game.dir_list
+
+
+def test_snapshot1():
+	game = engine.GameState(columns=10, rows=10, seed=3)
+	for i in range(0, 20):
+		game.step_ai()
+	snapshot = game.snapshot()
+	copy = game.clone()
+	moves = []
+	while game.active:
+		game.step_ai()
+		moves.append(game.direction)
+	field, score = game.game_field, game.final_score
+	assert (copy.ticks, copy.active) == (20, 1)
+	for direction in moves:
+		copy.step(direction)
+	assert (copy.game_field == field).all() and copy.final_score == score
+	game.restore(snapshot)
+	assert (game.ticks, game.active, len(game.body)) == (20, 1, game.length)
+	for direction in moves:
+		game.step(direction)
+	assert (game.game_field == field).all() and game.cause == copy.cause
+
+
+def test_lookahead1():
+	planner = lookahead.LookaheadPlanner()
+	game = engine.GameState(columns=8, rows=8, seed=1, planner=planner)
+	while game.step_ai():
+		pass
+	other = engine.GameState(columns=8, rows=8, seed=1)
+	while other.step_ai():
+		pass
+	assert planner.rollouts >= game.plans > 0
+	assert game.final_score > other.final_score
+
+
+def test_hierarchical1():
+	assert hierarchical.entrances(np.array([True, True, False, True, True, True, True, True, True, False])) == [0, 3, 8]
+	planner = hierarchical.HierarchicalPlanner(cluster_size=8)
+	game_field = np.zeros((40, 30), dtype=int)
+	game_field[10, :25] = 2  # Wall, which stays longer than the path
+	game_field[35, 20] = 2  # Apple
+	path = planner(game_field, 1, (2, 2), (35, 20), 40, 30)
+	assert planner.search((2, 2), (35, 20))[-1][1] == len(astar.calculate_path(game_field, 1, (2, 2), (35, 20), 40, 30))
+	assert len(path) >= planner.refine_distance  # Only leading segment is refined
+	assert planner.fallbacks == 0 and planner.built < 20  # Only clusters near the path were built
+	game = engine.GameState(columns=64, rows=64, seed=0, planner=planner)
+	while game.step_ai():
+		pass
+	assert game.final_score > 20 and game.plans > game.final_score
+	assert planner.invalidated < game.plans * 6  # Only clusters near head and tail are invalidated
+
+
+def test_hamiltonian1():
+	order, steps = hamiltonian.cycle(6, 5)
+	assert sorted(order) == list(range(0, 30))
+	square = (0, 0)
+	for i in range(0, 30):
+		assert order[square[0] * 5 + square[1]] == i
+		square = (square[0] + steps[square[0] * 5 + square[1]][0], square[1] + steps[square[0] * 5 + square[1]][1])
+	assert square == (0, 0)
+	with pytest.raises(ValueError):
+		hamiltonian.cycle(5, 5)
+	for seed in range(0, 5):
+		game = engine.GameState(columns=6, rows=6, seed=seed, planner=planners.create('hamiltonian'))
+		while game.step_ai():
+			pass
+		assert (game.cause, game.final_score) == ('full', 34)
+
+
+def test_hamiltonian2(capsys):
+	planners.check('hamiltonian', 24, 25)
+	for columns, rows in ((25, 25), (5, 7), (1, 4)):  # Odd x odd or too small board has no cycle
+		with pytest.raises(ValueError):
+			planners.check('hamiltonian', columns, rows)
+	with pytest.raises(SystemExit):
+		runner.main(['--planner', 'hamiltonian', '-n', '1'])  # Default board 25x25
+	assert 'Hamiltonian cycle does not exist' in capsys.readouterr().err
+	main = pytest.importorskip('main')
+	with pytest.raises(SystemExit):
+		main.parse_args(['--planner', 'hamiltonian', '--columns', '11', '--rows', '11'])
+	assert main.parse_args(['--planner', 'hamiltonian', '--columns', '12']).columns == 12
+
+
+def test_background2():
+	main = pytest.importorskip('main')
+	for name in ('incremental', 'hamiltonian', 'lookahead', 'hierarchical'):  # Planners with update
+		with pytest.raises(ValueError):
+			planners.check(name, 24, 24, background_planning=True)
+		with pytest.raises(SystemExit):
+			main.parse_args(['--planner', name, '--columns', '24', '--background'])
+	assert main.parse_args(['--planner', 'wavefront', '--background']).background
+
+
+def test_background1():
+	game = engine.GameState(columns=10, rows=10, seed=1, planner=background.BackgroundPlanner(wait=None))
+	while game.step_ai():
+		pass
+	assert game.planner.requests > 0 and game.planner.discarded == 0 and game.final_score > 0
+	event = threading.Event()
+
+	def slow(*args):
+		event.wait(5)
+		return astar.calculate_path(*args)
+
+	planner = background.BackgroundPlanner(slow, wait=0)
+	game = engine.GameState(columns=10, rows=10, seed=1, planner=planner)
+	game.apple = (5, 9)
+	game.step_ai()  # Request is not finished, snake makes survival move
+	assert planner.request is not None and game.ticks == 1 and game.head != game.start_pos
+	event.set()
+	planner.request.result()
+	game.step_ai()  # Path from the start is joined from the current head
+	assert planner.request is None and planner.discarded == 0
+	x, y = game.head
+	for dx, dy in reversed(game.dir_list):
+		x, y = x + dx, y + dy
+	assert (x, y) == game.apple
+
+
+def test_batch1():
+	games1 = batch.BatchState(20, columns=10, rows=10, seed=3)
+	games2 = batch.BatchState(20, columns=10, rows=10, seed=3)
+	scores = games1.run()
+	assert (scores == games2.run()).all()
+	assert games1.active.sum() == 0
+	assert (scores > 0).all()
+	assert (scores == games1.lengths - 1).all()
+
+
+def test_batch2():
+	games = batch.BatchState(2, columns=5, rows=5, seed=0)
+	games.paths[:, 0] = batch.DIRECTION_CODES[(1, 0)]
+	games.paths[:, 1] = batch.DIRECTION_CODES[(1, 0)]
+	games.path_lengths[:] = 2
+	games.apples[:] = (0, 0)
+	assert games.step_ai() == 2
+	assert (games.heads == (3, 2)).all()
+	assert games.game_fields[0, 3, 2] == 1
+	games.stuck[:] = True
+	games.step_ai()
+	assert games.step_ai() == 0
+	assert (games.final_scores == 0).all()
+
+
+def test_batch3():
+	games = batch.BatchState(50, columns=10, rows=10, seed=4)
+	direct_paths = games.direct_paths
+	checked = []
+
+	def check(indexes):  # Direct paths are same as paths of A*
+		free = direct_paths(indexes)
+		for i in indexes[free]:
+			dir_list = astar.calculate_path(games.game_fields[i], int(games.lengths[i]), tuple(games.heads[i].tolist()),
+			                                tuple(games.apples[i].tolist()), 10, 10)
+			assert list(games.paths[i, :games.path_lengths[i]]) == [batch.DIRECTION_CODES[d] for d in dir_list]
+		checked.append(free.sum())
+		return free
+
+	games.direct_paths = check
+	games.run()
+	assert 0 < sum(checked) < games.ticks.sum()
+
+
+def test_runner1():
+	results = sorted(runner.run_games(4, workers=2, columns=8, rows=8, base_seed=7), key=lambda r: r['game'])
+	assert [r['game'] for r in results] == [0, 1, 2, 3]
+	result = runner.play_game(1, results[1]['seed'], 8, 8, 'astar')
+	assert (result['score'], result['ticks']) == (results[1]['score'], results[1]['ticks'])
+	assert all(r['cause'] in ('wall', 'body') for r in results)
+
+
+def test_stats1():
+	values = np.random.default_rng(3).integers(0, 400, 1000)
+	first = stats.Stream(0, 400, bins=400)
+	second = stats.Stream(0, 400, bins=400)
+	for value in values[:300]:
+		first.add(int(value))
+	for value in values[300:]:
+		second.add(int(value))
+	first.merge(second)
+	assert first.count == 1000 and (first.min, first.max) == (values.min(), values.max())
+	assert first.mean == pytest.approx(values.mean())
+	assert first.variance == pytest.approx(values.var())
+	for q in stats.PERCENTILES:
+		assert abs(first.percentile(q) - np.percentile(values, q)) <= 2
+	with pytest.raises(ValueError):
+		first.merge(stats.Stream(0, 10))
+	summary = runner.run_stats(6, workers=2, columns=8, rows=8, base_seed=7, chunk_size=2).summary()
+	scores = [r['score'] for r in runner.run_games(6, workers=2, columns=8, rows=8, base_seed=7)]
+	assert summary['games'] == 6
+	assert summary['score']['mean'] == pytest.approx(np.mean(scores))
+
+
+def test_stats2(tmp_path, capsys):
+	replay_dir = str(tmp_path / 'replays')
+	dataset_dir = str(tmp_path / 'dataset')
+	runner.main(['-n', '3', '-w', '1', '--columns', '8', '--rows', '8', '--seed', '2', '--summary-only',
+	             '--replay-dir', replay_dir, '--dataset-dir', dataset_dir])
+	summary = json.loads(capsys.readouterr().out)
+	assert summary['games'] == 3
+	assert len(dataset.Dataset(dataset_dir)) == pytest.approx(summary['ticks']['mean'] * 3 + 3)  # Sample before move
+	assert sorted(os.listdir(replay_dir)) == ['game-0.snkr', 'game-1.snkr', 'game-2.snkr']
+	record = replay.Replay(os.path.join(replay_dir, 'game-1.snkr'))
+	assert record.ticks > 0
+	record.close()
+
+
+def test_arena1():
+	reservations = {5: [(3, 6, 1)]}
+	assert arena.blocked([0] * 9, reservations, 0, 0, 5, 2, 2)
+	assert not arena.blocked([0] * 9, reservations, 0, 0, 5, 6, 2)
+	assert not arena.blocked([0] * 9, reservations, 0, 1, 5, 3, 2)
+	path = arena.plan_path([0] * 9, {4: [(0, 9, 1)]}, 0, 0, (0, 1), (2, 1), 2, 3, 3)  # Middle square is reserved
+	x, y = 0, 1
+	for dx, dy in reversed(path):
+		x, y = x + dx, y + dy
+		assert (x, y) != (1, 1)
+	assert (x, y) == (2, 1) and len(path) == 4
+	field, length, head, apple = bench.synthetic_field(12, 0.3, 2)
+	flat = field.ravel()
+	path = astar.search(None, length, head, apple, 12, 12, blocked=lambda square, g: 0 < flat[square] <= length and
+	                    flat[square] >= g)[0]  # Same rule as check of the game field
+	assert path == astar.calculate_path(field, length, head, apple, 12, 12)
+	game = arena.Arena(snakes=6, columns=20, rows=20, seed=1)
+	while game.clock < 300 and game.step():
+		squares = [square for snake in game.snakes if snake.active for square in snake.body]
+		assert len(squares) == len(set(squares))
+		assert all(len(snake.body) == snake.length for snake in game.snakes if snake.active)
+		assert (np.count_nonzero(game.game_field > 0) == len(squares))
+	assert sum(snake.score for snake in game.snakes) > 0
+	parallel = arena.Arena(snakes=4, columns=20, rows=20, seed=1, workers=2)
+	for i in range(0, 20):
+		parallel.step()
+	parallel.close()
+	assert parallel.plans >= 4
+
+
+def test_replay1(tmp_path):
+	game = engine.GameState(columns=12, rows=12, seed=5, planner=incremental.IncrementalPlanner())
+	game.recorder = replay.Recorder(str(tmp_path / 'game.snkr'), game)
+	fields = [game.game_field]
+	while game.step_ai():
+		fields.append(game.game_field)
+	game.recorder.close(game)
+	record = replay.Replay(str(tmp_path / 'game.snkr'))
+	assert (record.columns, record.rows, record.seed) == (12, 12, 5)
+	assert (record.ticks, record.final_score, record.cause) == (game.ticks, game.final_score, game.cause)
+	assert len(fields) > replay.KEYFRAME_INTERVAL
+	for tick in range(0, record.ticks + 1):
+		assert (record.game_field(tick) == fields[tick]).all()
+	assert record.situation(record.ticks)[2] == game.apple
+	assert len(record.keyframes) > 1 and sum(len(body) for body, _ in record.keyframes) <= record.ticks + 1
+	record.close()
+	game = engine.GameState(columns=6, rows=6, seed=(1 << 64) - 1)
+	game.recorder = replay.Recorder(str(tmp_path / 'seed.snkr'), game)
+	game.step_ai()
+	game.recorder.close(game)
+	record = replay.Replay(str(tmp_path / 'seed.snkr'))
+	assert record.seed == (1 << 64) - 1 and (record.game_field(1) == game.game_field).all()
+	record.close()
+
+
+def test_dataset1(tmp_path):
+	writer = dataset.Writer(str(tmp_path), 8, 8, shard_size=50, tag='test')
+	game = engine.GameState(columns=8, rows=8, seed=2)
+	game.exporter = writer
+	fields = []
+	moves = []
+	while game.active:
+		fields.append(game.game_field)
+		game.step_ai()
+		moves.append(replay.MOVE_CODES[game.direction])
+	writer.close()
+	data = dataset.Dataset(str(tmp_path))
+	assert len(data) == len(fields) > 100 and len(data.shards) == -(-len(fields) // 50)
+	assert (data[0]['field'] == fields[0]).all() and tuple(data[0]['head']) == (4, 4)
+	assert (data[-1]['field'] == fields[-1]).all()
+	assert list(data[:len(data)]['direction']) == moves
+	assert np.shares_memory(data[10:40], data.shards[0])
+	assert (data[45:55]['field'] == np.array(fields[45:55])).all()
+	assert sum(len(batch) for batch in data.batches(16)) == len(data)
+
+
+def test_cache1():
+	game = engine.GameState(columns=5, rows=5, seed=1)
+	for _ in range(3):
+		game.step_ai()
+	assert game.hash_keys is None and game.field_hash is None  # Hash is not kept without plan cache
+	assert game.clock_limit == np.iinfo(game.dtype).max
+	snapshot = game.snapshot()
+	key = game.field_key()
+	game.clock_limit = 30  # Clock is moved back often
+	keys, powers = game.hash_keys, game.hash_powers
+	while game.step_ai():
+		field = game.game_field
+		assert game.field_key() == sum(keys[x * 5 + y] * powers[field[x, y]] for x, y in game.body) % engine.HASH_MODULUS
+	assert game.clock_base > 0
+	game.restore(snapshot)
+	assert game.field_key() == key
+	cache = plancache.PlanCache(max_entries=2)
+	cache.put('a', [(0, 1), (1, 0)])
+	cache.put('b', None)
+	path = cache.get('a')
+	path.pop()
+	assert cache.get('a') == [(0, 1), (1, 0)] and cache.get('b') == [] and cache.get('c') is None
+	cache.put('c', [(0, 1)])
+	assert cache.get('a') is None and len(cache) == 2  # Least recently used was removed
+	assert (cache.hits, cache.misses, cache.evictions) == (3, 2, 1)
+	cache = plancache.PlanCache()
+	for _ in range(2):
+		results = [runner.play_game(0, seed, 8, 8, 'astar') for seed in (3, 4)]
+		game = engine.GameState(columns=8, rows=8, seed=3)
+		game.plan_cache = cache
+		while game.step_ai():
+			pass
+		assert game.final_score == results[0]['score'] and game.ticks == results[0]['ticks']
+	assert cache.hits >= game.plans
+	result = runner.play_game(0, 4, 8, 8, 'astar', cache_size=64)
+	assert result['score'] == results[1]['score'] and result['cache_misses'] > 0
+
+
+def test_cache2():
+	planner = astar.BudgetPlanner(max_expanded=3)
+	game = engine.GameState(columns=8, rows=8, seed=1, planner=planner)
+	game.plan_cache = plancache.PlanCache()
+	game.apple = (0, 0)
+	assert game.find_path() and not planner.complete and planner.partial_paths == 1
+	assert len(game.plan_cache) == 0  # Path to square closest to apple is not stored
+	game.plan_cache.put((game.field_key(), game.length, game.head, game.apple), [(0, -1)] * 4 + [(-1, 0)] * 4)
+	assert len(game.find_path()) == 8 and planner.complete and planner.partial_paths == 1
+	calls = []
+
+	def no_path(*args):
+		calls.append(args)
+		return None
+
+	game.planner = no_path
+	game.plan_cache = plancache.PlanCache()
+	assert game.find_path() is None and game.find_path() == [] and len(calls) == 1  # No path is stored too
+	assert game.plan_cache.hits == 1
+
+
+def test_bench1():
+	field, length, head, apple = bench.synthetic_field(20, 0.3, 1)
+	assert field[head] == length == 120
+	assert field[apple] == length + 1
+	assert np.count_nonzero(field) == length + 1
+	results = {'case': {'ops_per_sec': 70, 'p99_ms': 1.0, 'nodes': None}}
+	assert bench.compare(results, {'case': {'ops_per_sec': 100, 'p99_ms': 1.0, 'nodes': 5}}, 0.25)
+	assert not bench.compare(results, {'case': {'ops_per_sec': 90, 'p99_ms': 0.9}}, 0.25)
+
+
+def test_bench2(tmp_path):
+	path = str(tmp_path / 'baseline.json')
+	with open(path, 'w') as file:
+		json.dump({'case': {'score': 10}}, file)  # Baseline without modes is baseline of full run
+	assert bench.load_baseline(path, 'full') == {'case': {'score': 10}} and bench.load_baseline(path, 'quick') == {}
+	bench.save_baseline(path, 'quick', {'case': {'score': 4}})
+	assert bench.load_baseline(path, 'quick') == {'case': {'score': 4}}
+	assert bench.load_baseline(path, 'full') == {'case': {'score': 10}}
+	results = {'arena': {'score': 40.0, 'ticks': 200}}
+	assert not bench.compare(results, {'arena': {'score': 100.0, 'ticks': 500}}, 0.25)  # Different game-ticks
+	assert bench.compare(results, {'arena': {'score': 100.0, 'ticks': 200}}, 0.25)
+	runs = [{'case': {'p50_ms': value, 'nodes': None, 'pyglet': value > 2, 'ticks': 200}} for value in (1.0, 9.0, 2.0)]
+	assert bench.median_results(runs) == {'case': {'p50_ms': 2.0, 'nodes': None, 'pyglet': True, 'ticks': 200}}
+	results = {'batch-10x10-10': {'ops_per_sec': 50}, 'sequential-10x10-10': {'ops_per_sec': 200},
+	           'batch-10x10-300': {'ops_per_sec': 300}, 'sequential-10x10-300': {'ops_per_sec': 200}}
+	assert not bench.scaling_regressions(results)  # Only the biggest number of games is checked
+	results['batch-10x10-300']['ops_per_sec'] = 150
+	assert bench.scaling_regressions(results)
+	metrics = bench.bench_batch(6, 4, repeat=2)
+	assert metrics['ops_per_sec'] > 0 and metrics['score'] == bench.bench_batch(6, 4, repeat=1)['score']
+
+
+def test_profiler1():
+	prof = profiler.Profiler(size=4)
+	for i in range(0, 6):
+		prof.count('expanded', i)
+	assert list(prof.values('expanded')) == [2, 3, 4, 5]
+	assert prof.summary()['expanded']['count'] == 6
+	game = engine.GameState(seed=1)
+	game.profiler = prof
+	for i in range(0, 30):
+		game.step_ai()
+	assert prof.counts['planning'] == prof.counts['collisions'] == 30
+	assert prof.counts['replans'] == game.plans
+	events = prof.chrome_trace()['traceEvents']
+	assert len(events) == sum(min(count, 4) for count in prof.counts.values())
+	assert all(events[i]['ts'] <= events[i + 1]['ts'] for i in range(0, len(events) - 1))
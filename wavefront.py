@@ -0,0 +1,134 @@
+import numpy as np
+
+NEIGHBOURS = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # Moves from square to its neighbours
+
+
+def distance_field(game_field, length, head, width, height, goal=None):
+    """
+    Calculate distance from head to every reachable square (breadth-first search of the whole board).
+
+    Whole wave of squares in same distance from head is moved at once by shifting numpy array.
+    Squares are kept in flat array column after column with one blocked square between columns,
+    so moves to all four neighbours are shifts of the array by 1 or by length of the column.
+    Uses same rule for body of the snake as astar.calculate_path (body square is free,
+    if it will disappear before head arrival), so distances match lengths of paths found by A*.
+
+    :param game_field: Numpy array of the game situation
+    :param length: Length of the snake
+    :param head: Position of the head of the snake
+    :param width: Columns in game (squares in one row).
+    :param height: Rows in game (squares in one column).
+    :param goal: Position of the square, where search stops (None for search of the whole board)
+    :return: Numpy array of distances from head (-1 for unreachable or not searched square).
+    """
+    stride = height + 1  # Distance of neighbouring squares in row (one blocked square between columns)
+    size = width * stride
+    lifetime = np.full((width, stride), size, dtype=np.int32)  # Game-ticks, until the square is free
+    lifetime[:, :height] = game_field
+    lifetime[lifetime == length + 1] = 0  # Apple
+    lifetime = lifetime.ravel()
+    distances = np.full(size, -1, dtype=np.int32)
+    start = head[0] * stride + head[1]
+    distances[start] = 0
+    lifetime[start] = size  # Reached squares are never free again
+    stop = goal[0] * stride + goal[1] if goal is not None else -1
+    frontier = np.zeros(size, dtype=bool)
+    frontier[start] = True
+    wave = np.empty_like(frontier)
+    distance = 0
+    while True:
+        distance += 1
+        wave[:stride] = False
+        wave[stride:] = frontier[:-stride]
+        wave[:-stride] |= frontier[stride:]
+        wave[1:] |= frontier[:-1]
+        wave[:-1] |= frontier[1:]
+        np.logical_and(wave, lifetime < distance, out=wave)
+        reached = np.flatnonzero(wave)
+        if len(reached) == 0:
+            break
+        distances[reached] = distance
+        lifetime[reached] = size
+        if 0 <= stop < size and wave[stop]:
+            break
+        frontier, wave = wave, frontier
+    return distances.reshape(width, stride)[:, :height]
+
+
+def descend(distances, goal, width, height):
+    """
+    Find path from head to goal square by going down the distance field (from goal to head).
+
+    :param distances: Numpy array of distances from head (see distance_field)
+    :param goal: Position of the goal square
+    :param width: Columns in game (squares in one row).
+    :param height: Rows in game (squares in one column).
+    :return: List of direction (Last element is first direction to take), None if goal is not reachable.
+    """
+    x, y = int(goal[0]), int(goal[1])
+    if not (0 <= x < width and 0 <= y < height) or distances[x, y] < 0:
+        return None
+    dir_list = []
+    distance = int(distances[x, y])
+    while distance > 0:
+        for dx, dy in NEIGHBOURS:
+            nx = x + dx
+            ny = y + dy
+            if 0 <= nx < width and 0 <= ny < height and distances[nx, ny] == distance - 1:
+                dir_list.append((-dx, -dy))
+                x, y = nx, ny
+                break
+        distance -= 1
+    return dir_list
+
+
+def calculate_path(game_field, length, head, apple, width, height):
+    """
+    Calculate shortest path from head to apple using distance field (same result as astar.calculate_path).
+
+    :param game_field: Numpy array of the game situation
+    :param length: Length of the snake
+    :param head: Position of the head of the snake
+    :param apple: Position of the apple
+    :param width: Columns in game (squares in one row).
+    :param height: Rows in game (squares in one column).
+    :return: List of direction (where to move square by square).
+    """
+    if not (0 <= apple[0] < width and 0 <= apple[1] < height):  # No apple on the board (Board is full)
+        return None
+    return descend(distance_field(game_field, length, head, width, height, apple), apple, width, height)
+
+
+class WavefrontPlanner:
+    """
+    Pathfinding, which calculates distance field of the whole board and descends it from apple to head.
+
+    Same distance field answers also, if the tail is reachable and how big is the reachable area
+    (kept after each calculation).
+    """
+
+    def __init__(self):
+        """
+        Declaration of class parameters.
+        """
+        self.distances = None  # Distance field of the last calculation
+        self.region_size = 0  # Number of squares reachable from head
+        self.tail_reachable = False  # Indicates if the tail square is reachable from head
+
+    def __call__(self, game_field, length, head, apple, width, height):
+        """
+        Calculate path from head to apple (same parameters and return value as astar.calculate_path).
+
+        :param game_field: Numpy array of the game situation
+        :param length: Length of the snake
+        :param head: Position of the head of the snake
+        :param apple: Position of the apple
+        :param width: Columns in game (squares in one row).
+        :param height: Rows in game (squares in one column).
+        :return: List of direction (where to move square by square).
+        """
+        self.distances = distance_field(game_field, length, head, width, height)
+        self.region_size = int(np.count_nonzero(self.distances >= 0))
+        tail = game_field == 1
+        self.tail_reachable = length == 1 or bool((self.distances[tail] >= 0).any())
+        return descend(self.distances, apple, width, height)